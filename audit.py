@@ -0,0 +1,101 @@
+#
+# audit.py - DARX PASS™ vault health audit
+# Author: DARX Tech
+#
+# Finds reused passwords, duplicate site/username pairs and weak passwords:
+#   - every password is reduced to a keyed hash (HMAC-SHA256 under a key that only
+#     lives in memory for the session), so reuse is one dict lookup per entry and
+#     no plaintext is kept;
+#   - logins are grouped by their casefolded (site, username);
+#   - strength comes from strength.evaluate().
+#
+# Decrypting and scoring each password is the expensive part, so it is cached per
+# entry ID together with the entry's secret token. A re-audit only touches entries
+# whose secret changed since the last run.
+#
+# This module must not import Qt.
+#
+
+import hmac
+import hashlib
+import secrets
+from collections import defaultdict, namedtuple
+
+import tracing
+import strength
+
+AuditReport = namedtuple("AuditReport", "reused duplicates weak checked")
+# reused:     [[entry, ...], ...]   groups of entries sharing one password
+# duplicates: [[entry, ...], ...]   groups of entries with the same site and username
+# weak:       [(entry, Strength), ...]
+# checked:    how many entries had to be decrypted and scored for this report
+
+
+def _score(fernet, key, secret):
+    password = fernet.decrypt(secret.encode('ascii')).decode('utf-8')
+    digest = hmac.new(key, password.encode('utf-8'), hashlib.sha256).digest()
+    result = strength.evaluate(password)
+    del password
+    return digest, result
+
+
+class AuditCache:
+    """Per-entry audit results, keyed by entry ID and valid while the entry's secret is unchanged."""
+
+    def __init__(self):
+        self._key = secrets.token_bytes(32)
+        self._results = {}  # entry id -> (secret, digest, Strength)
+
+    def __len__(self):
+        return len(self._results)
+
+    def stale(self, entries):
+        """Returns the entries that have no cached result for their current secret."""
+        results = self._results
+        return [entry for entry in entries
+                if results.get(entry["id"], (None,))[0] != entry["secret"]]
+
+    @tracing.traced("audit.score")
+    def score(self, fernet, entries):
+        """Decrypts, hashes and scores entries into the cache."""
+        # Serially: a spawned worker re-imports main.py and Qt, which alone costs what
+        # scoring several thousand entries does (see the audit case of bench_app.py).
+        key = self._key
+        for entry in entries:
+            self._results[entry["id"]] = (entry["secret"], *_score(fernet, key, entry["secret"]))
+
+    def prune(self, entries):
+        """Drops the results of entries that are no longer in the vault."""
+        live = {entry["id"] for entry in entries}
+        for entry_id in [entry_id for entry_id in self._results if entry_id not in live]:
+            del self._results[entry_id]
+
+    def report(self, entries, checked=0):
+        """Builds the report from cached results; every entry must have been scored."""
+        by_digest = defaultdict(list)
+        by_login = defaultdict(list)
+        weak = []
+        results = self._results
+        for entry in entries:
+            _, digest, result = results[entry["id"]]
+            by_digest[digest].append(entry)
+            by_login[(entry["site"].strip().casefold(), entry["username"].strip().casefold())].append(entry)
+            if result.label == "Weak":
+                weak.append((entry, result))
+        reused = [group for group in by_digest.values() if len(group) > 1]
+        duplicates = [group for group in by_login.values() if len(group) > 1]
+        reused.sort(key=len, reverse=True)
+        duplicates.sort(key=len, reverse=True)
+        weak.sort(key=lambda item: item[1].bits)
+        return AuditReport(reused, duplicates, weak, checked)
+
+
+@tracing.traced("audit.run")
+def run_audit(fernet, entries, cache):
+    """Audits entries, re-scoring only those changed since the cache last saw them. Returns an AuditReport."""
+    entries = list(entries)
+    stale = cache.stale(entries)
+    if stale:
+        cache.score(fernet, stale)
+    cache.prune(entries)
+    return cache.report(entries, checked=len(stale))
@@ -0,0 +1,303 @@
+#
+# bench_app.py - DARX PASS™ headless application benchmark
+# Author: DARX Tech
+#
+# Drives the real MainWindow under Qt's offscreen platform against generated
+# vaults, timing the operations a user waits on: unlocking and loading the vault,
+# saving it, reading an entry's history, refilling, filtering, sorting and
+# grouping the table, the password strength check, generating passwords, a first
+# audit, the theme toggle, merging in a changed copy of the vault, rotating the vault key
+# and switching vaults. Results carry the commit and machine they were taken on,
+# so a run can be compared with one taken before a change:
+#
+#   python benchmarks/bench_app.py --json before.json
+#   ... change something ...
+#   python benchmarks/bench_app.py --compare before.json
+#
+# Usage:
+#   python benchmarks/bench_app.py [--sizes 1000 10000 100000] [--repeat 5] [--json PATH] [--compare PATH]
+#
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Must be set before Qt is imported.
+
+from common import create_vault, measure, write_results, compare, MASTER_PASSWORD, PASSWORD_ALPHABET
+
+from PySide6.QtCore import QEvent, QThreadPool
+from PySide6.QtWidgets import QApplication
+
+import kdf
+import main
+
+STRENGTH_SAMPLES = 1000
+GENERATED_PASSWORDS = 1000
+EDIT_BURST = 10
+DIALOGS_OPENED = 50
+MERGE_EDITS = 10
+
+
+def wait_for_load(app, window):
+    while window.vault_loading:
+        app.processEvents()
+        time.sleep(0.001)  # Leave the loader thread the GIL.
+
+
+def close_window(app, window):
+    """Closes and destroys window. Its slots keep the Python object alive in reference cycles,
+    and windows left behind would slow down the cases run on the next one."""
+    window.close()
+    QThreadPool.globalInstance().waitForDone()
+    window.deleteLater()
+    app.processEvents()
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+def strength_samples():
+    passwords = []
+    for i in range(STRENGTH_SAMPLES):
+        length = 4 + i % 28
+        passwords.append("".join(PASSWORD_ALPHABET[(i * 7 + j * 13) % len(PASSWORD_ALPHABET)] for j in range(length)))
+    return passwords
+
+
+def bench_size(app, size, key, lock, repeat):
+    """Runs every case against a vault of size entries. Returns a list of result dicts."""
+    results = []
+
+    def record(case, result):
+        results.append({"case": case, "entries": size, **result})
+        print(f"{case:<34} {size:>8} {result['min_ms']:>11.3f} {result['median_ms']:>11.3f}", flush=True)
+
+    window = None
+
+    def open_window():
+        nonlocal window
+        if window is not None:
+            close_window(app, window)
+        window = main.MainWindow(key, lock)
+        window.show()
+        wait_for_load(app, window)
+
+    record("unlock (scrypt)", measure(repeat, lambda: kdf.unlock(MASTER_PASSWORD, main.read_lock(main.VAULT_FILE))))
+    record("startup (window + vault load)", measure(repeat, open_window))
+
+    def reopen_vault():
+        window.vault.close()
+
+    def init_crypto_and_load():
+        window.init_crypto(key, lock)
+        window.vault.load()
+
+    record("init_crypto + vault.load", measure(repeat, init_crypto_and_load, setup=reopen_vault))
+
+    entry_ids = [entry["id"] for entry in window.vault.entries]
+
+    def edit_one_entry():
+        window.vault.update(entry_ids[0], {"username": f"edited{time.perf_counter_ns()}@example.com"})
+
+    def edit_burst():
+        for i in range(EDIT_BURST):
+            window.vault.update(entry_ids[i], {"username": f"edited{time.perf_counter_ns()}@example.com"})
+
+    def edit_burst_and_flush():
+        edit_burst()
+        window.vault.flush()
+
+    def save_and_flush():
+        window.save_vault_data()
+        window.vault.flush()
+
+    # What the GUI thread waits for, and how long until the burst is on disk.
+    record(f"edit x{EDIT_BURST} (GUI thread)", measure(repeat, edit_burst, setup=window.vault.flush))
+    record(f"edit x{EDIT_BURST} + flush", measure(repeat, edit_burst_and_flush, setup=window.vault.flush))
+    record("save_vault_data (1 dirty chunk)", measure(repeat, save_and_flush, setup=edit_one_entry))
+    # Every chunk dirty, as after a migration.
+    record("save_vault_data (full rewrite)", measure(repeat, save_and_flush, setup=window.vault._rechunk))
+
+    def forget_history():
+        window.vault._history = None
+
+    # The edits above left their old usernames in the history file; loading the vault never reads it.
+    record("history (first read)", measure(repeat, lambda: window.vault.history(entry_ids[0]), setup=forget_history))
+
+    # The loader above only refilled the vault; reload the window so table and index match it.
+    open_window()
+
+    def refill_table():
+        window.load_passwords_to_table()
+        app.processEvents()
+
+    record("load_passwords_to_table", measure(repeat, refill_table))
+
+    def filter_table():
+        window.apply_search_filter("hub")
+        app.processEvents()
+        window.apply_search_filter("")
+        app.processEvents()
+
+    record("search filter + clear", measure(repeat, filter_table))
+
+    header = window.table.horizontalHeader()
+
+    def sort_by_site():
+        # Alternates the direction, so every run re-sorts.
+        descending = header.sortIndicatorSection() == main.PasswordTableModel.SITE and \
+            header.sortIndicatorOrder() == main.Qt.AscendingOrder
+        header.setSortIndicator(main.PasswordTableModel.SITE, main.Qt.DescendingOrder if descending else main.Qt.AscendingOrder)
+        app.processEvents()
+
+    record("sort by site", measure(repeat, sort_by_site))
+
+    def group_by_domain():
+        window.btn_group_domains.setChecked(True)
+        app.processEvents()
+
+    def ungroup():
+        window.btn_group_domains.setChecked(False)
+
+    record("group by domain", measure(repeat, group_by_domain, setup=ungroup))
+    ungroup()
+    header.setSortIndicator(-1, main.Qt.AscendingOrder)
+
+    dialog = main.AddPasswordDialog()
+    passwords = strength_samples()
+
+    def check_strength():
+        for password in passwords:
+            dialog.check_password_strength(password)
+
+    record(f"check_password_strength x{STRENGTH_SAMPLES}", measure(repeat, check_strength))
+    # What "Generate Passwords" draws for a list of GENERATED_PASSWORDS sites, before its one vault write.
+    record(f"generate passwords x{GENERATED_PASSWORDS}",
+           measure(repeat, lambda: main.generator.generate_passwords(GENERATED_PASSWORDS, window.password_policy)))
+    dialog.close()
+    dialog.deleteLater()
+    # A first audit, with nothing cached: every password decrypted, hashed and scored.
+    record("audit (score every entry)",
+           measure(repeat, lambda: main.audit.AuditCache().score(window.vault.fernet, window.vault.entries)))
+
+    def toggle_theme():
+        window.toggle_theme()
+        app.processEvents()
+
+    record("toggle_theme", measure(repeat, toggle_theme))
+
+    def open_dialog():
+        dialog = main.AddPasswordDialog(window)
+        dialog.show()
+        app.processEvents()
+        dialog.close()
+        dialog.deleteLater()
+
+    # A dialog inherits the window's theme; this covers styling one as it opens.
+    record("open password dialog", measure(repeat, open_dialog))
+
+    # Dialogs the user has opened and closed must not be restyled along with the window.
+    main.AddPasswordDialog.exec = lambda dialog: main.QDialog.Rejected
+    for _ in range(DIALOGS_OPENED):
+        window.open_add_password_dialog()
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+    del main.AddPasswordDialog.exec
+    record(f"toggle_theme after {DIALOGS_OPENED} dialogs", measure(repeat, toggle_theme))
+
+    copy_directory = tempfile.mkdtemp(prefix="darx-bench-")
+    copy_path = os.path.join(copy_directory, main.VAULT_FILE)
+    merges = []
+
+    def diverge_copy():
+        # A copy of the vault, as carried to another machine, with a few entries edited there.
+        window.vault.flush()
+        window.vault.compact()
+        shutil.copy(window.vault.vault_path, copy_path)
+        copy = main.VaultStore(copy_path, window.vault.fernet)
+        copy.load()
+        step = max(1, len(copy.entries) // MERGE_EDITS)
+        for entry in copy.entries[::step][:MERGE_EDITS]:
+            copy.update(entry["id"], {"username": f"merged{len(merges)}@example.com"})
+        copy.close()
+
+    def merge_copy():
+        merges.append(main.sync.merge_vault(window.vault, copy_path))
+
+    # Only the chunks holding the edits are decrypted, however large the vault.
+    try:
+        record(f"merge copy with {MERGE_EDITS} edits", measure(repeat, merge_copy, setup=diverge_copy))
+    finally:
+        shutil.rmtree(copy_directory, ignore_errors=True)
+
+    rotation = {}
+
+    def begin_rotation():
+        new_key, new_lock = kdf.rotate_key(MASTER_PASSWORD, window.vault.lock)
+        window.vault.begin_key_rotation(kdf.vault_fernet(new_key, new_lock), new_lock)
+        rotation.update(fernet=main.fernet.Fernet(new_key), lock=kdf.end_rotation(new_lock))
+
+    def rotate_key():
+        while window.vault.rotate_batch():
+            pass
+        window.vault.end_key_rotation(rotation["fernet"], rotation["lock"])
+
+    # What KeyRotator does, without the signals. The vault's key changes; nothing below unlocks it again.
+    record("rotate key (re-encrypt all)", measure(repeat, rotate_key, setup=begin_rotation))
+
+    # A second vault of the same size; after the first switch both are unlocked and one is cached.
+    other_directory = tempfile.mkdtemp(prefix="darx-bench-")
+    try:
+        other_key, other_lock = create_vault(other_directory, size)
+        other_path = os.path.join(other_directory, main.VAULT_FILE)
+        window.vault_list.append(("Other", other_path))
+        window.switch_vault(other_path, (other_key, other_lock))
+        wait_for_load(app, window)
+
+        def switch_vault():
+            window.switch_vault(main.VAULT_FILE if window.vault_path == other_path else other_path)
+            app.processEvents()
+
+        record("switch vault (cached)", measure(repeat, switch_vault))
+        close_window(app, window)
+    finally:
+        shutil.rmtree(other_directory, ignore_errors=True)
+    return results
+
+
+def run(sizes, repeat):
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    app.setStyle("Fusion")
+    original_directory = os.getcwd()
+    results = []
+    print(f"{'case':<34} {'entries':>8} {'min ms':>11} {'median ms':>11}")
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="darx-bench-")
+        try:
+            key, lock = create_vault(directory, size)
+            os.chdir(directory)  # MainWindow uses paths relative to the working directory.
+            results.extend(bench_size(app, size, key, lock, repeat))
+        finally:
+            os.chdir(original_directory)
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless application benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with the JSON results of an earlier run")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        write_results(args.json, results)
+    if args.compare:
+        compare(args.compare, results)
+    # Skip interpreter teardown: Qt objects outliving the QApplication crash it ("Fatal Python error").
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(0)
@@ -0,0 +1,66 @@
+#
+# bench_codec.py - DARX PASS™ vault payload encoding benchmark
+# Author: DARX Tech
+#
+# Compares the binary entry encoding (codec.py) with the JSON it replaced, on
+# generated vaults. Reports payload size, encrypted size, encode and decode time.
+#
+# Usage:
+#   python benchmarks/bench_codec.py [--sizes 10000 100000] [--repeat 3] [--json results.json]
+#
+
+import json
+import argparse
+
+from common import generate_entries, best_of, write_results
+
+from cryptography.fernet import Fernet
+
+from codec import encode_entries, decode_entries
+
+
+ENCODINGS = {
+    "json (indent=4, pre-chunking)": (lambda entries: json.dumps(entries, indent=4).encode('utf-8'), json.loads),
+    "json (compact)": (lambda entries: json.dumps(entries, separators=(',', ':')).encode('utf-8'), json.loads),
+    "binary (codec.py)": (encode_entries, decode_entries),
+}
+
+
+def run(sizes, repeat):
+    fernet = Fernet(Fernet.generate_key())
+    results = []
+    for size in sizes:
+        entries = generate_entries(size, fernet)
+        for name, (encode, decode) in ENCODINGS.items():
+            encode_time, payload = best_of(repeat, encode, entries)
+            decode_time, decoded = best_of(repeat, decode, payload)
+            assert decoded == entries, f"{name} did not round-trip"
+            results.append({
+                "entries": size,
+                "encoding": name,
+                "payload_bytes": len(payload),
+                "encrypted_bytes": len(fernet.encrypt(payload)),
+                "encode_ms": round(encode_time * 1000, 2),
+                "decode_ms": round(decode_time * 1000, 2),
+            })
+    return results
+
+
+def print_table(results):
+    print(f"{'entries':>8}  {'encoding':<30} {'payload':>12} {'encrypted':>12} {'encode ms':>10} {'decode ms':>10}")
+    for row in results:
+        print(f"{row['entries']:>8}  {row['encoding']:<30} {row['payload_bytes']:>12,} "
+              f"{row['encrypted_bytes']:>12,} {row['encode_ms']:>10.2f} {row['decode_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vault payload encoding benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    print_table(results)
+    if args.json:
+        write_results(args.json, results)
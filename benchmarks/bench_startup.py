@@ -0,0 +1,129 @@
+#
+# bench_startup.py - DARX PASS™ cold start benchmark
+# Author: DARX Tech
+#
+# Launches main.py in a fresh interpreter, the way a user does, and times how
+# long it takes until the first dialog is on screen: the login dialog for an
+# existing vault, the create-password dialog on first run. Each launch runs under
+# Qt's offscreen platform, and the dialog is rejected as soon as it has painted, so the
+# process exits without a password. Also times a bare `import main`.
+#
+# Fails (exit code 1) if the login dialog takes longer than the budget, so it can
+# guard start-up in CI:
+#
+#   python benchmarks/bench_startup.py [--repeat 10] [--budget-ms 1500] [--json PATH] [--compare PATH]
+#
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+from common import REPO_ROOT, create_vault, write_results, compare
+
+LOGIN_DIALOG_BUDGET_MS = 1500
+
+# Runs in the launched interpreter. It must import nothing from the repo before main.py
+# does, or the benchmark would pay for those imports up front.
+DIALOG_PROBE = """
+import sys, runpy
+from PySide6.QtWidgets import QApplication, QDialog
+
+def exec_and_reject(dialog):
+    dialog.show()
+    QApplication.processEvents()
+    print("shown", flush=True)
+    return QDialog.Rejected
+
+QDialog.exec = exec_and_reject
+sys.argv = [{main!r}]
+sys.path.insert(0, {repo!r})  # As `python main.py` would.
+runpy.run_path({main!r}, run_name="__main__")
+"""
+IMPORT_PROBE = """
+import sys
+sys.path.insert(0, {repo!r})
+import main
+print("shown", flush=True)
+"""
+
+
+def launch(probe, directory):
+    """Starts a fresh interpreter running probe in directory. Returns seconds until it printed "shown"."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env.pop("DARX_TRACE", None)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", probe], cwd=directory, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, errors = process.communicate()
+    if line.strip() != "shown":
+        raise RuntimeError(f"Start-up probe failed:\n{errors}")
+    return elapsed
+
+
+def measure_launches(repeat, probe, directory):
+    launch(probe, directory)  # Warm the OS file cache; a first launch after boot is not what we measure.
+    samples = [launch(probe, directory) for _ in range(repeat)]
+    return {
+        "runs": repeat,
+        "min_ms": round(min(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def run(repeat):
+    main_path = os.path.join(REPO_ROOT, "main.py")
+    dialog_probe = DIALOG_PROBE.format(main=main_path, repo=REPO_ROOT)
+    results = []
+    print(f"{'case':<34} {'min ms':>11} {'median ms':>11}")
+    vault_directory = tempfile.mkdtemp(prefix="darx-bench-")
+    empty_directory = tempfile.mkdtemp(prefix="darx-bench-")
+    try:
+        create_vault(vault_directory, 1000)
+        cases = [
+            ("interpreter only", 'print("shown")', empty_directory),
+            ("import main", IMPORT_PROBE.format(repo=REPO_ROOT), empty_directory),
+            ("login dialog (existing vault)", dialog_probe, vault_directory),
+            ("create dialog (first run)", dialog_probe, empty_directory),
+        ]
+        for case, probe, directory in cases:
+            result = {"case": case, "entries": 0, **measure_launches(repeat, probe, directory)}
+            print(f"{case:<34} {result['min_ms']:>11.1f} {result['median_ms']:>11.1f}")
+            results.append(result)
+    finally:
+        shutil.rmtree(vault_directory, ignore_errors=True)
+        shutil.rmtree(empty_directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=LOGIN_DIALOG_BUDGET_MS,
+                        help="maximum median time to the login dialog")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with the JSON results of an earlier run")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        write_results(args.json, results)
+    if args.compare:
+        compare(args.compare, results)
+    login = next(result for result in results if result["case"].startswith("login dialog"))
+    over_budget = login["median_ms"] > args.budget_ms
+    if over_budget:
+        print(f"\nFAIL: the login dialog took {login['median_ms']:.0f} ms, over the {args.budget_ms:.0f} ms budget.")
+    else:
+        print(f"\nOK: the login dialog took {login['median_ms']:.0f} ms (budget {args.budget_ms:.0f} ms).")
+    # Skip interpreter teardown, as bench_app.py does: Qt objects outliving the QApplication crash it.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(1 if over_budget else 0)
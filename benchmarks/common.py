@@ -0,0 +1,129 @@
+#
+# common.py - DARX PASS™ benchmark helpers
+# Author: DARX Tech
+#
+# Shared by the scripts in benchmarks/: vault generation, timing and the
+# machine-readable result format.
+#
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import platform
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from cryptography.fernet import Fernet
+
+import kdf
+from vault import VaultStore
+
+VAULT_FILE = "vault_data.json"  # main.VAULT_FILE; main itself imports Qt.
+MASTER_PASSWORD = "benchmark master password"
+
+SITES = ["github.com", "google.com", "amazon.com", "netflix.com", "bank.example", "mail.proton.me",
+         "jira.internal", "gitlab.com", "aws.amazon.com", "portal.azure.com", "slack.com", "zoom.us"]
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + string.punctuation
+
+
+def generate_entries(count, fernet=None, seed=0):
+    """Generates vault entries. With a Fernet, they are shaped like the ones VaultStore keeps
+    in memory (id + encrypted secret); without one, like AddPasswordDialog.get_data()."""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        password = "".join(rng.choice(PASSWORD_ALPHABET) for _ in range(rng.randint(10, 24)))
+        entry = {"site": f"{rng.choice(SITES)}/{i}", "username": f"user{i}@example.com"}
+        if fernet is None:
+            entry["password"] = password
+        else:
+            entry = {"id": f"{rng.getrandbits(64):016x}", **entry,
+                     "secret": fernet.encrypt(password.encode('utf-8')).decode('ascii')}
+        entries.append(entry)
+    return entries
+
+
+def create_vault(directory, count):
+    """Writes a vault of count generated entries into directory, locked with MASTER_PASSWORD.
+    Returns (key, lock), as handle_authentication() would."""
+    key = Fernet.generate_key()
+    fernet = Fernet(key)
+    lock = kdf.create_lock(MASTER_PASSWORD, key)
+    # A bare-list vault is upgraded into the current format by the first load.
+    with open(os.path.join(directory, VAULT_FILE), 'wb') as f:
+        f.write(fernet.encrypt(json.dumps(generate_entries(count, fernet)).encode('utf-8')))
+    store = VaultStore(os.path.join(directory, VAULT_FILE), fernet, lock=lock)
+    store.load()
+    store.close()
+    return key, lock
+
+
+def best_of(repeat, func, *args):
+    """Runs func repeat times. Returns (fastest seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(repeat, func, setup=None):
+    """Times func repeat times, calling setup (untimed) before each run. Returns a result dict."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def environment():
+    """Describes the commit and machine, so result files can be compared across commits."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def compare(baseline_path, results, key=("case", "entries"), metric="median_ms"):
+    """Prints each result next to the same case in a baseline results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {tuple(row[k] for k in key): row for row in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline['environment'].get('commit') or '?'}):")
+    print(f"{'case':<34} {'entries':>8} {'before':>11} {'after':>11} {'change':>8}")
+    for row in results:
+        before = old.get(tuple(row[k] for k in key))
+        if before is None:
+            continue
+        change = (row[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        print(f"{row['case']:<34} {row['entries']:>8} {before[metric]:>11.3f} {row[metric]:>11.3f} {change:>+7.1f}%")
@@ -0,0 +1,236 @@
+#
+# breach.py - DARX PASS™ offline breached-password lookup
+# Author: DARX Tech
+#
+# Checks passwords against a locally downloaded breach corpus (SHA-1 hash:count
+# lines, e.g. the "Pwned Passwords" download) without any network access. The text
+# corpus is converted once into a compact binary file:
+#
+#   b"DXBREACH" + version byte + 3 reserved bytes | u64 record count
+#   fan-out table: 65537 x u64, index of the first record for each 2-byte hash prefix
+#   records: 20-byte SHA-1 digest + u32 breach count, sorted by digest
+#
+# All integers are little-endian. The file is memory-mapped and searched in place:
+# the fan-out table narrows a lookup to the records sharing the first two bytes of
+# the hash, and a binary search finds it among those, so the corpus never has to
+# fit in RAM.
+#
+# Usage:
+#   python breach.py convert pwned-passwords-sha1.txt breached_passwords.bin
+#   python breach.py check [breached_passwords.bin]
+#
+# This module must not import Qt.
+#
+
+import os
+import sys
+import mmap
+import heapq
+import struct
+import hashlib
+from bisect import bisect_left
+
+# --- Configuration Constants ---
+BREACH_MAGIC = b"DXBREACH"
+BREACH_VERSION = 1
+DEFAULT_BREACH_FILE = "breached_passwords.bin"
+DIGEST_SIZE = 20
+RECORD_SIZE = DIGEST_SIZE + 4
+FANOUT_SIZE = 65536 + 1
+HEADER_SIZE = len(BREACH_MAGIC) + 4 + 8 + FANOUT_SIZE * 8
+MAX_COUNT = 2 ** 32 - 1
+SORT_RUN_RECORDS = 2_000_000        # Records sorted in memory at a time when the source is unsorted.
+WRITE_BATCH_RECORDS = 65536
+
+_COUNT = struct.Struct("<I")
+_FANOUT = struct.Struct(f"<{FANOUT_SIZE}Q")
+
+
+class CorpusNotSorted(Exception):
+    pass
+
+
+def password_digest(password):
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+# --- Conversion ---
+
+def _parse_records(source_path):
+    """Yields a 24-byte record for every "HASH[:COUNT]" line of a text corpus."""
+    with open(source_path, 'rb') as f:
+        for line in f:
+            digest_hex, _, count = line.strip().partition(b":")
+            if len(digest_hex) != DIGEST_SIZE * 2:
+                continue  # Blank line or not a SHA-1 hash.
+            count = min(int(count or 1), MAX_COUNT)
+            yield bytes.fromhex(digest_hex.decode('ascii')) + _COUNT.pack(count)
+
+
+def _require_sorted(records):
+    previous = b""
+    for record in records:
+        if record[:DIGEST_SIZE] < previous:
+            raise CorpusNotSorted()
+        previous = record[:DIGEST_SIZE]
+        yield record
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            record = f.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                return
+            yield record
+
+
+def _sorted_records(source_path, temp_dir):
+    """Sorts the corpus by hash in runs of SORT_RUN_RECORDS spilled to temp_dir, then merges the runs."""
+    run_paths = []
+    records = _parse_records(source_path)
+    while True:
+        run = [record for _, record in zip(range(SORT_RUN_RECORDS), records)]
+        if not run:
+            break
+        run.sort()
+        run_paths.append(os.path.join(temp_dir, f"run{len(run_paths)}.bin"))
+        with open(run_paths[-1], 'wb') as f:
+            f.write(b"".join(run))
+        del run
+    return heapq.merge(*map(_read_run, run_paths))
+
+
+def _write_corpus(records, output_path):
+    """Writes sorted records (merging repeated hashes) with a header and fan-out table. Returns the record count."""
+    counts = [0] * 65536
+    total = 0
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))  # Filled in once the records are counted.
+        batch = []
+        previous = None
+        for record in records:
+            digest = record[:DIGEST_SIZE]
+            if previous is not None and digest == previous[:DIGEST_SIZE]:
+                count = min(_COUNT.unpack_from(previous, DIGEST_SIZE)[0] + _COUNT.unpack_from(record, DIGEST_SIZE)[0],
+                            MAX_COUNT)
+                previous = digest + _COUNT.pack(count)
+                continue
+            if previous is not None:
+                batch.append(previous)
+                if len(batch) >= WRITE_BATCH_RECORDS:
+                    f.write(b"".join(batch))
+                    batch.clear()
+            counts[int.from_bytes(digest[:2], 'big')] += 1
+            total += 1
+            previous = record
+        if previous is not None:
+            batch.append(previous)
+        f.write(b"".join(batch))
+
+        fanout = [0]
+        for count in counts:
+            fanout.append(fanout[-1] + count)
+        f.seek(0)
+        f.write(BREACH_MAGIC + bytes([BREACH_VERSION, 0, 0, 0]) + total.to_bytes(8, 'little') + _FANOUT.pack(*fanout))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+    return total
+
+
+def convert(source_path, output_path):
+    """Converts a "HASH:COUNT" text corpus into the binary lookup file. Returns the number of distinct hashes.
+    A corpus ordered by hash is converted in one streaming pass; any other order is sorted on disk first."""
+    try:
+        return _write_corpus(_require_sorted(_parse_records(source_path)), output_path)
+    except CorpusNotSorted:
+        pass
+    import tempfile  # Only needed here; importing breach stays cheap for the app's start-up.
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as temp_dir:
+        return _write_corpus(_sorted_records(source_path, temp_dir), output_path)
+
+
+# --- Lookup ---
+
+class _Digests:
+    """A read-only sequence view of the digests in the mapped records, for bisect."""
+
+    def __init__(self, corpus_map, count):
+        self._map = corpus_map
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        return self._map[offset:offset + DIGEST_SIZE]
+
+
+class BreachCorpus:
+    """A memory-mapped breach corpus written by convert()."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(BREACH_MAGIC)] != BREACH_MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a converted breach corpus.")
+        if self._map[len(BREACH_MAGIC)] != BREACH_VERSION:
+            version = self._map[len(BREACH_MAGIC)]
+            self.close()
+            raise ValueError(f"Unsupported breach corpus version: {version}")
+        self.size = int.from_bytes(self._map[len(BREACH_MAGIC) + 4:len(BREACH_MAGIC) + 12], 'little')
+        self._fanout = _FANOUT.unpack_from(self._map, len(BREACH_MAGIC) + 12)
+        self._digests = _Digests(self._map, self.size)
+
+    def __len__(self):
+        return self.size
+
+    def count_digest(self, digest):
+        """Returns how often the SHA-1 digest appears in the corpus (0 if it does not)."""
+        prefix = int.from_bytes(digest[:2], 'big')
+        start, end = self._fanout[prefix], self._fanout[prefix + 1]
+        index = bisect_left(self._digests, digest, start, end)
+        if index < end and self._digests[index] == digest:
+            return _COUNT.unpack_from(self._map, HEADER_SIZE + index * RECORD_SIZE + DIGEST_SIZE)[0]
+        return 0
+
+    def count(self, password):
+        """Returns how often password appears in the corpus (0 if it does not)."""
+        return self.count_digest(password_digest(password))
+
+    def close(self):
+        self._map.close()
+
+
+def open_corpus(path=DEFAULT_BREACH_FILE):
+    """Returns the BreachCorpus at path, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    return BreachCorpus(path)
+
+
+if __name__ == "__main__":
+    import getpass
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline breached-password corpus tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="convert a HASH:COUNT text corpus to the lookup file")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("output", nargs="?", default=DEFAULT_BREACH_FILE)
+    check_parser = commands.add_parser("check", help="look up a password (read from the terminal)")
+    check_parser.add_argument("corpus", nargs="?", default=DEFAULT_BREACH_FILE)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        print(f"{convert(args.source, args.output):,} hashes written to {args.output}")
+    else:
+        corpus = BreachCorpus(args.corpus)
+        count = corpus.count(getpass.getpass("Password: "))
+        print(f"Found in {count:,} breaches." if count else "Not found in the corpus.")
+        sys.exit(1 if count else 0)
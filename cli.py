@@ -0,0 +1,500 @@
+#
+# cli.py - DARX PASS™ command line
+# Author: DARX Tech
+#
+# Reads and changes the vault from scripts and terminals, without Qt:
+#
+#   python cli.py get SITE [-u USERNAME]      prints the password
+#   python cli.py list [QUERY]                prints id, site and username per line
+#   python cli.py add SITE USERNAME           reads the password from the terminal or stdin
+#   python cli.py rm SITE|ID [-u USERNAME]
+#   python cli.py merge OTHER_VAULT [-p]      merges in another copy of the vault (see sync.py)
+#
+# Every command unlocks the vault with the master password and decrypts it, which
+# takes a scrypt derivation plus a full load. For repeated lookups, start the agent:
+#
+#   python cli.py agent [--idle-timeout SECONDS]
+#   python cli.py stop
+#
+# Like ssh-agent, it unlocks once, keeps the vault and its search index in memory
+# and answers the other commands over a Unix socket that only the current user can
+# open, so a lookup is a round trip instead of a decrypt. It exits after
+# AGENT_IDLE_SECONDS without a request, and reloads the vault whenever the files
+# change on disk. Requests and responses are one JSON object per connection,
+# each a single line.
+#
+# Lookups read the vault without its lock (see vault.py), so they work while the
+# app has it open. A command that changes the vault takes the lock, and reloads
+# the vault from disk, for the length of that one request only: it fails with a
+# message while the app has the vault open, and never keeps the app from opening it.
+#
+# This module must not import Qt.
+#
+
+import os
+import sys
+import json
+import socket
+import getpass
+import hashlib
+import tempfile
+import argparse
+
+import tracing
+
+# vault, kdf, search and cryptography are imported where they are used: a lookup
+# answered by the agent needs none of them, and importing them costs more than the lookup.
+
+# --- Configuration Constants ---
+VAULT_FILE = "vault_data.json"          # main.py's vault, in the current directory.
+AGENT_SOCKET_ENV = "DARX_AGENT_SOCKET"  # Overrides the socket path derived from the vault path.
+AGENT_IDLE_SECONDS = 15 * 60            # The agent locks (exits) after this long without a request.
+AGENT_REQUEST_TIMEOUT = 5.0             # Seconds a client gets to send its request.
+MAX_REQUEST_BYTES = 1024 * 1024
+AMBIGUOUS_LISTED = 10                   # Matches listed when a site is ambiguous.
+
+
+class CommandError(Exception):
+    """A command failed in a way that is reported to the user as is."""
+
+
+# --- Vault Session ---
+WRITE_OPS = ("add", "rm", "merge")
+
+
+def _file_state(paths):
+    """Returns (mtime, size) of every path, to notice when another process changed the vault."""
+    state = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            state.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+
+def _public(entry, password=None):
+    result = {"id": entry["id"], "site": entry["site"], "username": entry["username"]}
+    if password is not None:
+        result["password"] = password
+    return result
+
+
+class Session:
+    """An unlocked vault and its search index, serving the CLI commands."""
+
+    def __init__(self, vault_path, key, lock=None, for_writing=False):
+        import kdf
+
+        self.vault_path = vault_path
+        self.fernet = kdf.vault_fernet(key, lock)
+        self.vault = None
+        self.search_index = None
+        self.state = None
+        self.writing = False        # self.vault holds the vault's lock.
+        self.reload(for_writing)
+
+    def reload(self, for_writing=False):
+        """Reads the vault from disk, without its lock unless for_writing. A store loaded for writing
+        holds the lock until self.vault.close(); a read-only one is closed at once."""
+        from vault import VaultStore, VaultInUse
+        from search import SearchIndex
+
+        from cryptography.fernet import InvalidToken
+
+        store = VaultStore(self.vault_path, self.fernet)
+        try:
+            store.load(read_only=not for_writing)
+        except VaultInUse as e:
+            if not for_writing:
+                raise CommandError(str(e)) from None
+            raise CommandError("The vault is open in DARX PASS™ (or another command is changing it). "
+                               "Close it there to change it from the command line.") from None
+        except InvalidToken:
+            raise CommandError("The vault key was rotated since it was unlocked. Stop the agent "
+                               "(python cli.py stop) and unlock the vault again.") from None
+        if not for_writing:
+            store.close()
+        self.vault = store
+        self.writing = for_writing
+        self.search_index = SearchIndex(store.entries)
+        self.state = self._current_state()
+
+    def _current_state(self):
+        return _file_state((self.vault.vault_path, self.vault.journal_path))
+
+    def refresh(self):
+        """Reloads the vault if another process (the app, or a CLI command without the agent) changed it."""
+        if self._current_state() != self.state:
+            self.reload()
+
+    def find(self, site, username=None):
+        """Returns the entries for site (an exact site or entry ID, else a search), optionally for one username."""
+        if site in self.vault.by_id:
+            return [self.vault.by_id[site]]
+        site_key = site.strip().casefold()
+        candidates = self.search_index.search(site)
+        exact = [entry for entry in candidates if entry["site"].strip().casefold() == site_key]
+        matches = exact or candidates
+        if username is not None:
+            username_key = username.strip().casefold()
+            matches = [entry for entry in matches if entry["username"].strip().casefold() == username_key]
+        return matches
+
+    def _find_one(self, site, username=None):
+        matches = self.find(site, username)
+        if not matches:
+            raise CommandError(f"No entry for '{site}'" + (f" with username '{username}'." if username else "."))
+        if len(matches) > 1:
+            lines = [_format_entry(_public(entry)) for entry in matches[:AMBIGUOUS_LISTED]]
+            if len(matches) > AMBIGUOUS_LISTED:
+                lines.append(f"...and {len(matches) - AMBIGUOUS_LISTED:,} more")
+            raise CommandError(f"'{site}' matches {len(matches):,} entries; pick one with -u USERNAME or its ID:\n"
+                               + "\n".join(lines))
+        return matches[0]
+
+    def get(self, site, username=None):
+        entry = self._find_one(site, username)
+        return {"entry": _public(entry, self.vault.reveal(entry))}
+
+    def list_entries(self, query=""):
+        return {"entries": [_public(entry) for entry in self.search_index.search(query)]}
+
+    def add(self, site, username, password):
+        if not (site.strip() and username.strip() and password):
+            raise CommandError("Site, username and password are all required.")
+        login = (site.strip().casefold(), username.strip().casefold())
+        for entry in self.find(site, username):
+            if (entry["site"].strip().casefold(), entry["username"].strip().casefold()) == login:
+                raise CommandError(f"'{entry['site']}' already has an entry for '{entry['username']}' "
+                                   f"({entry['id']}).")
+        entry = self.vault.add({"site": site.strip(), "username": username.strip(), "password": password})
+        self.search_index.add(entry)
+        self.vault.flush()  # A command only reports success once the change is on disk.
+        return {"entry": _public(entry)}
+
+    def remove(self, site, username=None):
+        entry = self._find_one(site, username)
+        self.vault.delete(entry["id"])
+        self.search_index.remove(entry["id"])
+        self.vault.flush()
+        return {"entry": _public(entry)}
+
+    def merge(self, path, password=None):
+        """Merges the vault file at path into this one; with password, unlocks it with its own master password."""
+        import kdf
+        import sync
+        from vault import read_lock
+        from cryptography.fernet import InvalidToken
+
+        if not os.path.exists(path):
+            raise CommandError(f"No vault at '{path}'.")
+        if os.path.abspath(path) == os.path.abspath(self.vault_path):
+            raise CommandError("A vault cannot be merged with itself.")
+        try:
+            other_fernet = None
+            if password is not None:
+                lock = read_lock(path)
+                if lock is None:
+                    raise CommandError(f"'{path}' has no master password. Open it once in DARX PASS™ to upgrade it.")
+                try:
+                    other_fernet = kdf.vault_fernet(kdf.unlock(password, lock), lock)
+                except InvalidToken:
+                    raise CommandError(f"Incorrect master password for '{path}'.") from None
+            elif not sync.shares_key(self.vault, path):
+                raise CommandError(f"'{path}' is not a copy of this vault, or its key was rotated; "
+                                   f"merge it with -p to unlock it with its master password.")
+            result = sync.merge_vault(self.vault, path, other_fernet)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not merge '{path}': {e}") from None
+        for entry in result.added:
+            self.search_index.add(entry)
+        for entry in result.updated:
+            self.search_index.update(entry)
+        for entry in result.deleted:
+            self.search_index.remove(entry["id"])
+        return {"added": len(result.added), "updated": len(result.updated), "deleted": len(result.deleted),
+                "conflicts": [{**_public(conflict.entry), "theirs": conflict.theirs} for conflict in result.conflicts],
+                "chunks": result.chunks, "chunks_read": result.chunks_read}
+
+    def handle(self, request):
+        """Runs one request ({"op": ..., arguments}) and returns its JSON-able result."""
+        op = request.get("op")
+        with tracing.span("cli.request", op=op):
+            if op not in WRITE_OPS:
+                self.refresh()
+                return self._run(op, request)
+            if not self.writing:
+                self.reload(for_writing=True)
+            try:
+                return self._run(op, request)
+            finally:
+                self.vault.close()
+                self.writing = False
+                self.state = self._current_state()
+
+    def _run(self, op, request):
+        if op == "get":
+            return self.get(request["site"], request.get("username"))
+        if op == "list":
+            return self.list_entries(request.get("query", ""))
+        if op == "add":
+            return self.add(request["site"], request["username"], request["password"])
+        if op == "rm":
+            return self.remove(request["site"], request.get("username"))
+        if op == "merge":
+            return self.merge(request["path"], request.get("password"))
+        if op == "ping":
+            return {"pid": os.getpid(), "entries": len(self.vault.entries)}
+        raise CommandError(f"Unknown request: {op}")
+
+    def close(self):
+        self.vault.close()
+
+
+def unlock(vault_path, password=None, for_writing=False):
+    """Unlocks the vault at vault_path with the master password (prompted for if not given). Returns a Session,
+    holding the vault's lock if for_writing (see Session.reload)."""
+    import kdf
+    from vault import read_lock
+    from cryptography.fernet import InvalidToken
+
+    if not os.path.exists(vault_path):
+        raise CommandError(f"No vault at '{vault_path}'. Create one by starting DARX PASS™ (python main.py).")
+    lock = read_lock(vault_path)
+    if lock is None:
+        raise CommandError(f"The vault at '{vault_path}' predates the master password key derivation. "
+                           f"Open it once in DARX PASS™ to upgrade it.")
+    if password is None:
+        password = getpass.getpass("Master Password: ")
+    try:
+        key = kdf.unlock(password, lock)
+    except InvalidToken:
+        raise CommandError("Incorrect master password.") from None
+    finally:
+        del password
+    return Session(vault_path, key, lock, for_writing)
+
+
+# --- Agent ---
+
+def default_socket_path(vault_path):
+    """Returns the agent socket for a vault: $DARX_AGENT_SOCKET, or one per vault in a private runtime directory."""
+    if os.environ.get(AGENT_SOCKET_ENV):
+        return os.environ[AGENT_SOCKET_ENV]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        runtime_dir = os.path.join(tempfile.gettempdir(), f"darx-{os.getuid()}")
+        os.makedirs(runtime_dir, mode=0o700, exist_ok=True)
+        if os.stat(runtime_dir).st_uid != os.getuid():
+            raise CommandError(f"'{runtime_dir}' belongs to another user; set {AGENT_SOCKET_ENV}.")
+    vault_id = hashlib.sha256(os.path.abspath(vault_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(runtime_dir, f"darx-agent-{vault_id}.sock")
+
+
+def _read_line(conn):
+    data = bytearray()
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_REQUEST_BYTES:
+            raise CommandError("Request too large.")
+    return json.loads(data) if data else None
+
+
+def _send_line(conn, message):
+    conn.sendall(json.dumps(message, separators=(',', ':')).encode('utf-8') + b"\n")
+
+
+def _peer_is_owner(conn):
+    """On Linux, checks that the connecting process runs as this user (the socket mode already should)."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    import struct
+    credentials = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def agent_request(socket_path, request):
+    """Sends one request to a running agent. Returns its response, or None if no agent is listening."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+    with client:
+        _send_line(client, request)
+        return _read_line(client)
+
+
+def _bind(socket_path):
+    if agent_request(socket_path, {"op": "ping"}) is not None:
+        raise CommandError(f"An agent is already running on '{socket_path}'.")
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Left behind by an agent that was killed.
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    return server
+
+
+def serve(session, server, socket_path, idle_seconds=AGENT_IDLE_SECONDS):
+    """Answers requests on server until a stop request or idle_seconds without one."""
+    server.settimeout(idle_seconds)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                return
+            with conn:
+                conn.settimeout(AGENT_REQUEST_TIMEOUT)
+                try:
+                    if not _peer_is_owner(conn):
+                        continue
+                    request = _read_line(conn)
+                    if request is None:
+                        continue
+                    if request.get("op") == "stop":
+                        _send_line(conn, {"ok": True})
+                        return
+                    _send_line(conn, {"ok": True, **session.handle(request)})
+                except (CommandError, KeyError, ValueError) as e:
+                    _send_line(conn, {"ok": False, "error": str(e) if not isinstance(e, KeyError)
+                                      else f"Missing argument: {e}"})
+                except OSError:
+                    continue  # The client went away.
+                except Exception as e:
+                    _send_line(conn, {"ok": False, "error": f"Agent error: {e}"})
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        session.close()
+
+
+def _daemonize():
+    """Forks into the background. Returns in the child only."""
+    if os.fork():
+        os._exit(0)
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+
+def start_agent(vault_path, socket_path, idle_seconds, foreground=False):
+    session = unlock(vault_path)
+    server = _bind(socket_path)
+    print(f"DARX PASS™ agent unlocked {len(session.vault.entries):,} entries; listening on {socket_path}. "
+          f"It locks after {idle_seconds:,} seconds without a request, or with `python cli.py stop`.")
+    if not foreground and hasattr(os, "fork"):
+        sys.stdout.flush()
+        session.vault.flush()  # Nothing may be in flight across the fork; the child starts its own writer.
+        _daemonize()
+    serve(session, server, socket_path, idle_seconds)
+
+
+# --- Commands ---
+
+def _format_entry(entry):
+    return f"{entry['id']}\t{entry['site']}\t{entry['username']}"
+
+
+def _read_new_password():
+    if not sys.stdin.isatty():
+        return sys.stdin.readline().rstrip("\n")
+    password = getpass.getpass("Password: ")
+    if password != getpass.getpass("Confirm Password: "):
+        raise CommandError("Passwords do not match.")
+    return password
+
+
+def _request(args, request):
+    """Runs a request through the agent if one is running, otherwise on a freshly unlocked vault."""
+    if not args.no_agent:
+        response = agent_request(default_socket_path(args.vault), request)
+        if response is not None:
+            if not response.pop("ok"):
+                raise CommandError(response["error"])
+            return response
+    session = unlock(args.vault, for_writing=request["op"] in WRITE_OPS)
+    try:
+        return session.handle(request)
+    finally:
+        session.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="cli.py", description="DARX PASS™ command line.")
+    parser.add_argument("--vault", default=VAULT_FILE, help=f"vault file (default: {VAULT_FILE})")
+    parser.add_argument("--no-agent", action="store_true", help="unlock the vault even if an agent is running")
+    commands = parser.add_subparsers(dest="command", required=True)
+    get_parser = commands.add_parser("get", help="print the password for a site")
+    get_parser.add_argument("site", help="site, or entry ID")
+    get_parser.add_argument("-u", "--username")
+    list_parser = commands.add_parser("list", help="list entries, optionally only those matching a query")
+    list_parser.add_argument("query", nargs="?", default="")
+    add_parser = commands.add_parser("add", help="add an entry; the password is read from the terminal or stdin")
+    add_parser.add_argument("site")
+    add_parser.add_argument("username")
+    rm_parser = commands.add_parser("rm", help="delete an entry")
+    rm_parser.add_argument("site", help="site, or entry ID")
+    rm_parser.add_argument("-u", "--username")
+    merge_parser = commands.add_parser("merge", help="merge in another copy of the vault, e.g. one changed "
+                                                     "on another machine")
+    merge_parser.add_argument("other", help="the other vault file")
+    merge_parser.add_argument("-p", "--password", action="store_true",
+                              help="ask for its master password (for a vault that is not a copy of this one)")
+    agent_parser = commands.add_parser("agent", help="unlock once and answer the other commands in the background")
+    agent_parser.add_argument("--idle-timeout", type=int, default=AGENT_IDLE_SECONDS, metavar="SECONDS")
+    agent_parser.add_argument("--foreground", action="store_true")
+    commands.add_parser("stop", help="stop (lock) the agent")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "agent":
+            start_agent(args.vault, default_socket_path(args.vault), args.idle_timeout, args.foreground)
+        elif args.command == "stop":
+            if agent_request(default_socket_path(args.vault), {"op": "stop"}) is None:
+                raise CommandError("No agent is running.")
+        elif args.command == "get":
+            print(_request(args, {"op": "get", "site": args.site, "username": args.username})["entry"]["password"])
+        elif args.command == "list":
+            for entry in _request(args, {"op": "list", "query": args.query})["entries"]:
+                print(_format_entry(entry))
+        elif args.command == "add":
+            request = {"op": "add", "site": args.site, "username": args.username, "password": _read_new_password()}
+            print(_request(args, request)["entry"]["id"])
+        elif args.command == "rm":
+            entry = _request(args, {"op": "rm", "site": args.site, "username": args.username})["entry"]
+            print(f"Deleted {_format_entry(entry)}")
+        elif args.command == "merge":
+            request = {"op": "merge", "path": os.path.abspath(args.other)}
+            if args.password:
+                request["password"] = getpass.getpass("Master Password of the Other Vault: ")
+            result = _request(args, request)
+            print(f"Merged '{args.other}': {result['added']:,} added, {result['updated']:,} updated, "
+                  f"{result['deleted']:,} deleted (read {result['chunks_read']:,} of its {result['chunks']:,} chunks).")
+            for conflict in result["conflicts"]:
+                kept = "the other vault's" if conflict["theirs"] else "this vault's"
+                print(f"Conflict: {_format_entry(conflict)}\tedited in both, kept {kept} newer edit")
+    except CommandError as e:
+        print(f"darx: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    tracing.configure(sys.argv)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,153 @@
+#
+# codec.py - DARX PASS™ binary entry encoding
+# Author: DARX Tech
+#
+# A compact, versioned replacement for json.dumps(entries) inside vault chunks.
+# Entries are stored by column rather than by row, so field names are written
+# once in a schema header instead of once per entry:
+#
+#   b"DXB" + version byte
+#   u32 entry count | u8 column count
+#   per column:  u8 name length, name (utf-8), type byte (b"s" str / b"i" int), u8 flags
+#   per column:  str -> u32 byte length, utf-8 text of the values joined by NUL
+#                       (FLAG_LENGTHS: count x u32 lengths in code points, then the
+#                       values concatenated; used when a value contains a NUL)
+#                int -> count x i64 values
+#                then, with FLAG_MISSING, one presence byte per entry
+#
+# All integers are little-endian. Decoding splits or slices each column out of a
+# single decoded string, so the per-entry work stays in C.
+#
+# This module must not import Qt.
+#
+
+import sys
+import json
+import struct
+from array import array
+from itertools import accumulate, repeat
+
+CODEC_MAGIC = b"DXB"
+CODEC_VERSION = 1
+SEPARATOR = "\x00"
+FLAG_MISSING = 0x01
+FLAG_LENGTHS = 0x02
+
+_U32 = struct.Struct("<I")
+_SWAP = sys.byteorder != "little"
+
+
+def _le_bytes(values):
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _le_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+def is_binary(data):
+    return data[:len(CODEC_MAGIC)] == CODEC_MAGIC
+
+
+def encode_entries(entries):
+    """Encodes a list of flat dicts with str or int values."""
+    columns = {}
+    for entry in entries:
+        for name, value in entry.items():
+            if name not in columns:
+                columns[name] = int if isinstance(value, int) else str
+
+    parts = [CODEC_MAGIC, bytes([CODEC_VERSION]), _U32.pack(len(entries)), bytes([len(columns)])]
+    bodies = []
+    for name, kind in columns.items():
+        values = [entry.get(name) for entry in entries]
+        flags = 0
+        presence = None
+        if None in values:
+            flags |= FLAG_MISSING
+            presence = bytes(value is not None for value in values)
+            values = [(kind() if value is None else value) for value in values]
+
+        if kind is str:
+            text = SEPARATOR.join(values)
+            if text.count(SEPARATOR) != max(len(values) - 1, 0):
+                flags |= FLAG_LENGTHS
+                bodies.append(_le_bytes(array('I', map(len, values))))
+                text = "".join(values)
+            text = text.encode('utf-8')
+            bodies += [_U32.pack(len(text)), text]
+        else:
+            bodies.append(_le_bytes(array('q', values)))
+        if presence is not None:
+            bodies.append(presence)
+
+        encoded_name = name.encode('utf-8')
+        parts += [bytes([len(encoded_name)]), encoded_name, b"s" if kind is str else b"i", bytes([flags])]
+    return b"".join(parts + bodies)
+
+
+def decode_entries(data):
+    """Decodes encode_entries() output back into a list of dicts."""
+    if not is_binary(data):
+        raise ValueError("Not a binary entry block.")
+    if data[3] != CODEC_VERSION:
+        raise ValueError(f"Unsupported entry encoding version: {data[3]}")
+    view = memoryview(data)
+    count = _U32.unpack_from(view, 4)[0]
+    position = 9
+    schema = []
+    for _ in range(view[8]):
+        name_length = view[position]
+        name = bytes(view[position + 1:position + 1 + name_length]).decode('utf-8')
+        position += 1 + name_length
+        schema.append((name, bytes(view[position:position + 1]), view[position + 1]))
+        position += 2
+    if not schema:
+        return [{} for _ in range(count)]
+
+    names, columns, sparse = [], [], False
+    for name, kind, flags in schema:
+        if kind == b"s":
+            lengths = None
+            if flags & FLAG_LENGTHS:
+                lengths = _le_array('I', view[position:position + 4 * count])
+                position += 4 * count
+            text_length = _U32.unpack_from(view, position)[0]
+            position += 4
+            text = bytes(view[position:position + text_length]).decode('utf-8')
+            position += text_length
+            if lengths is None:
+                values = text.split(SEPARATOR) if count else []
+            else:
+                offsets = list(accumulate(lengths, initial=0))
+                values = list(map(text.__getitem__, map(slice, offsets, offsets[1:])))
+        elif kind == b"i":
+            values = _le_array('q', view[position:position + 8 * count]).tolist()
+            position += 8 * count
+        else:
+            raise ValueError(f"Unknown column type: {kind!r}")
+        if flags & FLAG_MISSING:
+            values = [value if present else None for value, present in zip(values, view[position:position + count])]
+            position += count
+            sparse = True
+        names.append(name)
+        columns.append(values)
+
+    entries = list(map(dict, map(zip, repeat(names), zip(*columns))))
+    if sparse:
+        entries = [{name: value for name, value in entry.items() if value is not None} for entry in entries]
+    return entries
+
+
+def decode_any(data):
+    """Decodes a binary entry block, or the JSON list it replaced. Returns (entries, was_json)."""
+    if is_binary(data):
+        return decode_entries(data), False
+    return json.loads(data), True
@@ -0,0 +1,70 @@
+#
+# generator.py - DARX PASS™ password generator
+# Author: DARX Tech
+#
+# Generates passwords with the secrets module under a PasswordPolicy: the length,
+# which character classes to use (each one used appears at least once) and
+# whether to leave out characters that are easily mistaken for one another
+# (l, 1, I, |, O, 0, o). A password is never drawn again for missing a class:
+# its other characters are drawn from the whole alphabet, then one character of
+# every class is inserted at a random position. All of these choices are read,
+# as the digits of a mixed-radix number, off a single secrets.randbelow() per
+# password, so a password costs one read of the system's random source and the
+# same time whatever the policy.
+#
+# This module must not import Qt.
+#
+
+import math
+import secrets
+from collections import namedtuple
+
+# --- Configuration Constants ---
+MIN_LENGTH = 8
+MAX_LENGTH = 128
+DEFAULT_LENGTH = 20
+LOWERCASE = "abcdefghijklmnopqrstuvwxyz"
+UPPERCASE = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DIGITS = "0123456789"
+SYMBOLS = "!#$%&*+-.:;=?@^_~"   # No quotes, backslashes or spaces, which break config files and shells.
+AMBIGUOUS = "lI1|O0o"
+
+PasswordPolicy = namedtuple("PasswordPolicy", "length lowercase uppercase digits symbols exclude_ambiguous",
+                            defaults=(DEFAULT_LENGTH, True, True, True, True, True))
+
+
+def character_classes(policy):
+    """Returns the character classes the policy uses, without look-alikes if it excludes them.
+    Raises ValueError for a policy no password can meet."""
+    if not MIN_LENGTH <= policy.length <= MAX_LENGTH:
+        raise ValueError(f"Passwords must be {MIN_LENGTH} to {MAX_LENGTH} characters long.")
+    used = (policy.lowercase, policy.uppercase, policy.digits, policy.symbols)
+    classes = [chars for chars, use in zip((LOWERCASE, UPPERCASE, DIGITS, SYMBOLS), used) if use]
+    if policy.exclude_ambiguous:
+        classes = ["".join(ch for ch in chars if ch not in AMBIGUOUS) for chars in classes]
+    if not classes:
+        raise ValueError("Pick at least one kind of character.")
+    return classes
+
+
+def generate_passwords(count, policy=PasswordPolicy()):
+    """Returns count new passwords meeting policy."""
+    classes = character_classes(policy)
+    alphabet = "".join(classes)
+    size = len(alphabet)
+    fill = policy.length - len(classes)
+    # Digits: fill characters, then for each class its character and where it goes among those before it.
+    space = size ** fill * math.prod(len(chars) * (fill + 1 + index) for index, chars in enumerate(classes))
+    passwords = []
+    for _ in range(count):
+        value = secrets.randbelow(space)
+        chars = []
+        for _ in range(fill):
+            value, digit = divmod(value, size)
+            chars.append(alphabet[digit])
+        for chars_of_class in classes:
+            value, digit = divmod(value, len(chars_of_class))
+            value, position = divmod(value, len(chars) + 1)
+            chars.insert(position, chars_of_class[digit])
+        passwords.append("".join(chars))
+    return passwords
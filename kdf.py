@@ -0,0 +1,136 @@
+#
+# kdf.py - DARX PASS™ master password key derivation
+# Author: DARX Tech
+#
+# The vault is encrypted with a random Fernet key (the data key). The data key
+# is stored in the vault's plaintext lock header, wrapped with a second Fernet
+# key derived from the master password by scrypt with a per-vault salt:
+#
+#   {"kdf": "scrypt", "salt": <base64>, "n": 2**k, "r": 8, "p": 1,
+#    "unlock_ms": <measured at calibration>, "key": <data key wrapped by the derived key>}
+#
+# The scrypt cost is calibrated on the current machine to take about
+# KDF_TARGET_SECONDS, so unlocking is neither free nor painful. Re-tuning the cost or
+# changing the master password only re-wraps the data key; the vault itself is not
+# re-encrypted.
+#
+# Rotating the data key does re-encrypt the vault, in the background (see
+# VaultStore.begin_key_rotation). Until it is done, the lock header wraps the new
+# data key and keeps the keys it replaces, wrapped under the new one:
+#
+#   {..., "key": <new data key wrapped>, "retired_keys": [<old data key wrapped by the new one>, ...]}
+#
+# vault_fernet() then encrypts with the new key and still decrypts with the old ones.
+#
+# This module must not import Qt.
+#
+
+import os
+import math
+import time
+import base64
+
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+import tracing
+
+# --- Configuration Constants ---
+KDF_NAME = "scrypt"
+KDF_TARGET_SECONDS = 0.3    # Unlock latency the calibration aims for.
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MIN_LOG2_N = 14      # 16 MiB; never go below this, however slow the machine.
+SCRYPT_MAX_LOG2_N = 20      # 1 GiB of memory with r=8.
+CALIBRATION_LOG2_N = 14
+SALT_BYTES = 16
+
+
+def _scrypt(password, salt, n, r, p):
+    key = Scrypt(salt=salt, length=32, n=n, r=r, p=p).derive(password.encode('utf-8'))
+    return base64.urlsafe_b64encode(key)
+
+
+@tracing.traced("kdf.derive_key")
+def derive_key(password, lock):
+    """Derives the Fernet key that wraps the data key, from the master password and a lock header."""
+    return _scrypt(password, base64.b64decode(lock["salt"]), lock["n"], lock["r"], lock["p"])
+
+
+@tracing.traced("kdf.calibrate")
+def calibrate(target_seconds=KDF_TARGET_SECONDS):
+    """Returns the scrypt parameters that take about target_seconds to derive a key on this machine."""
+    # scrypt's running time is linear in n, so time a cheap derivation and scale it.
+    salt = os.urandom(SALT_BYTES)
+    start = time.perf_counter()
+    _scrypt("calibration", salt, 2 ** CALIBRATION_LOG2_N, SCRYPT_R, SCRYPT_P)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    log2_n = CALIBRATION_LOG2_N + math.floor(math.log2(target_seconds / elapsed) + 0.5)
+    log2_n = min(max(log2_n, SCRYPT_MIN_LOG2_N), SCRYPT_MAX_LOG2_N)
+    return {"n": 2 ** log2_n, "r": SCRYPT_R, "p": SCRYPT_P,
+            "unlock_ms": round(elapsed * 2 ** (log2_n - CALIBRATION_LOG2_N) * 1000)}
+
+
+def create_lock(password, data_key, target_seconds=KDF_TARGET_SECONDS):
+    """Calibrates scrypt and returns a lock header holding data_key wrapped under the master password."""
+    lock = {"kdf": KDF_NAME, "salt": base64.b64encode(os.urandom(SALT_BYTES)).decode('ascii'),
+            **calibrate(target_seconds)}
+    lock["key"] = Fernet(derive_key(password, lock)).encrypt(data_key).decode('ascii')
+    return lock
+
+
+def _wrapping_fernet(password, lock):
+    if lock.get("kdf") != KDF_NAME:
+        raise ValueError(f"Unsupported key derivation: {lock.get('kdf')}")
+    return Fernet(derive_key(password, lock))
+
+
+def unlock(password, lock):
+    """Returns the data key from a lock header. Raises InvalidToken if the password is wrong."""
+    return _wrapping_fernet(password, lock).decrypt(lock["key"].encode('ascii'))
+
+
+def retune(password, lock, target_seconds=KDF_TARGET_SECONDS):
+    """Re-calibrates the scrypt cost for this machine, with a fresh salt. Returns the new lock header."""
+    new_lock = create_lock(password, unlock(password, lock), target_seconds)
+    if "retired_keys" in lock:
+        new_lock["retired_keys"] = lock["retired_keys"]  # Wrapped by the data key, which has not changed.
+    return new_lock
+
+
+# --- Key Rotation ---
+
+def rotate_key(password, lock):
+    """Replaces the data key with a fresh one. Returns (new data key, lock header) with the new key wrapped
+    under the master password and the replaced keys kept as "retired_keys" until the vault is re-encrypted.
+    Raises InvalidToken if the password is wrong."""
+    wrapping = _wrapping_fernet(password, lock)
+    old_key = wrapping.decrypt(lock["key"].encode('ascii'))
+    new_key = Fernet.generate_key()
+    wrap = Fernet(new_key)
+    retired = [old_key] + retired_keys(old_key, lock)
+    new_lock = {**lock, "key": wrapping.encrypt(new_key).decode('ascii'),
+                "retired_keys": [wrap.encrypt(key).decode('ascii') for key in retired]}
+    return new_key, new_lock
+
+
+def retired_keys(data_key, lock):
+    """Returns the data keys an unfinished rotation to data_key is replacing, newest first."""
+    if not lock or not lock.get("retired_keys"):
+        return []
+    unwrap = Fernet(data_key)
+    return [unwrap.decrypt(key.encode('ascii')) for key in lock["retired_keys"]]
+
+
+def vault_fernet(data_key, lock):
+    """Returns what the vault is encrypted with: Fernet(data_key), or while a rotation is unfinished, a
+    MultiFernet that encrypts with data_key and still decrypts with the retired keys."""
+    retired = retired_keys(data_key, lock)
+    if not retired:
+        return Fernet(data_key)
+    return MultiFernet([Fernet(key) for key in [data_key] + retired])
+
+
+def end_rotation(lock):
+    """Returns the lock header without the retired keys, once the vault no longer needs them."""
+    return {name: value for name, value in lock.items() if name != "retired_keys"}
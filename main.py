@@ -16,34 +16,82 @@
 
 import sys
 import os
-import json
 import time
 import hashlib
 import hmac
-import re
+import importlib
+from collections import namedtuple
 
-from cryptography.fernet import Fernet, InvalidToken
+import breach
+import generator
+import strength
+import tracing
+from vault import VaultStore, VaultInUse, read_lock
+from search import SearchIndex
 
 from PySide6.QtCore import (
-    Qt, QSize, QTimer, Slot
-)
-from PySide6.QtGui import (
-    QIcon, QFont, QAction
+    Qt, QSize, QTimer, Slot, Signal, QEvent, QObject, QRunnable, QThreadPool,
+    QAbstractTableModel, QModelIndex
 )
+from PySide6.QtGui import QIcon, QFont
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QFrame, QStackedWidget, QTableWidget,
-    QTableWidgetItem, QHeaderView, QLineEdit, QDialog, QFormLayout,
+    QPushButton, QLabel, QFrame, QStackedWidget, QTableView,
+    QHeaderView, QLineEdit, QDialog, QFormLayout,
     QMessageBox, QGraphicsDropShadowEffect, QButtonGroup, QDialogButtonBox,
-    QSpacerItem, QSizePolicy, QAbstractItemView
+    QSpacerItem, QSizePolicy, QAbstractItemView, QStyledItemDelegate,
+    QStyleOptionButton, QStyle, QInputDialog, QTreeWidget, QTreeWidgetItem, QFileDialog, QComboBox,
+    QSpinBox, QCheckBox, QPlainTextEdit
 )
 
+# --- Deferred Imports ---
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+# Not needed to show the login dialog, so they are imported when first used instead of
+# delaying it (cryptography alone costs about as much as the rest of the app's modules).
+fernet = LazyModule("cryptography.fernet")
+kdf = LazyModule("kdf")
+audit = LazyModule("audit")
+transfer = LazyModule("transfer")
+vaults = LazyModule("vaults")
+sync = LazyModule("sync")
+
+
 # --- Configuration Constants ---
 VAULT_FILE = "vault_data.json"
-KEY_FILE = "key.key"
-MASTER_HASH_FILE = "master.hash"  # Stores the SHA-256 hash of the master password.
+KEY_FILE = "key.key"              # Pre-KDF plaintext vault key; moved into the vault's lock header on first unlock.
+MASTER_HASH_FILE = "master.hash"  # Pre-KDF SHA-256 of the master password; removed along with KEY_FILE.
+BREACH_CORPUS_FILE = breach.DEFAULT_BREACH_FILE  # Optional; made with `python breach.py convert`.
 WINDOW_SIZE = QSize(1080, 720)
 SIDEBAR_WIDTH = 220
+TABLE_ROW_HEIGHT = 40
+TABLE_BUTTON_COLUMN_WIDTH = 100
+LOAD_BATCH_SIZE = 2000  # Rows handed to the table per batch while the vault loads.
+STRENGTH_DEBOUNCE_MS = 150  # Quiet time after a keystroke before the password is scored.
+STRENGTH_COLORS = {"Weak": "#f43f5e", "Medium": "#f97316", "Strong": "#10b981"}
+PASSWORDS_PAGE, SETTINGS_PAGE, AUDIT_PAGE = range(3)
+AUDIT_MAX_ROWS = 500  # Rows listed per audit section; the count in its title is always complete.
+MERGE_CONFLICTS_LISTED = 10  # Conflicts named in the merge summary.
+VAULT_EVICT_CHECK_MS = 60_000  # How often cached vaults are checked for idleness; see vaults.py.
+HISTORY_FIELD_NAMES = {"site": "site", "username": "username", "secret": "password"}  # Shown in the history dialog.
+VAULT_FILTER = "DARX PASS™ vaults (*.json);;All files (*)"
+IMPORT_FILTER = "Password exports (*.csv *.json *.darx);;All files (*)"
+EXPORT_FILTERS = {  # File dialog filter -> (content, encrypted)
+    "Encrypted DARX export (*.darx)": ("csv", True),
+    "CSV (*.csv)": ("csv", False),
+    "JSON (*.json)": ("json", False),
+}
 
 
 # --- STYLESHEETS ---
@@ -73,6 +121,7 @@ def get_stylesheet(theme='dark'):
             font-size: 8pt;
             color: #6c757d; /* Muted gray for light bg */
         }
+        QLabel#StatusLabel { color: #6c757d; }
         /* Buttons */
         QPushButton {
             border: 1px solid #cccccc;
@@ -82,6 +131,11 @@ def get_stylesheet(theme='dark'):
         }
         QPushButton:hover { background-color: #f5f5f5; }
         QPushButton:pressed { background-color: #e0e0e0; }
+        QPushButton:checked {
+            background-color: #0d6efd;
+            color: #ffffff;
+            border: none;
+        }
         QPushButton#PrimaryButton {
             background-color: #0d6efd;
             color: #ffffff;
@@ -114,7 +168,7 @@ def get_stylesheet(theme='dark'):
             font-weight: bold;
         }
         /* Table */
-        QTableWidget {
+        QTableView, QTreeView {
             background-color: #ffffff;
             border: 1px solid #cccccc;
             border-radius: 6px;
@@ -127,8 +181,8 @@ def get_stylesheet(theme='dark'):
             border-bottom: 1px solid #cccccc;
             font-weight: bold;
         }
-        QTableWidget::item { padding: 5px; }
-        QTableWidget::item:selected {
+        QTableView::item, QTreeView::item { padding: 5px; }
+        QTableView::item:selected, QTreeView::item:selected {
             background-color: #0d6efd;
             color: #ffffff;
         }
@@ -139,6 +193,12 @@ def get_stylesheet(theme='dark'):
             padding: 8px;
             border-radius: 6px;
         }
+        QComboBox {
+            background-color: #ffffff;
+            border: 1px solid #cccccc;
+            padding: 6px 8px;
+            border-radius: 6px;
+        }
         QDialog { background-color: #f0f0f0; }
         /* ScrollBar */
         QScrollBar:vertical {
@@ -186,6 +246,7 @@ def get_stylesheet(theme='dark'):
         font-size: 8pt;
         color: #6a6a7f; /* Muted gray for dark bg */
     }
+    QLabel#StatusLabel { color: #6a6a7f; }
     /* Buttons */
     QPushButton {
         border: 1px solid #3c3c5a;
@@ -195,6 +256,11 @@ def get_stylesheet(theme='dark'):
     }
     QPushButton:hover { background-color: #383854; }
     QPushButton:pressed { background-color: #252538; }
+    QPushButton:checked {
+        background-color: #1f6feb;
+        color: #ffffff;
+        border: 1px solid #1f6feb;
+    }
     QPushButton#PrimaryButton {
         background-color: #1f6feb;
         color: #ffffff;
@@ -229,7 +295,7 @@ def get_stylesheet(theme='dark'):
         font-weight: bold;
     }
     /* Table */
-    QTableWidget {
+    QTableView, QTreeView {
         background-color: #161625;
         border: 1px solid #2a2a3f;
         border-radius: 6px;
@@ -243,8 +309,8 @@ def get_stylesheet(theme='dark'):
         font-weight: bold;
         color: #ffffff;
     }
-    QTableWidget::item { padding: 5px; border-bottom: 1px solid #2a2a3f; }
-    QTableWidget::item:selected {
+    QTableView::item, QTreeView::item { padding: 5px; border-bottom: 1px solid #2a2a3f; }
+    QTableView::item:selected, QTreeView::item:selected {
         background-color: #1f6feb;
         color: #ffffff;
     }
@@ -257,6 +323,13 @@ def get_stylesheet(theme='dark'):
         color: #c9c9d1;
     }
     QLineEdit:focus { border: 1px solid #1f6feb; }
+    QComboBox {
+        background-color: #2e2e48;
+        border: 1px solid #3c3c5a;
+        padding: 6px 8px;
+        border-radius: 6px;
+        color: #ffffff;
+    }
     QDialog { background-color: #1e1e2e; }
     /* ScrollBar */
     QScrollBar:vertical {
@@ -281,6 +354,34 @@ def get_stylesheet(theme='dark'):
     """
 
 
+class ThemeManager:
+    """Builds each theme's stylesheet once and applies it to the application or to one window.
+    Dialogs inherit the theme from their parent (or the application) instead of parsing a copy."""
+
+    SHADOW_COLORS = {'dark': "#1f6feb", 'light': "#0a58ca"}
+
+    def __init__(self):
+        self._stylesheets = {}
+
+    def stylesheet(self, theme):
+        if theme not in self._stylesheets:
+            self._stylesheets[theme] = get_stylesheet(theme)
+        return self._stylesheets[theme]
+
+    @tracing.traced("theme.apply")
+    def apply(self, theme, widget=None):
+        """Themes widget and its children, or every window and dialog if widget is None.
+        Restyling the application repolishes every widget in it, so switching the theme
+        of a window is cheaper done on the window itself."""
+        target = widget if widget is not None else QApplication.instance()
+        stylesheet = self.stylesheet(theme)
+        if target.styleSheet() != stylesheet:
+            target.setStyleSheet(stylesheet)
+
+
+theme_manager = ThemeManager()
+
+
 # --- Authentication Dialogs ---
 
 class CreateMasterPasswordDialog(QDialog):
@@ -349,13 +450,52 @@ class LoginDialog(QDialog):
         return self.password_input.text()
 
 
+# --- Password Generator Controls ---
+class PasswordPolicyWidget(QWidget):
+    """Length and character class controls for generator.generate_passwords()."""
+
+    def __init__(self, policy, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.length_input = QSpinBox()
+        self.length_input.setRange(generator.MIN_LENGTH, generator.MAX_LENGTH)
+        self.length_input.setValue(policy.length)
+        self.length_input.setToolTip("Length")
+        layout.addWidget(self.length_input)
+        self.class_boxes = []
+        for label, checked in zip(("a-z", "A-Z", "0-9", "#$%"), policy[1:5]):
+            box = QCheckBox(label)
+            box.setChecked(checked)
+            box.toggled.connect(self.keep_one_class)
+            layout.addWidget(box)
+            self.class_boxes.append(box)
+        self.ambiguous_box = QCheckBox("No look-alikes")
+        self.ambiguous_box.setChecked(policy.exclude_ambiguous)
+        self.ambiguous_box.setToolTip(f"Leaves out {' '.join(generator.AMBIGUOUS)}")
+        layout.addWidget(self.ambiguous_box)
+        layout.addStretch()
+        self.keep_one_class()
+
+    def keep_one_class(self):
+        """The last checked character class cannot be unchecked."""
+        checked = [box for box in self.class_boxes if box.isChecked()]
+        for box in self.class_boxes:
+            box.setEnabled(checked != [box])
+
+    def policy(self):
+        return generator.PasswordPolicy(self.length_input.value(), *(box.isChecked() for box in self.class_boxes),
+                                        self.ambiguous_box.isChecked())
+
+
 # --- Add Password Dialog ---
 class AddPasswordDialog(QDialog):
-    """Dialog for adding a new password entry."""
+    """Dialog for adding a new password entry, or editing an existing one."""
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, entry=None, breach_corpus=None, show_history=None, policy=None):
         super().__init__(parent)
-        self.setWindowTitle("Add New Password")
+        self.setWindowTitle("Edit Password" if entry else "Add New Password")
+        self.breach_corpus = breach_corpus
         self.setMinimumWidth(400)
         self.setModal(True)
 
@@ -364,7 +504,13 @@ class AddPasswordDialog(QDialog):
         self.username_input = QLineEdit()
         self.password_input = QLineEdit()
         self.password_input.setEchoMode(QLineEdit.Password)
-        self.password_input.textChanged.connect(self.check_password_strength)
+
+        # Scoring waits until typing pauses, so fast typing never queues up work.
+        self.strength_timer = QTimer(self)
+        self.strength_timer.setSingleShot(True)
+        self.strength_timer.setInterval(STRENGTH_DEBOUNCE_MS)
+        self.strength_timer.timeout.connect(self.update_password_strength)
+        self.password_input.textChanged.connect(self.schedule_strength_check)
 
         # Password visibility toggle
         self.password_visibility_action = self.password_input.addAction(
@@ -377,41 +523,72 @@ class AddPasswordDialog(QDialog):
         self.layout.addRow("Site URL/Name:", self.site_input)
         self.layout.addRow("Username/Email:", self.username_input)
         self.layout.addRow("Password:", self.password_input)
+        generator_row = QHBoxLayout()
+        self.policy_widget = PasswordPolicyWidget(policy or generator.PasswordPolicy())
+        generator_row.addWidget(self.policy_widget)
+        generate_button = QPushButton("🎲 Generate")
+        generate_button.setToolTip("Fills in a random password with the length and characters on the left")
+        generate_button.clicked.connect(self.generate_password)
+        generator_row.addWidget(generate_button)
+        self.layout.addRow("Generator:", generator_row)
+        if entry:
+            self.site_input.setText(entry["site"])
+            self.username_input.setText(entry["username"])
+            self.password_input.setText(entry["password"])
 
         # Password strength indicator
         self.strength_label = QLabel("")
         self.strength_label.setAlignment(Qt.AlignCenter)
+        self.strength_label.setWordWrap(True)
         self.layout.addRow(self.strength_label)
+        if entry:
+            self.strength_timer.stop()
+            self.update_password_strength()
 
         buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)
         buttons.rejected.connect(self.reject)
         buttons.button(QDialogButtonBox.Save).setObjectName("PrimaryButton")
+        if show_history is not None:
+            history_button = buttons.addButton("🕘 History", QDialogButtonBox.ResetRole)
+            history_button.setToolTip("Earlier versions of this entry")
+            history_button.clicked.connect(lambda: show_history(self))
         self.layout.addRow(buttons)
 
+    @Slot(str)
+    def schedule_strength_check(self, password):
+        if password:
+            self.strength_timer.start()  # Restarts the countdown on every keystroke.
+        else:
+            self.strength_timer.stop()
+            self.check_password_strength(password)
+
+    def update_password_strength(self):
+        self.check_password_strength(self.password_input.text())
+
     def check_password_strength(self, password):
-        """Checks password and updates strength indicator label."""
-        score = 0
-        if not password:
+        """Scores the password and updates the strength indicator label."""
+        result = strength.evaluate(password)
+        if not result.label:
             self.strength_label.setText("")
             return
-
-        if len(password) >= 8: score += 1
-        if len(password) >= 12: score += 1
-        if re.search(r'[a-z]', password): score += 1
-        if re.search(r'[A-Z]', password): score += 1
-        if re.search(r'\d', password): score += 1
-        if re.search(r'[^a-zA-Z0-9]', password): score += 1
-
-        if score < 3:
-            self.strength_label.setText("Weak")
-            self.strength_label.setStyleSheet("color: #f43f5e; font-weight: bold;")
-        elif score < 5:
-            self.strength_label.setText("Medium")
-            self.strength_label.setStyleSheet("color: #f97316; font-weight: bold;")  # Orange
-        else:
-            self.strength_label.setText("Strong")
-            self.strength_label.setStyleSheet("color: #10b981; font-weight: bold;")  # Green
+        text = f"{result.label} (~{result.bits:.0f} bits)"
+        if result.warnings:
+            text += "\nAvoid " + ", ".join(result.warnings)
+        breaches = self.breach_corpus.count(password) if self.breach_corpus is not None else 0
+        if breaches:
+            result = result._replace(label="Weak")
+            text = f"Breached – seen {breaches:,} times in leaked password lists\n{text}"
+        self.strength_label.setText(text)
+        if self.strength_label.property("strength") != result.label:
+            self.strength_label.setProperty("strength", result.label)
+            self.strength_label.setStyleSheet(f"color: {STRENGTH_COLORS[result.label]}; font-weight: bold;")
+
+    def generate_password(self):
+        self.password_input.setText(generator.generate_passwords(1, self.policy_widget.policy())[0])
+        self.password_visibility_action.setChecked(True)  # So it can be read, or noted down.
+        self.strength_timer.stop()
+        self.update_password_strength()
 
     def toggle_password_visibility(self, checked):
         self.password_input.setEchoMode(QLineEdit.Normal if checked else QLineEdit.Password)
@@ -429,66 +606,656 @@ class AddPasswordDialog(QDialog):
         }
 
 
+# --- Bulk Generate Dialog ---
+class BulkGenerateDialog(QDialog):
+    """Dialog for adding many entries at once, each with a generated password."""
+
+    def __init__(self, parent=None, policy=None):
+        super().__init__(parent)
+        self.setWindowTitle("Generate Passwords")
+        self.setMinimumWidth(480)
+        self.setModal(True)
+
+        self.layout = QFormLayout(self)
+        self.sites_input = QPlainTextEdit()
+        self.sites_input.setPlaceholderText("One site per line; add \", username\" to give it its own username.\n"
+                                            "db01.internal\nbackup.internal, svc-backup")
+        self.username_input = QLineEdit()
+        self.username_input.setPlaceholderText("For the sites without a username of their own")
+        self.policy_widget = PasswordPolicyWidget(policy or generator.PasswordPolicy())
+        self.layout.addRow("Sites:", self.sites_input)
+        self.layout.addRow("Username/Email:", self.username_input)
+        self.layout.addRow("Passwords:", self.policy_widget)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Save).setText("Generate")
+        buttons.button(QDialogButtonBox.Save).setObjectName("PrimaryButton")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        self.layout.addRow(buttons)
+
+    def get_logins(self):
+        """Returns [(site, username), ...] in the order listed; username is "" if there is none."""
+        default_username = self.username_input.text().strip()
+        logins = []
+        for line in self.sites_input.toPlainText().splitlines():
+            site, _, username = line.partition(",")
+            if site.strip():
+                logins.append((site.strip(), username.strip() or default_username))
+        return logins
+
+
+# --- Password History Dialog ---
+class PasswordHistoryDialog(QDialog):
+    """Lists an entry's earlier versions, newest first, and copies the password of the selected one."""
+
+    def __init__(self, parent, entry, versions, copy_secret):
+        super().__init__(parent)
+        self.setWindowTitle(f"History – {entry['site']}")
+        self.setMinimumWidth(560)
+        self.setModal(True)
+        self.versions = versions
+        self.copy_secret = copy_secret
+
+        layout = QVBoxLayout(self)
+        if not versions:
+            layout.addWidget(QLabel("No earlier versions: this entry has not been edited."))
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Replaced", "Site", "Username", "Changed"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.header().setSectionResizeMode(QHeaderView.Stretch)
+        self.tree.addTopLevelItems([
+            QTreeWidgetItem([time.strftime("%Y-%m-%d %H:%M", time.localtime(version["replaced"])),
+                             version["site"], version["username"],
+                             ", ".join(HISTORY_FIELD_NAMES[field] for field in version["changed"])])
+            for version in versions])
+        self.tree.itemDoubleClicked.connect(self.copy_selected)
+        layout.addWidget(self.tree)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+        self.copy_button = buttons.addButton("Copy Password", QDialogButtonBox.ActionRole)
+        self.copy_button.setObjectName("PrimaryButton")
+        self.copy_button.setEnabled(False)
+        self.copy_button.clicked.connect(self.copy_selected)
+        self.tree.itemSelectionChanged.connect(
+            lambda: self.copy_button.setEnabled(bool(self.tree.selectedItems())))
+        layout.addWidget(buttons)
+
+    def copy_selected(self):
+        item = self.tree.currentItem()
+        if item is not None:
+            self.copy_secret(self.versions[self.tree.indexOfTopLevelItem(item)])
+            self.copy_button.setText("Copied!")
+            QTimer.singleShot(2000, lambda: self.copy_button.setText("Copy Password"))
+
+
+# --- Password Table Model ---
+GroupRow = namedtuple("GroupRow", "domain count")  # Heads the entries of one domain in the grouped view.
+
+
+class PasswordTableModel(QAbstractTableModel):
+    """Read-only table model over the vault entries. Only visible rows are ever queried.
+
+    The model keeps its own list of rows so each mutation can be announced to the
+    view as a single row insert/remove/update instead of a full reset. In the
+    group-by-domain view, a GroupRow precedes the entries of each domain.
+    """
+
+    SITE, USERNAME, PASSWORD, COPY, EDIT, DELETE = range(6)
+    HEADERS = ["Site", "Username", "Password", "Copy", "Edit", "Delete"]
+    SORT_FIELDS = {SITE: "site", USERNAME: "username"}  # Sortable columns -> SearchIndex sort fields.
+
+    def __init__(self, entries, parent=None):
+        super().__init__(parent)
+        self.rows = list(entries)
+        self._rows_by_id = None     # entry id -> row; built when first needed after the rows are reset.
+        self.copied_id = None
+        self.group_font = QFont()
+        self.group_font.setBold(True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if isinstance(row, GroupRow):
+            return self.group_data(row, index.column(), role)
+        if role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == self.SITE:
+            return self.rows[index.row()]["site"]
+        if column == self.USERNAME:
+            return self.rows[index.row()]["username"]
+        if column == self.PASSWORD:
+            return "******"
+        if column == self.COPY:
+            return "Copied!" if self.rows[index.row()]["id"] == self.copied_id else "Copy"
+        if column == self.EDIT:
+            return "Edit"
+        return "Delete"
+
+    def group_data(self, group, column, role):
+        if role == Qt.FontRole:
+            return self.group_font
+        if role != Qt.DisplayRole:
+            return None
+        if column == self.SITE:
+            return f"🌐 {group.domain or '(no site)'}"
+        if column == self.USERNAME:
+            return f"{group.count:,} login{'s' if group.count != 1 else ''}"
+        return None  # No buttons: ButtonDelegate leaves the cell empty.
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def entry(self, row):
+        """Returns the entry shown in row, or None if it is a GroupRow."""
+        entry = self.rows[row]
+        return None if isinstance(entry, GroupRow) else entry
+
+    def row_of(self, entry_id):
+        """Returns the row showing entry_id, or None if it is not shown."""
+        if self._rows_by_id is None:
+            self._rows_by_id = {entry["id"]: row for row, entry in enumerate(self.rows)
+                                if not isinstance(entry, GroupRow)}
+        return self._rows_by_id.get(entry_id)
+
+    def reset_entries(self, entries):
+        self.beginResetModel()
+        self.rows = list(entries)
+        self._rows_by_id = None
+        self.copied_id = None
+        self.endResetModel()
+
+    def reset_groups(self, groups):
+        """Shows [(domain, [entry, ...]), ...], each group headed by a GroupRow."""
+        rows = []
+        for domain, entries in groups:
+            rows.append(GroupRow(domain, len(entries)))
+            rows.extend(entries)
+        self.reset_entries(rows)
+
+    def append_entry(self, entry):
+        self.append_entries([entry])
+
+    def append_entries(self, entries):
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self.rows.extend(entries)
+        if self._rows_by_id is not None:
+            self._rows_by_id.update((entry["id"], row) for row, entry in enumerate(entries, first))
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self._rows_by_id = None  # The rows below moved up.
+        self.endRemoveRows()
+
+    def update_row(self, row, entry):
+        self.rows[row] = entry
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def set_copied(self, row):
+        """Marks row's Copy button as "Copied!"."""
+        self.copied_id = self.rows[row]["id"]
+        index = self.index(row, self.COPY)
+        self.dataChanged.emit(index, index)
+
+    def clear_copied(self, entry_id):
+        """Restores the Copy button of entry_id, wherever its row is now."""
+        if self.copied_id != entry_id:
+            return
+        self.copied_id = None
+        row = self.row_of(entry_id)
+        if row is not None:
+            index = self.index(row, self.COPY)
+            self.dataChanged.emit(index, index)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints a cell as a push button and emits clicked(row), without a widget per row."""
+
+    clicked = Signal(int)
+
+    def __init__(self, view, object_name=None):
+        super().__init__(view)
+        # Never shown: it only carries the objectName the stylesheet rules match on.
+        self.style_button = QPushButton(view)
+        self.style_button.hide()
+        if object_name:
+            self.style_button.setObjectName(object_name)
+
+    def paint(self, painter, option, index):
+        text = index.data()
+        if text is None:
+            return  # A GroupRow has no buttons.
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 4, -4, -4)
+        button.text = text
+        button.state = QStyle.State_Enabled | QStyle.State_Raised
+        if option.state & QStyle.State_MouseOver:
+            button.state |= QStyle.State_MouseOver
+        self.style_button.style().drawControl(QStyle.CE_PushButton, button, painter, self.style_button)
+
+    def editorEvent(self, event, model, option, index):
+        if index.data() is None:
+            return False
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and option.rect.contains(event.position().toPoint())):
+            self.clicked.emit(index.row())
+            return True
+        return event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick)
+
+
+# --- Background Vault Loading ---
+class VaultLoaderSignals(QObject):
+    loaded = Signal(int)         # Total number of entries, once the vault is decrypted.
+    batch_ready = Signal(list)   # The next LOAD_BATCH_SIZE entries for the table.
+    indexed = Signal(object)     # The finished SearchIndex.
+    failed = Signal(str)
+
+
+class VaultLoader(QRunnable):
+    """Decrypts the vault, streams its entries to the UI in batches and builds the search index."""
+
+    def __init__(self, vault):
+        super().__init__()
+        self.vault = vault
+        self.signals = VaultLoaderSignals()
+
+    def run(self):
+        try:
+            entries = self.vault.load()
+        except fernet.InvalidToken:
+            self.signals.failed.emit(
+                "Decryption failed: the vault is corrupt or was written with a different key.")
+            return
+        except VaultInUse as e:
+            self.signals.failed.emit(f"{e}\nClose the other window, or wait for the command to finish, "
+                                     f"and try again.")
+            return
+        except Exception as e:
+            self.signals.failed.emit(f"Failed to load vault: {e}")
+            return
+
+        self.signals.loaded.emit(len(entries))
+        with tracing.span("VaultLoader.emit_batches"):
+            for start in range(0, len(entries), LOAD_BATCH_SIZE):
+                self.signals.batch_ready.emit(entries[start:start + LOAD_BATCH_SIZE])
+        with tracing.span("SearchIndex.build", entries=len(entries)):
+            search_index = SearchIndex(entries)
+        self.signals.indexed.emit(search_index)
+
+
+class VaultStatusSignals(QObject):
+    changed = Signal(int, str)  # Changes not yet on disk, and the error that stopped the writer ("" if none).
+
+
+# --- Background Vault Audit ---
+class AuditRunnerSignals(QObject):
+    finished = Signal(object)  # audit.AuditReport
+    failed = Signal(str)
+
+
+class AuditRunner(QRunnable):
+    """Runs audit.run_audit() off the GUI thread; the cache is only touched by one runner at a time."""
+
+    def __init__(self, vault, entries, cache):
+        super().__init__()
+        self.vault = vault
+        self.entries = entries
+        self.cache = cache
+        self.signals = AuditRunnerSignals()
+
+    def run(self):
+        try:
+            report = audit.run_audit(self.vault.fernet, self.entries, self.cache)
+        except Exception as e:
+            self.signals.failed.emit(f"Audit failed: {e}")
+            return
+        self.signals.finished.emit(report)
+
+
+# --- Background Breach Audit ---
+class BreachAuditSignals(QObject):
+    progress = Signal(int, int)  # Entries checked, total.
+    finished = Signal(list)      # [(entry, breach count)] for every breached entry.
+    failed = Signal(str)
+
+
+class BreachAuditor(QRunnable):
+    """Looks up every vault password in the breach corpus, decrypting one at a time."""
+
+    PROGRESS_EVERY = 500
+
+    def __init__(self, vault, entries, corpus):
+        super().__init__()
+        self.vault = vault
+        self.entries = entries
+        self.corpus = corpus
+        self.signals = BreachAuditSignals()
+
+    def run(self):
+        breached = []
+        try:
+            with tracing.span("BreachAuditor.run", entries=len(self.entries)):
+                for checked, entry in enumerate(self.entries, 1):
+                    count = self.corpus.count(self.vault.reveal(entry))
+                    if count:
+                        breached.append((entry, count))
+                    if checked % self.PROGRESS_EVERY == 0:
+                        self.signals.progress.emit(checked, len(self.entries))
+        except Exception as e:
+            self.signals.failed.emit(f"Breach check failed: {e}")
+            return
+        self.signals.finished.emit(breached)
+
+
+# --- Background Import and Export ---
+class TransferSignals(QObject):
+    # ImportRunner: (ImportResult, SearchIndex); ExportRunner: entries written; MergeRunner: sync.MergeResult.
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class ImportRunner(QRunnable):
+    """Streams an export file into the vault with transfer.import_into() and re-indexes the vault."""
+
+    def __init__(self, vault, path, passphrase=None):
+        super().__init__()
+        self.vault = vault
+        self.path = path
+        self.passphrase = passphrase
+        self.signals = TransferSignals()
+
+    def run(self):
+        try:
+            result, _ = transfer.import_into(self.vault, self.path, self.passphrase)
+        except fernet.InvalidToken:
+            self.signals.failed.emit("Import failed: wrong passphrase, or the file is damaged.")
+            return
+        except Exception as e:
+            self.signals.failed.emit(f"Import failed: {e}")
+            return
+        with tracing.span("SearchIndex.build", entries=len(self.vault.entries)):
+            search_index = SearchIndex(self.vault.entries)
+        self.signals.finished.emit((result, search_index))
+
+
+class ExportRunner(QRunnable):
+    """Streams entries to a file with transfer.export_entries()."""
+
+    def __init__(self, vault, entries, path, content, passphrase=None):
+        super().__init__()
+        self.vault = vault
+        self.entries = entries
+        self.path = path
+        self.content = content
+        self.passphrase = passphrase
+        self.signals = TransferSignals()
+
+    def run(self):
+        try:
+            count = transfer.export_entries(self.entries, self.vault.reveal, self.path, self.content,
+                                            self.passphrase)
+        except Exception as e:
+            self.signals.failed.emit(f"Export failed: {e}")
+            return
+        self.signals.finished.emit(count)
+
+
+class MergeRunner(QRunnable):
+    """Merges another copy of the vault into it with sync.merge_vault()."""
+
+    def __init__(self, vault, path, other_fernet=None):
+        super().__init__()
+        self.vault = vault
+        self.path = path
+        self.other_fernet = other_fernet
+        self.signals = TransferSignals()
+
+    def run(self):
+        try:
+            result = sync.merge_vault(self.vault, self.path, self.other_fernet)
+        except fernet.InvalidToken:
+            self.signals.failed.emit("Merge failed: the other vault is damaged.")
+            return
+        except Exception as e:
+            self.signals.failed.emit(f"Merge failed: {e}")
+            return
+        self.signals.finished.emit(result)
+
+
+# --- Background Key Rotation ---
+class KeyRotationSignals(QObject):
+    progress = Signal(int, int, float)  # Entries re-encrypted, total, entries per second.
+    finished = Signal(int, float)       # Entries re-encrypted, seconds taken.
+    failed = Signal(str)
+
+
+class KeyRotator(QRunnable):
+    """Re-encrypts the vault under its new key in batches, then retires the old keys. Once cancelled it stops
+    after the current batch; the vault's checkpoint lets the next unlock carry on from there."""
+
+    def __init__(self, vault, fernet, lock):
+        super().__init__()
+        self.vault = vault
+        self.fernet = fernet  # The new key alone and the lock header without the retired keys,
+        self.lock = lock      # which the vault switches to once everything is re-encrypted.
+        self.cancelled = False
+        self.signals = KeyRotationSignals()
+
+    def run(self):
+        total = self.vault.rotation_remaining()
+        done = 0
+        start = time.perf_counter()
+        try:
+            with tracing.span("KeyRotator.run", entries=total):
+                while not self.cancelled:
+                    count = self.vault.rotate_batch()
+                    if not count:
+                        break
+                    done += count
+                    self.signals.progress.emit(done, max(total, done), done / (time.perf_counter() - start))
+                if self.cancelled:
+                    return
+                self.vault.end_key_rotation(self.fernet, self.lock)
+        except Exception as e:
+            self.signals.failed.emit(f"Key rotation failed: {e}")
+            return
+        self.signals.finished.emit(done, time.perf_counter() - start)
+
+
 # --- Main Application Window ---
 class MainWindow(QMainWindow):
     """The main application window for DARX PASS™."""
 
-    def __init__(self):
+    def __init__(self, key, lock=None):
         super().__init__()
         self.setWindowTitle("DARX PASS™ – Secure Password Manager")
         self.setFixedSize(WINDOW_SIZE)
 
         self.is_dark_theme = True
         self.fernet = None
+        self.vault = None
+        self.vault_path = VAULT_FILE
+        self.vault_list = [(vaults.DEFAULT_VAULT_NAME, VAULT_FILE)]
+        self.vault_cache = vaults.VaultCache()  # Unlocked vaults switched away from.
+        self.vault_cache.error_listener = self.on_cached_vault_error
         self.passwords = []
-        self.active_shadow_button = None
+        self.search_index = SearchIndex()
+        self.vault_loader = None
+        self.vault_loading = False
+        self.vault_size = 0
+        self.breach_corpus = None
+        self.password_policy = generator.PasswordPolicy()  # Last used in a dialog; kept until the app quits.
+        self.breach_auditor = None
+        self.audit_cache = audit.AuditCache()
+        self.audit_runner = None
+        self.transfer_runner = None
+        self.key_rotator = None
+        self.rotation_key = None  # The new key of an unfinished key rotation, to finish it with.
+        self.rotation_status = ""
+        self.vault_status = VaultStatusSignals()
+        self.vault_status.changed.connect(self.on_vault_save_status)
+        self.save_error = ""
+        # One effect for the whole sidebar: update_sidebar_shadow moves it to the current page's button.
+        self.shadow_effect = QGraphicsDropShadowEffect(self)
+        self.shadow_effect.setBlurRadius(20)
+        self.shadow_effect.setOffset(0, 0)
 
-        self.init_crypto()
+        self.init_crypto(key, lock)
+        self.init_breach_corpus()
+        self.init_vault_list()
         self.init_ui()
         self.apply_stylesheet()
-        self.load_passwords_to_table()
+        self.load_vault_in_background()
+
+        self.vault_evict_timer = QTimer(self)
+        self.vault_evict_timer.timeout.connect(self.vault_cache.evict_idle)
+        self.vault_evict_timer.start(VAULT_EVICT_CHECK_MS)
 
-    def init_crypto(self):
-        """Initializes the encryption service and loads vault data."""
+    @tracing.traced()
+    def init_crypto(self, key, lock=None):
+        """Initializes the encryption service with the vault key unlocked at login.
+        The vault itself is loaded by load_vault_in_background."""
         try:
-            if os.path.exists(KEY_FILE):
-                with open(KEY_FILE, 'rb') as f:
-                    key = f.read()
-            else:
-                key = Fernet.generate_key()
-                with open(KEY_FILE, 'wb') as f:
-                    f.write(key)
-            self.fernet = Fernet(key)
+            # While a key rotation is unfinished, the keys it replaces still decrypt what it has not reached.
+            self.fernet = kdf.vault_fernet(key, lock) if lock else fernet.Fernet(key)
         except Exception as e:
-            self.show_critical_error(f"Failed to load/generate security key: {e}")
+            self.show_critical_error(f"Failed to load security key: {e}")
+        self.rotation_key = key if lock and lock.get("retired_keys") else None
+
+        self.vault = VaultStore(self.vault_path, self.fernet, lock=lock)
+        self.attach_vault_status()
 
-        if not os.path.exists(KEY_FILE):
-            self.show_critical_error(f"FATAL: Key file '{KEY_FILE}' not found and could not be created.")
+    def attach_vault_status(self):
+        # The writer reports from its own thread; the signal delivers it on the GUI thread.
+        self.vault.status_listener = lambda unsaved, error: self.vault_status.changed.emit(
+            unsaved, str(error) if error else "")
+
+    def init_vault_list(self):
+        """Reads the list of vaults the sidebar can switch between."""
+        try:
+            self.vault_list = vaults.read_vault_list(VAULT_FILE)
+        except (OSError, ValueError, KeyError) as e:
+            self.show_critical_error(f"Could not read the vault list '{vaults.VAULT_LIST_FILE}': {e}", fatal=False)
+
+    def init_breach_corpus(self):
+        """Opens the optional offline breach corpus. Without one, breach checks are simply off."""
+        try:
+            self.breach_corpus = breach.open_corpus(BREACH_CORPUS_FILE)
+        except (OSError, ValueError) as e:
+            self.show_critical_error(f"Could not open breach corpus '{BREACH_CORPUS_FILE}': {e}", fatal=False)
+
+    def load_vault_in_background(self, previous_path=None):
+        """Loads the vault on a worker thread; the table fills in as batches arrive.
+        previous_path: the cached vault switched away from, shown again if this one fails to load.
+        Without it (the vault unlocked at login) a failure quits the app."""
+        self.set_vault_loading(True)
+        self.vault_loader = VaultLoader(self.vault)
+        signals = self.vault_loader.signals
+        signals.loaded.connect(self.on_vault_loaded)
+        signals.batch_ready.connect(self.on_vault_batch)
+        signals.indexed.connect(self.on_vault_indexed)
+        if previous_path is None:
+            signals.failed.connect(self.show_critical_error)
+        else:
+            signals.failed.connect(lambda message: self.on_switch_failed(previous_path, message))
+        QThreadPool.globalInstance().start(self.vault_loader)
 
-        if os.path.exists(VAULT_FILE):
+    @Slot(int)
+    def on_vault_loaded(self, count):
+        self.passwords = self.vault.entries
+        self.vault_size = count
+        self.remove_legacy_key_files()
+        self.update_settings_info()
+
+    def remove_legacy_key_files(self):
+        """Deletes the plaintext key and SHA-256 hash once the vault's lock header has replaced them."""
+        if self.vault.lock is None or not vaults.same_vault(self.vault_path, VAULT_FILE):
+            return
+        for path in (KEY_FILE, MASTER_HASH_FILE):
             try:
-                with open(VAULT_FILE, 'rb') as f:
-                    encrypted_data = f.read()
-                if not encrypted_data:
-                    self.passwords = []
-                    return
-                decrypted_data = self.fernet.decrypt(encrypted_data)
-                self.passwords = json.loads(decrypted_data)
-            except InvalidToken:
-                self.show_critical_error(
-                    f"Decryption failed: key is invalid or data is corrupt. If you lost '{KEY_FILE}', your data is unrecoverable.")
-            except Exception as e:
-                self.show_critical_error(f"Failed to load vault: {e}")
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                self.show_critical_error(f"Could not remove old key file '{path}': {e}", fatal=False)
+
+    @Slot(list)
+    def on_vault_batch(self, entries):
+        self.table_model.append_entries(entries)
+        loaded = self.table_model.rowCount()
+        if loaded < self.vault_size:
+            self.load_status_label.setText(f"Loading vault... {loaded:,} / {self.vault_size:,}")
+        else:
+            self.load_status_label.setText("Indexing for search...")
+
+    @Slot(object)
+    def on_vault_indexed(self, search_index):
+        self.search_index = search_index
+        self.set_vault_loading(False)
+        if self.table_ordered():
+            self.load_passwords_to_table()  # The batches arrived in vault order.
+        if self.pages.currentIndex() == AUDIT_PAGE:
+            self.run_audit()  # Opened while the vault was still loading.
+        if self.rotation_key is not None and self.vault.rotating:
+            self.start_key_rotator(self.rotation_key)  # Interrupted last time: carry on from its checkpoint.
+
+    def set_vault_loading(self, loading):
+        """Disables everything that changes the vault while it is still loading."""
+        self.vault_loading = loading
+        for widget in self.vault_actions:
+            widget.setEnabled(not loading)
+        self.update_key_buttons()
+        self.load_status_label.setText("Loading vault..." if loading else "")
+        self.load_status_label.setVisible(loading)
 
     def save_vault_data(self):
-        """Encrypts and saves the current passwords list to the vault file."""
+        """Has the vault writer fold the journal into a fresh encrypted snapshot, off the GUI thread."""
+        self.vault.request_compaction()
+
+    def record_vault_change(self, change, *args):
+        """Applies a single mutation to the vault; its writer saves it in the background. Returns None on failure."""
         try:
-            json_data = json.dumps(self.passwords, indent=4).encode('utf-8')
-            encrypted_data = self.fernet.encrypt(json_data)
-            with open(VAULT_FILE, 'wb') as f:
-                f.write(encrypted_data)
+            return change(*args)
         except Exception as e:
-            self.show_critical_error(f"Could not save vault: {e}", fatal=False)
+            self.show_critical_error(f"Could not change vault: {e}", fatal=False)
+            return None
+
+    @Slot(int, str)
+    def on_vault_save_status(self, unsaved, error):
+        """Shows whether every change has reached the disk; reports a failed write once."""
+        if error:
+            self.save_status_label.setText("⚠ Changes not saved")
+            self.save_status_label.setToolTip(error)
+            if not self.save_error:
+                self.show_critical_error(f"Could not save vault: {error}\n\n"
+                                         f"Your changes are kept and saving is retried with the next one.",
+                                         fatal=False)
+        elif unsaved:
+            self.save_status_label.setText(f"● Saving {unsaved} change{'s' if unsaved != 1 else ''}...")
+            self.save_status_label.setToolTip("")
+        else:
+            self.save_status_label.setText("✓ All changes saved")
+            self.save_status_label.setToolTip("")
+        self.save_error = error
+
+    def on_cached_vault_error(self, path, error):
+        """A cached vault could not be closed on eviction: it stays cached, and the next check retries."""
+        self.save_status_label.setText(f"⚠ {os.path.basename(path)}: changes not saved")
+        self.save_status_label.setToolTip(f"Could not save vault '{path}': {error}")
 
     def init_ui(self):
         """Sets up the main user interface."""
@@ -503,7 +1270,12 @@ class MainWindow(QMainWindow):
 
         self.pages = QStackedWidget()
         self.create_passwords_page()
-        self.create_settings_page()
+        # Disabled while the vault loads; see set_vault_loading.
+        self.vault_actions = [self.btn_add, self.btn_generate, self.search_input, self.btn_group_domains]
+        # The other pages are built the first time they are opened, not before the first paint.
+        self.deferred_pages = {SETTINGS_PAGE: self.create_settings_page, AUDIT_PAGE: self.create_audit_page}
+        for _ in self.deferred_pages:
+            self.pages.addWidget(QWidget())  # Placeholder
         main_layout.addWidget(self.pages)
 
         self.btn_passwords.setChecked(True)
@@ -521,34 +1293,50 @@ class MainWindow(QMainWindow):
         app_title.setAlignment(Qt.AlignCenter)
         app_title.setStyleSheet("font-size: 18pt; font-weight: bold; color: #ffffff; margin-bottom: 10px;")
 
+        self.vault_picker = QComboBox()
+        self.vault_picker.setToolTip("Switch between your vaults. Recently used ones stay unlocked for a while.")
+        self.vault_picker.activated.connect(self.on_vault_picked)
+        self.fill_vault_picker()
+
         self.sidebar_button_group = QButtonGroup(self)
         self.sidebar_button_group.setExclusive(True)
         self.sidebar_button_group.idClicked.connect(self.switch_page)
 
-        self.btn_passwords = self.create_sidebar_button("🔐 My Passwords", 0)
-        btn_add = self.create_sidebar_button("➕ Add Password")
-        btn_add.clicked.connect(self.open_add_password_dialog)
+        self.btn_passwords = self.create_sidebar_button("🔐 My Passwords", PASSWORDS_PAGE)
+        self.btn_add = self.create_sidebar_button("➕ Add Password")
+        self.btn_add.clicked.connect(self.open_add_password_dialog)
+        self.btn_generate = self.create_sidebar_button("🎲 Generate Passwords")
+        self.btn_generate.clicked.connect(self.open_bulk_generate_dialog)
 
         btn_theme = self.create_sidebar_button("🎨 Change Theme")
         btn_theme.clicked.connect(self.toggle_theme)
 
-        self.btn_settings = self.create_sidebar_button("⚙️ Settings", 1)
+        self.btn_settings = self.create_sidebar_button("⚙️ Settings", SETTINGS_PAGE)
+        self.btn_audit = self.create_sidebar_button("🩺 Audit", AUDIT_PAGE)
 
         spacer = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
         btn_quit = self.create_sidebar_button("🚪 Quit")
         btn_quit.clicked.connect(self.close)
 
+        self.save_status_label = QLabel()
+        self.save_status_label.setObjectName("StatusLabel")
+        self.save_status_label.setAlignment(Qt.AlignCenter)
+
         self.footer_label = QLabel("DARX PASS™ – 2025 © | GitHub: @0b0d3")
         self.footer_label.setObjectName("FooterLabel")
         self.footer_label.setAlignment(Qt.AlignCenter)
 
         sidebar_layout.addWidget(app_title)
+        sidebar_layout.addWidget(self.vault_picker)
         sidebar_layout.addWidget(self.btn_passwords)
-        sidebar_layout.addWidget(btn_add)
+        sidebar_layout.addWidget(self.btn_add)
+        sidebar_layout.addWidget(self.btn_generate)
         sidebar_layout.addSpacing(20)
         sidebar_layout.addWidget(btn_theme)
         sidebar_layout.addWidget(self.btn_settings)
+        sidebar_layout.addWidget(self.btn_audit)
         sidebar_layout.addSpacerItem(spacer)
+        sidebar_layout.addWidget(self.save_status_label)
         sidebar_layout.addWidget(btn_quit)
         self.footer_label.setWordWrap(True)
         self.footer_label.setAlignment(Qt.AlignCenter)
@@ -568,7 +1356,20 @@ class MainWindow(QMainWindow):
 
     @Slot(int)
     def switch_page(self, page_id):
+        self.build_page(page_id)
         self.pages.setCurrentIndex(page_id)
+        if page_id == AUDIT_PAGE:
+            self.run_audit()
+
+    def build_page(self, page_id):
+        """Replaces a deferred page's placeholder with the real page."""
+        create_page = self.deferred_pages.pop(page_id, None)
+        if create_page is None:
+            return
+        placeholder = self.pages.widget(page_id)
+        self.pages.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.pages.insertWidget(page_id, create_page())
 
     def create_passwords_page(self):
         page = QWidget()
@@ -576,12 +1377,56 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(20, 20, 20, 20)
         header = QLabel("My Passwords")
         header.setObjectName("Header")
-        layout.addWidget(header)
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Site", "Username", "Password", "Copy", "Delete"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.load_status_label = QLabel()
+        self.load_status_label.setObjectName("StatusLabel")
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(header)
+        header_layout.addStretch()
+        header_layout.addWidget(self.load_status_label)
+        layout.addLayout(header_layout)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Search by site or username...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.apply_search_filter)
+        self.btn_group_domains = QPushButton("🌐 Group by Domain")
+        self.btn_group_domains.setCheckable(True)
+        self.btn_group_domains.setToolTip("Groups the logins by the registrable domain of their site, e.g. "
+                                          "mail.google.com and accounts.google.com under google.com.")
+        self.btn_group_domains.toggled.connect(lambda: self.load_passwords_to_table())
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.btn_group_domains)
+        layout.addLayout(search_layout)
+        self.table_model = PasswordTableModel(self.passwords, self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Stretch)
+        for column in (PasswordTableModel.COPY, PasswordTableModel.EDIT, PasswordTableModel.DELETE):
+            header.setSectionResizeMode(column, QHeaderView.Fixed)
+            header.resizeSection(column, TABLE_BUTTON_COLUMN_WIDTH)
+        # Site and Username sort on click; a third click goes back to vault order.
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicatorClearable(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_sort = (-1, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(self.on_sort_changed)
+        # Fixed row heights keep the view from measuring every row.
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(TABLE_ROW_HEIGHT)
         self.table.verticalHeader().setVisible(False)
+        self.table.setMouseTracking(True)
+        self.copy_delegate = ButtonDelegate(self.table)
+        self.copy_delegate.clicked.connect(self.copy_password)
+        self.table.setItemDelegateForColumn(PasswordTableModel.COPY, self.copy_delegate)
+        self.edit_delegate = ButtonDelegate(self.table)
+        self.edit_delegate.clicked.connect(self.open_edit_password_dialog)
+        self.table.setItemDelegateForColumn(PasswordTableModel.EDIT, self.edit_delegate)
+        self.delete_delegate = ButtonDelegate(self.table, "DangerButton")
+        self.delete_delegate.clicked.connect(self.delete_password)
+        self.table.setItemDelegateForColumn(PasswordTableModel.DELETE, self.delete_delegate)
+        self.table.doubleClicked.connect(lambda index: self.open_edit_password_dialog(index.row()))
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setFocusPolicy(Qt.NoFocus)
@@ -599,113 +1444,841 @@ class MainWindow(QMainWindow):
         layout.addWidget(header)
         self.vault_info_label = QLabel()
         layout.addWidget(self.vault_info_label)
+        self.btn_retune_kdf = QPushButton("Re-tune Unlock Speed")
+        self.btn_retune_kdf.setFixedWidth(200)
+        self.btn_retune_kdf.setToolTip(
+            f"Re-calibrates the master password key derivation to take about "
+            f"{kdf.KDF_TARGET_SECONDS * 1000:.0f} ms on this machine.")
+        self.btn_retune_kdf.clicked.connect(self.retune_kdf)
+        layout.addWidget(self.btn_retune_kdf)
+        self.btn_rotate_key = QPushButton("Rotate Vault Key")
+        self.btn_rotate_key.setFixedWidth(200)
+        self.btn_rotate_key.setToolTip("Replaces the key the vault is encrypted with and re-encrypts the vault "
+                                       "in the background. New changes use the new key at once.")
+        self.btn_rotate_key.clicked.connect(self.rotate_vault_key)
+        layout.addWidget(self.btn_rotate_key)
+        self.rotation_status_label = QLabel(self.rotation_status)
+        self.rotation_status_label.setObjectName("StatusLabel")
+        layout.addWidget(self.rotation_status_label)
+        self.btn_breach_audit = QPushButton("Check for Breached Passwords")
+        self.btn_breach_audit.setFixedWidth(200)
+        self.btn_breach_audit.setToolTip(f"Looks up every password in the offline corpus '{BREACH_CORPUS_FILE}'.")
+        self.btn_breach_audit.clicked.connect(self.audit_breached_passwords)
+        layout.addWidget(self.btn_breach_audit)
+        self.btn_import = QPushButton("Import Passwords...")
+        self.btn_import.setFixedWidth(200)
+        self.btn_import.setToolTip("Imports a CSV export from Chrome, Firefox, Bitwarden or KeePass, "
+                                   "or a DARX PASS™ export. Logins already in the vault are skipped.")
+        self.btn_import.clicked.connect(self.import_passwords)
+        layout.addWidget(self.btn_import)
+        self.btn_export = QPushButton("Export Passwords...")
+        self.btn_export.setFixedWidth(200)
+        self.btn_export.clicked.connect(self.export_passwords)
+        layout.addWidget(self.btn_export)
+        self.btn_merge = QPushButton("Merge Another Vault...")
+        self.btn_merge.setFixedWidth(200)
+        self.btn_merge.setToolTip("Merges in another copy of this vault, e.g. one changed on another machine. "
+                                  "An entry edited in both keeps its newer edit.")
+        self.btn_merge.clicked.connect(self.merge_vault)
+        layout.addWidget(self.btn_merge)
         danger_label = QLabel("🚨 Danger Zone")
         danger_label.setStyleSheet("font-size: 12pt; font-weight: bold; margin-top: 20px;")
         layout.addWidget(danger_label)
-        btn_delete_all = QPushButton("Delete ALL Passwords")
-        btn_delete_all.setObjectName("DangerButton")
-        btn_delete_all.setFixedWidth(200)
-        btn_delete_all.clicked.connect(self.delete_all_passwords)
-        layout.addWidget(btn_delete_all)
+        self.btn_delete_all = QPushButton("Delete ALL Passwords")
+        self.btn_delete_all.setObjectName("DangerButton")
+        self.btn_delete_all.setFixedWidth(200)
+        self.btn_delete_all.clicked.connect(self.delete_all_passwords)
+        layout.addWidget(self.btn_delete_all)
         layout.addStretch()
-        self.pages.addWidget(page)
+        settings_actions = [self.btn_retune_kdf, self.btn_rotate_key, self.btn_breach_audit, self.btn_import,
+                            self.btn_export, self.btn_merge, self.btn_delete_all]
+        for widget in settings_actions:
+            widget.setEnabled(not self.vault_loading)
+        self.vault_actions += settings_actions
+        self.update_key_buttons()
         self.update_settings_info()
+        return page
+
+    def create_audit_page(self):
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        header_layout = QHBoxLayout()
+        header = QLabel("Vault Audit")
+        header.setObjectName("Header")
+        header_layout.addWidget(header)
+        header_layout.addStretch()
+        self.btn_run_audit = QPushButton("Re-run Audit")
+        self.btn_run_audit.setObjectName("PrimaryButton")
+        self.btn_run_audit.clicked.connect(self.run_audit)
+        header_layout.addWidget(self.btn_run_audit)
+        layout.addLayout(header_layout)
+
+        self.audit_summary_label = QLabel("Open this page to audit your vault.")
+        self.audit_summary_label.setObjectName("StatusLabel")
+        layout.addWidget(self.audit_summary_label)
+
+        self.audit_tree = QTreeWidget()
+        self.audit_tree.setHeaderLabels(["Site", "Username", "Details"])
+        self.audit_tree.setUniformRowHeights(True)
+        self.audit_tree.header().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.audit_tree)
+        return page
+
+    def run_audit(self):
+        """Audits the vault on a worker thread; only entries changed since the last audit are re-scored."""
+        if self.vault_loading or self.audit_runner is not None:
+            return
+        self.btn_run_audit.setEnabled(False)
+        self.audit_summary_label.setText(f"Auditing {len(self.vault.entries):,} entries...")
+        self.audit_runner = AuditRunner(self.vault, list(self.vault.entries), self.audit_cache)
+        signals = self.audit_runner.signals
+        signals.finished.connect(self.on_audit_finished)
+        signals.failed.connect(self.on_audit_failed)
+        QThreadPool.globalInstance().start(self.audit_runner)
+
+    @Slot(object)
+    def on_audit_finished(self, report):
+        self.audit_runner = None
+        self.btn_run_audit.setEnabled(True)
+        reused_entries = sum(map(len, report.reused))
+        self.audit_summary_label.setText(
+            f"Reused passwords: {len(report.reused):,} (across {reused_entries:,} entries) · "
+            f"Duplicate logins: {len(report.duplicates):,} · Weak passwords: {len(report.weak):,} · "
+            f"Re-checked: {report.checked:,} of {len(self.vault.entries):,}")
+
+        self.audit_tree.clear()
+        reused_rows = [(entry, f"Same password as {len(group) - 1} other entr{'y' if len(group) == 2 else 'ies'}")
+                       for group in report.reused for entry in group]
+        duplicate_rows = [(entry, f"{len(group)} entries for this login")
+                          for group in report.duplicates for entry in group]
+        weak_rows = [(entry, f"{result.label} (~{result.bits:.0f} bits)") for entry, result in report.weak]
+        for title, rows in (("Reused passwords", reused_rows), ("Duplicate logins", duplicate_rows),
+                            ("Weak passwords", weak_rows)):
+            section = QTreeWidgetItem([f"{title} ({len(rows):,})"])
+            self.audit_tree.addTopLevelItem(section)
+            section.addChildren([QTreeWidgetItem([entry["site"], entry["username"], details])
+                                 for entry, details in rows[:AUDIT_MAX_ROWS]])
+            if len(rows) > AUDIT_MAX_ROWS:
+                section.addChild(QTreeWidgetItem([f"...and {len(rows) - AUDIT_MAX_ROWS:,} more"]))
+            section.setExpanded(bool(rows))
+            section.setFirstColumnSpanned(True)
+
+    @Slot(str)
+    def on_audit_failed(self, message):
+        self.audit_runner = None
+        self.btn_run_audit.setEnabled(True)
+        self.audit_summary_label.setText("")
+        self.show_critical_error(message, fatal=False)
 
     def update_settings_info(self):
+        if not hasattr(self, 'vault_info_label'): return  # Settings page not built yet.
         count = len(self.passwords)
+        unlock_info = ""
+        lock = self.vault.lock if self.vault else None
+        if lock:
+            unlock_info = (f"\n<b>Unlock:</b> {lock['kdf']} (N=2^{lock['n'].bit_length() - 1}, "
+                           f"r={lock['r']}, p={lock['p']}), about {lock['unlock_ms']} ms")
         self.vault_info_label.setText(
-            f"<b>Vault Location:</b> {os.path.abspath(VAULT_FILE)}\n"
+            f"<b>Vault Location:</b> {os.path.abspath(self.vault_path)}\n"
             f"<b>Number of Entries:</b> {count}"
+            f"{unlock_info}"
         )
 
+    @tracing.traced()
     def load_passwords_to_table(self):
-        self.table.setRowCount(0)
-        for idx, entry in enumerate(self.passwords):
-            self.table.insertRow(idx)
-            self.table.setItem(idx, 0, QTableWidgetItem(entry["site"]))
-            self.table.setItem(idx, 1, QTableWidgetItem(entry["username"]))
-            self.table.setItem(idx, 2, QTableWidgetItem("******"))
-            btn_copy = QPushButton("Copy")
-            btn_copy.clicked.connect(lambda _, r=idx: self.copy_password(r))
-            self.table.setCellWidget(idx, 3, btn_copy)
-            btn_delete = QPushButton("Delete")
-            btn_delete.setObjectName("DangerButton")
-            btn_delete.clicked.connect(lambda _, r=idx: self.delete_password(r))
-            self.table.setCellWidget(idx, 4, btn_delete)
-        self.table.resizeColumnsToContents()
-        for i in range(2): self.table.horizontalHeader().setSectionResizeMode(i, QHeaderView.Stretch)
+        self.show_search_results(self.search_input.text())
         self.update_settings_info()
 
+    @Slot(str)
+    def apply_search_filter(self, query):
+        self.show_search_results(query)
+
+    def show_search_results(self, query):
+        """Fills the table with the entries matching query, sorted and grouped as the table is set up."""
+        section, order = self.table_sort
+        sort = PasswordTableModel.SORT_FIELDS.get(section)
+        descending = order == Qt.DescendingOrder
+        if self.btn_group_domains.isChecked():
+            with tracing.span("SearchIndex.search_grouped", sort=sort):
+                groups = self.search_index.search_grouped(query, sort or "site", descending)
+            with tracing.span("PasswordTableModel.reset_groups", groups=len(groups)):
+                self.table_model.reset_groups(groups)
+        else:
+            with tracing.span("SearchIndex.search", sort=sort):
+                entries = self.search_index.search(query, sort, descending)
+            with tracing.span("PasswordTableModel.reset_entries", rows=len(entries)):
+                self.table_model.reset_entries(entries)
+
+    def table_ordered(self):
+        """Returns True if the table is sorted or grouped rather than in vault order."""
+        return self.table_sort[0] != -1 or self.btn_group_domains.isChecked()
+
+    @Slot(int, Qt.SortOrder)
+    def on_sort_changed(self, section, order):
+        header = self.table.horizontalHeader()
+        if section != -1 and section not in PasswordTableModel.SORT_FIELDS:
+            header.blockSignals(True)  # Only Site and Username sort; put the indicator back.
+            header.setSortIndicator(*self.table_sort)
+            header.blockSignals(False)
+            return
+        self.table_sort = (section, order)
+        if not self.vault_loading:
+            self.show_search_results(self.search_input.text())  # Otherwise sorted once the vault is indexed.
+
+    def show_entry(self, entry):
+        """Scrolls the table to entry, if it is shown."""
+        row = self.table_model.row_of(entry['id'])
+        if row is not None:
+            self.table.scrollTo(self.table_model.index(row, PasswordTableModel.SITE))
+
     def copy_password(self, row_index):
-        password = self.passwords[row_index]['password']
+        entry = self.table_model.entry(row_index)
+        if entry is None:
+            return
+        self.copy_secret(entry)
+        self.table_model.set_copied(row_index)
+        QTimer.singleShot(2000, lambda: self.table_model.clear_copied(entry['id']))
+
+    def copy_secret(self, entry):
+        """Copies the password of entry (or of one of its earlier versions) and clears it from the clipboard later."""
+        # Decrypted only for the copy; just a digest is kept for clearing the clipboard later.
+        password = self.vault.reveal(entry)
         QApplication.clipboard().setText(password)
-        button = self.table.cellWidget(row_index, 3)
-        if button:
-            button.setText("Copied!")
-            QTimer.singleShot(2000, lambda: button.setText("Copy"))
-        QTimer.singleShot(10000, lambda: self.clear_clipboard_if_match(password))
-
-    def clear_clipboard_if_match(self, p_to_clear):
-        if QApplication.clipboard().text() == p_to_clear:
+        digest = hashlib.sha256(password.encode('utf-8')).digest()
+        del password
+        QTimer.singleShot(10000, lambda: self.clear_clipboard_if_match(digest))
+
+    def clear_clipboard_if_match(self, digest_to_clear):
+        clipboard_digest = hashlib.sha256(QApplication.clipboard().text().encode('utf-8')).digest()
+        if hmac.compare_digest(clipboard_digest, digest_to_clear):
             QApplication.clipboard().clear()
 
     def delete_password(self, row_index):
-        site = self.passwords[row_index]['site']
-        reply = QMessageBox.warning(self, "Confirm Deletion", f"Delete password for <b>{site}</b>?",
+        entry = self.table_model.entry(row_index)
+        if self.vault_loading or entry is None:
+            return
+        reply = QMessageBox.warning(self, "Confirm Deletion", f"Delete password for <b>{entry['site']}</b>?",
                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            del self.passwords[row_index]
-            self.save_vault_data()
-            self.load_passwords_to_table()
+            if self.record_vault_change(self.vault.delete, entry['id']) is not None:
+                self.search_index.remove(entry['id'])
+                if self.btn_group_domains.isChecked():
+                    self.load_passwords_to_table()  # The group's count changes, or the group goes.
+                else:
+                    self.table_model.remove_row(row_index)
+                    self.update_settings_info()
 
     def open_add_password_dialog(self):
-        dialog = AddPasswordDialog(self)
-        dialog.setStyleSheet(self.styleSheet())  # Inherit theme
-        if dialog.exec():
-            data = dialog.get_data()
+        dialog = AddPasswordDialog(self, breach_corpus=self.breach_corpus, policy=self.password_policy)
+        accepted = dialog.exec()
+        data = dialog.get_data()
+        self.password_policy = dialog.policy_widget.policy()
+        # Parented to the window, it would otherwise stay alive (and be restyled with it) until the app quits.
+        dialog.deleteLater()
+        if accepted:
             if not all(data.values()):
                 QMessageBox.warning(self, "Incomplete Data", "All fields are required.")
                 return
-            self.passwords.append(data)
-            self.save_vault_data()
-            self.load_passwords_to_table()
-            self.pages.setCurrentIndex(0)
+            entry = self.record_vault_change(self.vault.add, data)
+            if entry is None:
+                return
+            self.search_index.add(entry)
+            if self.table_ordered():
+                self.load_passwords_to_table()
+                self.show_entry(entry)
+            elif self.search_index.matches(entry, self.search_input.text()):
+                self.table_model.append_entry(entry)
+                self.table.scrollToBottom()
+            self.update_settings_info()
+            self.pages.setCurrentIndex(PASSWORDS_PAGE)
             self.btn_passwords.setChecked(True)
             self.update_sidebar_shadow(self.btn_passwords)
 
+    def open_bulk_generate_dialog(self):
+        """Adds an entry with a generated password for every site listed, as one vault write."""
+        if self.vault_loading:
+            return
+        dialog = BulkGenerateDialog(self, self.password_policy)
+        accepted = dialog.exec()
+        logins = dialog.get_logins()
+        self.password_policy = dialog.policy_widget.policy()
+        dialog.deleteLater()
+        if not accepted or not logins:
+            return
+        missing = sum(not username for _, username in logins)
+        if missing:
+            QMessageBox.warning(self, "Incomplete Data", f"{missing:,} sites have no username; "
+                                                         f"give them one, or fill in the Username/Email field.")
+            return
+        # Like an import, skip the logins the vault (or the list itself) already has.
+        seen = {(entry['site'].strip().casefold(), entry['username'].strip().casefold())
+                for entry in self.vault.entries}
+        new_logins = []
+        for site, username in logins:
+            if (site.casefold(), username.casefold()) not in seen:
+                seen.add((site.casefold(), username.casefold()))
+                new_logins.append((site, username))
+        with tracing.span("MainWindow.generate_entries", entries=len(new_logins)):
+            passwords = generator.generate_passwords(len(new_logins), self.password_policy)
+            entries = self.record_vault_change(self.vault.add_many, [
+                {"site": site, "username": username, "password": password}
+                for (site, username), password in zip(new_logins, passwords)])
+            del passwords
+            if entries is None:
+                return
+            for entry in entries:
+                self.search_index.add(entry)
+            self.load_passwords_to_table()
+        self.update_settings_info()
+        self.pages.setCurrentIndex(PASSWORDS_PAGE)
+        self.btn_passwords.setChecked(True)
+        self.update_sidebar_shadow(self.btn_passwords)
+        skipped = len(logins) - len(new_logins)
+        QMessageBox.information(self, "Passwords Generated",
+                                f"Added {len(entries):,} entries with generated passwords."
+                                + (f"\nSkipped {skipped:,} logins you already have." if skipped else ""))
+
+    def open_edit_password_dialog(self, row_index):
+        entry = self.table_model.entry(row_index)
+        if self.vault_loading or entry is None:
+            return
+        dialog = AddPasswordDialog(self, {**entry, "password": self.vault.reveal(entry)}, self.breach_corpus,
+                                   lambda parent: self.show_password_history(entry, parent), self.password_policy)
+        accepted = dialog.exec()
+        data = dialog.get_data()
+        self.password_policy = dialog.policy_widget.policy()
+        # Parented to the window, it would otherwise stay alive (and be restyled with it) until the app quits.
+        dialog.deleteLater()
+        if accepted:
+            if not all(data.values()):
+                QMessageBox.warning(self, "Incomplete Data", "All fields are required.")
+                return
+            updated = self.record_vault_change(self.vault.update, entry['id'], data)
+            if updated is not None:
+                self.search_index.update(updated)
+                if self.table_ordered():
+                    self.load_passwords_to_table()  # The edit may move it.
+                    self.show_entry(updated)
+                else:
+                    self.table_model.update_row(row_index, updated)
+
+    def show_password_history(self, entry, parent=None):
+        try:
+            with tracing.span("MainWindow.show_password_history"):
+                versions = self.vault.history(entry['id'])
+        except Exception as e:
+            self.show_critical_error(f"Could not read the password history: {e}", fatal=False)
+            return
+        dialog = PasswordHistoryDialog(parent or self, entry, versions, self.copy_secret)
+        dialog.exec()
+        dialog.deleteLater()
+
     def delete_all_passwords(self):
         reply = QMessageBox.critical(self, "DELETE ALL DATA",
                                      "<b>DANGER!</b> This is irreversible.<br>Delete ALL passwords in the vault?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.passwords.clear()
-            self.save_vault_data()
+            if self.record_vault_change(self.vault.clear) is None:
+                return
+            self.search_index.clear()
+            self.save_vault_data()  # Don't leave deleted entries behind in the journal.
             self.load_passwords_to_table()
             QMessageBox.information(self, "Success", "All passwords have been deleted.")
 
+    def audit_breached_passwords(self):
+        """Checks every vault password against the breach corpus on a worker thread."""
+        if self.breach_corpus is None:
+            QMessageBox.information(
+                self, "No Breach Corpus",
+                f"Download a SHA-1 breached-password list (HASH:COUNT lines) and convert it with\n\n"
+                f"python breach.py convert <list.txt> {BREACH_CORPUS_FILE}\n\n"
+                f"next to your vault, then restart DARX PASS™.")
+            return
+        if self.breach_auditor is not None:
+            return
+        self.btn_breach_audit.setText("Checking...")
+        self.btn_breach_audit.setEnabled(False)
+        self.breach_auditor = BreachAuditor(self.vault, list(self.vault.entries), self.breach_corpus)
+        signals = self.breach_auditor.signals
+        signals.progress.connect(self.on_breach_audit_progress)
+        signals.finished.connect(self.on_breach_audit_finished)
+        signals.failed.connect(self.on_breach_audit_failed)
+        QThreadPool.globalInstance().start(self.breach_auditor)
+
+    @Slot(int, int)
+    def on_breach_audit_progress(self, checked, total):
+        self.btn_breach_audit.setText(f"Checking... {checked * 100 // total}%")
+
+    @Slot(list)
+    def on_breach_audit_finished(self, breached):
+        self.end_breach_audit()
+        if not breached:
+            QMessageBox.information(self, "Breach Check", "None of your passwords appear in the breach corpus.")
+            return
+        breached.sort(key=lambda item: -item[1])
+        shown = 20
+        lines = [f"{entry['site']} ({entry['username']}) – seen {count:,} times" for entry, count in breached[:shown]]
+        if len(breached) > shown:
+            lines.append(f"...and {len(breached) - shown:,} more")
+        QMessageBox.warning(self, "Breach Check",
+                            f"{len(breached):,} of your passwords appear in leaked password lists. "
+                            f"Change them:\n\n" + "\n".join(lines))
+
+    @Slot(str)
+    def on_breach_audit_failed(self, message):
+        self.end_breach_audit()
+        self.show_critical_error(message, fatal=False)
+
+    def end_breach_audit(self):
+        self.breach_auditor = None
+        self.btn_breach_audit.setText("Check for Breached Passwords")
+        self.btn_breach_audit.setEnabled(not self.vault_loading)
+
+    def retune_kdf(self):
+        """Re-calibrates the master password KDF for this machine and re-wraps the vault key."""
+        password, ok = QInputDialog.getText(self, "Re-tune Unlock Speed", "Master Password:", QLineEdit.Password)
+        if not ok or not password:
+            return
+        try:
+            lock = kdf.retune(password, self.vault.lock)
+        except fernet.InvalidToken:
+            QMessageBox.warning(self, "Error", "Incorrect master password.")
+            return
+        del password
+        try:
+            self.vault.set_lock(lock)
+        except Exception as e:
+            self.show_critical_error(f"Could not save vault: {e}", fatal=False)
+            return
+        self.update_settings_info()
+        QMessageBox.information(self, "Success", f"Unlocking now takes about {lock['unlock_ms']} ms on this machine.")
+
+    def rotate_vault_key(self):
+        """Replaces the vault key with a fresh one and re-encrypts the vault under it in the background."""
+        if self.vault_loading or self.key_rotator is not None:
+            return
+        password, ok = QInputDialog.getText(self, "Rotate Vault Key", "Master Password:", QLineEdit.Password)
+        if not ok or not password:
+            return
+        try:
+            key, lock = kdf.rotate_key(password, self.vault.lock)
+        except fernet.InvalidToken:
+            QMessageBox.warning(self, "Error", "Incorrect master password.")
+            return
+        del password
+        try:
+            self.vault.begin_key_rotation(kdf.vault_fernet(key, lock), lock)
+        except Exception as e:
+            self.show_critical_error(f"Could not save vault: {e}", fatal=False)
+            return
+        self.fernet = self.vault.fernet
+        self.rotation_key = key
+        self.start_key_rotator(key)
+
+    def start_key_rotator(self, key):
+        """Re-encrypts the vault under key, its new key, on a worker thread."""
+        self.key_rotator = KeyRotator(self.vault, fernet.Fernet(key), kdf.end_rotation(self.vault.lock))
+        signals = self.key_rotator.signals
+        signals.progress.connect(self.on_key_rotation_progress)
+        signals.finished.connect(self.on_key_rotation_finished)
+        signals.failed.connect(self.on_key_rotation_failed)
+        self.set_rotation_status(f"Re-encrypting {self.vault.rotation_remaining():,} entries under the new key...")
+        self.update_key_buttons()
+        QThreadPool.globalInstance().start(self.key_rotator)
+
+    @Slot(int, int, float)
+    def on_key_rotation_progress(self, done, total, rate):
+        self.set_rotation_status(f"Re-encrypting under the new key: {done:,} of {total:,} entries "
+                                 f"({rate:,.0f} entries/s)")
+
+    @Slot(int, float)
+    def on_key_rotation_finished(self, count, seconds):
+        self.key_rotator = None
+        self.rotation_key = None
+        self.fernet = self.vault.fernet
+        self.set_rotation_status(f"Vault key rotated: {count:,} entries re-encrypted in {seconds:.1f} s "
+                                 f"({count / max(seconds, 1e-6):,.0f} entries/s).")
+        self.update_key_buttons()
+
+    @Slot(str)
+    def on_key_rotation_failed(self, message):
+        self.key_rotator = None
+        self.set_rotation_status("Key rotation unfinished: the old key still decrypts what it has not reached.")
+        self.update_key_buttons()
+        self.show_critical_error(message, fatal=False)
+
+    def set_rotation_status(self, text):
+        self.rotation_status = text
+        if hasattr(self, 'rotation_status_label'):
+            self.rotation_status_label.setText(text)
+
+    def update_key_buttons(self):
+        """The lock header must not change under a running key rotation."""
+        if hasattr(self, 'btn_rotate_key'):
+            for button in (self.btn_retune_kdf, self.btn_rotate_key):
+                button.setEnabled(not self.vault_loading and self.key_rotator is None)
+
+    def import_passwords(self):
+        """Imports a password export file on a worker thread, committing it as one vault write."""
+        if self.transfer_runner is not None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Import Passwords", "", IMPORT_FILTER)
+        if not path:
+            return
+        passphrase = None
+        try:
+            encrypted = transfer.read_export_header(path) is not None
+        except OSError as e:
+            self.show_critical_error(f"Could not read '{path}': {e}", fatal=False)
+            return
+        if encrypted:
+            passphrase, ok = QInputDialog.getText(self, "Import Passwords", "Export Passphrase:", QLineEdit.Password)
+            if not ok or not passphrase:
+                return
+        self.transfer_runner = ImportRunner(self.vault, path, passphrase)
+        del passphrase
+        self.start_transfer("Importing...", self.on_import_finished)
+
+    def export_passwords(self):
+        """Exports every entry on a worker thread, encrypted under a passphrase or as plain CSV/JSON."""
+        if self.transfer_runner is not None:
+            return
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Passwords", "darx_export.darx",
+                                                            ";;".join(EXPORT_FILTERS))
+        if not path:
+            return
+        content, encrypted = EXPORT_FILTERS.get(selected_filter, ("csv", True))
+        passphrase = None
+        if encrypted:
+            passphrase, ok = QInputDialog.getText(self, "Export Passwords", "Export Passphrase:", QLineEdit.Password)
+            if not ok or not passphrase:
+                return
+        else:
+            reply = QMessageBox.warning(self, "Unencrypted Export",
+                                        "Anyone who can read this file will see <b>all</b> your passwords.<br>"
+                                        "Export them unencrypted anyway?",
+                                        QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        self.transfer_runner = ExportRunner(self.vault, list(self.vault.entries), path, content, passphrase)
+        del passphrase
+        self.start_transfer("Exporting...", self.on_export_finished)
+
+    def merge_vault(self):
+        """Merges another copy of the vault into this one on a worker thread."""
+        if self.transfer_runner is not None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Merge Another Vault", "", VAULT_FILTER)
+        if not path:
+            return
+        if vaults.same_vault(path, self.vault_path):
+            QMessageBox.warning(self, "Merge Another Vault", "A vault cannot be merged with itself.")
+            return
+        other_fernet = None
+        try:
+            shares_key = sync.shares_key(self.vault, path)
+        except (OSError, ValueError) as e:
+            self.show_critical_error(f"Could not read vault '{path}': {e}", fatal=False)
+            return
+        if not shares_key:  # Not a copy of this vault, or one with a rotated key: it has its own password.
+            unlocked = self.prompt_vault_unlock(path, f"Unlock {os.path.basename(path)}")
+            if unlocked is None:
+                return
+            other_fernet = kdf.vault_fernet(*unlocked)
+        self.transfer_runner = MergeRunner(self.vault, path, other_fernet)
+        self.start_transfer("Merging...", self.on_merge_finished)
+
+    def start_transfer(self, status, on_finished):
+        # The vault is locked against other changes, as while it loads, until the transfer ends.
+        self.set_vault_loading(True)
+        self.load_status_label.setText(status)
+        signals = self.transfer_runner.signals
+        signals.finished.connect(on_finished)
+        signals.failed.connect(self.on_transfer_failed)
+        QThreadPool.globalInstance().start(self.transfer_runner)
+
+    def end_transfer(self):
+        self.transfer_runner = None
+        self.set_vault_loading(False)
+
+    @Slot(object)
+    def on_import_finished(self, outcome):
+        result, search_index = outcome
+        self.end_transfer()
+        self.search_index = search_index
+        self.load_passwords_to_table()
+        skipped = []
+        if result.duplicates:
+            skipped.append(f"{result.duplicates:,} logins you already have")
+        if result.invalid:
+            skipped.append(f"{result.invalid:,} without a site, username or password")
+        QMessageBox.information(self, "Import Complete",
+                                f"Imported {result.added:,} passwords from {result.source or 'the file'}."
+                                + (f"\nSkipped {' and '.join(skipped)}." if skipped else ""))
+
+    @Slot(object)
+    def on_merge_finished(self, result):
+        name = os.path.basename(self.transfer_runner.path)
+        self.end_transfer()
+        for entry in result.added:
+            self.search_index.add(entry)
+        for entry in result.updated:
+            self.search_index.update(entry)
+        for entry in result.deleted:
+            self.search_index.remove(entry['id'])
+        self.load_passwords_to_table()
+        self.update_settings_info()
+        message = (f"Merged '{name}': {len(result.added):,} added, {len(result.updated):,} updated, "
+                   f"{len(result.deleted):,} deleted.")
+        if result.conflicts:
+            lines = [f"{conflict.entry['site']} ({conflict.entry['username']}): kept "
+                     f"{'the other' if conflict.theirs else 'this'} vault's edit"
+                     for conflict in result.conflicts[:MERGE_CONFLICTS_LISTED]]
+            if len(result.conflicts) > MERGE_CONFLICTS_LISTED:
+                lines.append(f"...and {len(result.conflicts) - MERGE_CONFLICTS_LISTED:,} more")
+            message += (f"\n\n{len(result.conflicts):,} entries were edited in both vaults. The newer edit was "
+                        f"kept; an edit of this vault it replaced is in the entry's history.\n\n" + "\n".join(lines))
+        QMessageBox.information(self, "Merge Complete", message)
+
+    @Slot(object)
+    def on_export_finished(self, count):
+        self.end_transfer()
+        QMessageBox.information(self, "Export Complete", f"Exported {count:,} passwords.")
+
+    @Slot(str)
+    def on_transfer_failed(self, message):
+        self.end_transfer()
+        self.show_critical_error(message, fatal=False)
+
+    def fill_vault_picker(self):
+        self.vault_picker.clear()
+        for name, path in self.vault_list:
+            self.vault_picker.addItem(f"🗄️ {name}", path)
+        self.vault_picker.insertSeparator(len(self.vault_list))
+        self.vault_picker.addItem("➕ New Vault...")
+        self.vault_picker.addItem("📂 Add Existing Vault...")
+        self.vault_picker.setCurrentIndex(self.vault_index(self.vault_path))
+
+    def vault_index(self, path):
+        return next(index for index, (_, other) in enumerate(self.vault_list) if vaults.same_vault(path, other))
+
+    @Slot(int)
+    def on_vault_picked(self, index):
+        count = len(self.vault_list)
+        if index < count:
+            self.switch_vault(self.vault_list[index][1])
+        elif index == count + 1:
+            self.create_vault()
+        elif index == count + 2:
+            self.add_existing_vault()
+        self.vault_picker.setCurrentIndex(self.vault_index(self.vault_path))
+
+    def vault_busy(self):
+        """Returns True, after telling the user, if a background job still works on the current vault."""
+        if (self.vault_loading or self.audit_runner is not None or self.breach_auditor is not None
+                or self.key_rotator is not None):
+            QMessageBox.information(self, "Vault Busy", "Wait for the current vault to finish loading, "
+                                                        "importing, exporting, merging, auditing or "
+                                                        "re-encrypting, then switch.")
+            return True
+        return False
+
+    def switch_vault(self, path, unlocked=None):
+        """Shows the vault at path and parks the current one in the vault cache. A cached vault comes
+        back at once; any other is unlocked (unless unlocked=(key, lock) is given) and loaded."""
+        if vaults.same_vault(path, self.vault_path) or self.vault_busy():
+            return
+        cached = self.vault_cache.take(path)
+        if cached is None and unlocked is None:
+            unlocked = self.prompt_vault_unlock(path)
+            if unlocked is None:
+                return
+        try:
+            self.vault.flush()  # Only vaults with every change on disk are cached.
+        except Exception as e:
+            if cached is not None:
+                self.vault_cache.put(cached)
+            self.show_critical_error(f"Could not save vault: {e}", fatal=False)
+            return
+
+        with tracing.span("MainWindow.switch_vault", cached=cached is not None):
+            self.vault.status_listener = None
+            self.vault_cache.put(vaults.OpenVault(self.vault_path, self.vault, self.search_index, self.audit_cache))
+            previous_path, self.vault_path = self.vault_path, path
+            self.save_status_label.setText("")
+            self.save_error = ""
+            if hasattr(self, 'audit_tree'):
+                self.audit_tree.clear()
+                self.audit_summary_label.setText("")
+            self.set_rotation_status("")
+            if cached is not None:
+                self.show_cached_vault(cached)
+            else:
+                self.start_vault_load(unlocked, previous_path)
+        self.vault_picker.setCurrentIndex(self.vault_index(path))
+
+    def show_cached_vault(self, cached):
+        """Puts an OpenVault taken from the vault cache back on screen."""
+        self.vault_path = cached.path
+        self.vault = cached.store
+        self.fernet = cached.store.fernet
+        self.rotation_key = None
+        self.search_index = cached.search_index
+        self.audit_cache = cached.audit_cache
+        self.attach_vault_status()
+        self.passwords = self.vault.entries
+        self.vault_size = len(self.passwords)
+        self.load_passwords_to_table()
+        if self.pages.currentIndex() == AUDIT_PAGE:
+            self.run_audit()
+
+    def start_vault_load(self, unlocked, previous_path=None):
+        """Clears the screen and loads self.vault_path, unlocked with unlocked=(key, lock), in the background."""
+        self.search_index = SearchIndex()
+        self.audit_cache = audit.AuditCache()
+        self.passwords = []
+        self.table_model.reset_entries([])
+        self.init_crypto(*unlocked)
+        self.update_settings_info()
+        self.load_vault_in_background(previous_path)  # Runs the audit once loaded if the audit page is open.
+
+    def on_switch_failed(self, previous_path, message):
+        """Reports a vault that failed to load after a switch and goes back to the one switched away from."""
+        self.set_vault_loading(False)
+        self.vault.status_listener = None
+        self.show_critical_error(message, fatal=False)
+        cached = self.vault_cache.take(previous_path)
+        if cached is not None:
+            self.show_cached_vault(cached)
+        else:
+            # Evicted meanwhile (e.g. too large to cache): it has to be unlocked again.
+            unlocked = self.prompt_vault_unlock(previous_path)
+            if unlocked is None:
+                self.show_critical_error("No vault is open.")
+            self.vault_path = previous_path
+            self.start_vault_load(unlocked)
+        self.update_settings_info()
+        self.vault_picker.setCurrentIndex(self.vault_index(self.vault_path))
+
+    def prompt_vault_unlock(self, path, title=None):
+        """Asks for the master password of the vault at path. Returns (key, lock), or None if not unlocked."""
+        try:
+            lock = read_lock(path)
+        except (OSError, ValueError) as e:
+            self.show_critical_error(f"Could not read vault '{path}': {e}", fatal=False)
+            return None
+        if lock is None:
+            self.show_critical_error(f"'{path}' is not a DARX PASS™ vault with a master password.", fatal=False)
+            return None
+        dialog = LoginDialog(self)
+        dialog.setWindowTitle(title or f"Unlock {self.vault_list[self.vault_index(path)][0]}")
+        accepted = dialog.exec() == QDialog.Accepted
+        password = dialog.get_password()
+        dialog.deleteLater()
+        if not accepted:
+            return None
+        try:
+            return kdf.unlock(password, lock), lock
+        except fernet.InvalidToken:
+            QMessageBox.warning(self, "Unlock Failed", "Incorrect master password.")
+            return None
+
+    def create_vault(self):
+        """Creates an empty vault with its own master password and switches to it."""
+        if self.vault_busy():
+            return
+        name, ok = QInputDialog.getText(self, "New Vault", "Vault Name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if any(name == other for other, _ in self.vault_list):
+            QMessageBox.warning(self, "Error", f"There already is a vault named '{name}'.")
+            return
+        dialog = CreateMasterPasswordDialog(self)
+        accepted = dialog.exec() == QDialog.Accepted
+        password = dialog.get_password()
+        dialog.deleteLater()
+        if not accepted:
+            return
+        key = fernet.Fernet.generate_key()
+        unlocked = key, kdf.create_lock(password, key)
+        del password
+        path = vaults.new_vault_path(name, os.path.dirname(VAULT_FILE))
+        if self.add_to_vault_list(name, path):
+            self.switch_vault(path, unlocked)  # Its first load writes the file.
+
+    def add_existing_vault(self):
+        """Adds a vault file made elsewhere (e.g. a team's) to the list and switches to it."""
+        path, _ = QFileDialog.getOpenFileName(self, "Add Existing Vault", "", VAULT_FILTER)
+        if not path:
+            return
+        known = next((other for _, other in self.vault_list if vaults.same_vault(path, other)), None)
+        if known is None:
+            try:
+                lock = read_lock(path)
+            except (OSError, ValueError) as e:
+                self.show_critical_error(f"Could not read vault '{path}': {e}", fatal=False)
+                return
+            if lock is None:
+                self.show_critical_error(f"'{path}' is not a DARX PASS™ vault with a master password.", fatal=False)
+                return
+            if not self.add_to_vault_list(os.path.splitext(os.path.basename(path))[0], path):
+                return
+            known = path
+        self.switch_vault(known)
+
+    def add_to_vault_list(self, name, path):
+        vault_list = self.vault_list + [(name, path)]
+        try:
+            vaults.write_vault_list(vault_list)
+        except OSError as e:
+            self.show_critical_error(f"Could not save the vault list: {e}", fatal=False)
+            return False
+        self.vault_list = vault_list
+        self.fill_vault_picker()
+        return True
+
     def toggle_theme(self):
         self.is_dark_theme = not self.is_dark_theme
         self.apply_stylesheet()
 
     def apply_stylesheet(self):
         theme = 'dark' if self.is_dark_theme else 'light'
-        self.setStyleSheet(get_stylesheet(theme))
-        self.shadow_effect = QGraphicsDropShadowEffect(self)
-        self.shadow_effect.setBlurRadius(20)
-        shadow_color = "#1f6feb" if self.is_dark_theme else "#0a58ca"
-        self.shadow_effect.setColor(shadow_color)
-        self.shadow_effect.setOffset(0, 0)
-        self.update_sidebar_shadow(self.active_shadow_button)
+        theme_manager.apply(theme, self)
+        self.shadow_effect.setColor(ThemeManager.SHADOW_COLORS[theme])
 
     def update_sidebar_shadow(self, button):
-        if not hasattr(self, 'shadow_effect'): return
-        if self.active_shadow_button:
-            self.active_shadow_button.setGraphicsEffect(None)
-        if button and button.isCheckable() and button.isChecked():
+        """Moves the shadow to button if it is the current page's button; other buttons leave it where it is."""
+        if button.isCheckable() and button.isChecked():
+            # Installing the effect takes it off the previous button. Never pass None here:
+            # Qt would delete the effect.
             button.setGraphicsEffect(self.shadow_effect)
-            self.active_shadow_button = button
-        else:
-            self.active_shadow_button = None
+
+    def closeEvent(self, event):
+        if self.key_rotator is not None:
+            self.key_rotator.cancelled = True  # Stops after its current batch; the next unlock resumes it.
+        QThreadPool.globalInstance().waitForDone()
+        self.key_rotator = None
+        if self.vault:
+            try:
+                self.vault.close()  # Waits for the writer to save any pending changes.
+            except Exception as e:
+                reply = QMessageBox.critical(self, "Unsaved Changes",
+                                             f"Could not save vault: {e}<br><br>"
+                                             f"Quit anyway and <b>lose</b> the unsaved changes?",
+                                             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    event.ignore()
+                    if self.rotation_key is not None and self.vault.rotating:
+                        self.start_key_rotator(self.rotation_key)
+                    return
+        self.vault_cache.clear()
+        if self.breach_corpus is not None:
+            self.breach_corpus.close()
+        super().closeEvent(event)
 
     def show_critical_error(self, message, fatal=True):
         QMessageBox.critical(self, "Critical Error", message)
@@ -714,50 +2287,71 @@ class MainWindow(QMainWindow):
 
 
 # --- Application Startup and Authentication ---
-def handle_authentication():
-    """Manages the master password login flow."""
-    authenticated = False
+def unlock_legacy_vault(password):
+    """Checks password against a pre-KDF master.hash and wraps the old key.key under it.
+    Returns (key, lock header), or None if the password is wrong."""
+    with open(MASTER_HASH_FILE, 'rb') as f:
+        stored_hash = f.read()
+    entered_hash = hashlib.sha256(password.encode('utf-8')).digest()
+    if not hmac.compare_digest(stored_hash, entered_hash):
+        return None
+    if os.path.exists(KEY_FILE):
+        with open(KEY_FILE, 'rb') as f:
+            key = f.read()
+    else:
+        key = fernet.Fernet.generate_key()
+    return key, kdf.create_lock(password, key)
+
 
+@tracing.traced()
+def handle_authentication():
+    """Manages the master password login flow. Returns (vault key, lock header), or None if not unlocked."""
     # All auth dialogs default to the dark theme for consistency on startup.
-    dialog_style = get_stylesheet('dark')
+    theme_manager.apply('dark')
+    lock = read_lock(VAULT_FILE)
 
-    if not os.path.exists(MASTER_HASH_FILE):
+    if lock is None and not os.path.exists(MASTER_HASH_FILE):
         # First-time setup
         create_dialog = CreateMasterPasswordDialog()
-        create_dialog.setStyleSheet(dialog_style)
-        if create_dialog.exec() == QDialog.Accepted:
-            password = create_dialog.get_password()
-            password_hash = hashlib.sha256(password.encode('utf-8')).digest()
-            with open(MASTER_HASH_FILE, 'wb') as f:
-                f.write(password_hash)
-            authenticated = True
-    else:
-        # Existing user login
-        with open(MASTER_HASH_FILE, 'rb') as f:
-            stored_hash = f.read()
-
-        login_dialog = LoginDialog()
-        login_dialog.setStyleSheet(dialog_style)
-        if login_dialog.exec() == QDialog.Accepted:
-            password = login_dialog.get_password()
-            entered_hash = hashlib.sha256(password.encode('utf-8')).digest()
-            if hmac.compare_digest(stored_hash, entered_hash):
-                authenticated = True
-            else:
-                msg_box = QMessageBox(QMessageBox.Critical, "Login Failed", "Incorrect master password.")
-                msg_box.setStyleSheet(dialog_style)
-                msg_box.exec()
-
-    return authenticated
+        with tracing.span("handle_authentication.dialog"):
+            accepted = create_dialog.exec() == QDialog.Accepted
+        if not accepted:
+            return None
+        with tracing.span("handle_authentication.create_lock"):
+            key = fernet.Fernet.generate_key()
+            return key, kdf.create_lock(create_dialog.get_password(), key)
+
+    # Existing user login
+    login_dialog = LoginDialog()
+    with tracing.span("handle_authentication.dialog"):
+        accepted = login_dialog.exec() == QDialog.Accepted
+    if not accepted:
+        return None
+
+    password = login_dialog.get_password()
+    with tracing.span("handle_authentication.verify"):
+        if lock is None:
+            unlocked = unlock_legacy_vault(password)  # Migrated to a lock header once the vault loads.
+        else:
+            try:
+                unlocked = kdf.unlock(password, lock), lock
+            except fernet.InvalidToken:
+                unlocked = None
+    if unlocked is None:
+        msg_box = QMessageBox(QMessageBox.Critical, "Login Failed", "Incorrect master password.")
+        msg_box.exec()
+    return unlocked
 
 
 if __name__ == "__main__":
+    tracing.configure(sys.argv)  # DARX_TRACE=1 or --trace[=PATH]; see tracing.py.
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
 
-    if not handle_authentication():
+    unlocked = handle_authentication()
+    if unlocked is None:
         sys.exit(0)  # Clean exit if authentication fails or is cancelled
 
-    window = MainWindow()
+    window = MainWindow(*unlocked)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
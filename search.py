@@ -0,0 +1,266 @@
+#
+# search.py - DARX PASS™ in-memory search index
+# Author: DARX Tech
+#
+# Indexes the "site" and "username" of every entry so the filter box can answer
+# each keystroke without rescanning the vault:
+#   - queries of three or more characters are substring matches: the trigram
+#     posting lists narrow the candidates, which are then verified against the text;
+#   - shorter queries are prefix matches on site or username, answered by
+#     bisecting a sorted list of field values.
+#
+# Entries are numbered with increasing ordinals in vault order and posting lists
+# are sorted arrays of ordinals, so results come back in table order and the
+# index stays a few bytes per trigram.
+#
+# The index also keeps the entries sorted by site and by username, for the
+# table's sortable columns and its group-by-domain view. Each entry's sort keys
+# are computed once, when it is indexed:
+#   - the username key is the casefolded username;
+#   - the site key is "<registrable domain>\0<host and path>", the site with its
+#     scheme, "www." and port dropped, so sorting by site also groups by domain.
+# A sorted listing is read off the presorted order (or, for a few results, sorted
+# by the stored keys), so re-sorting never re-parses a URL or casefolds a string.
+#
+# This module must not import Qt.
+#
+
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from functools import partial
+from itertools import chain
+from operator import itemgetter
+
+TRIGRAM = 3
+SORT_FIELDS = ("site", "username")
+SUBSET_SORT_RATIO = 16  # Results fewer than 1/16 of the entries are sorted; more are read off the full order.
+# Second-level labels under which country-code TLDs hand out domains (example.co.uk).
+# A small stand-in for the Public Suffix List, which is not shipped with the app.
+COUNTRY_SECOND_LEVELS = {"ac", "co", "com", "edu", "go", "gov", "ne", "net", "or", "org"}
+
+_SLICES = []  # _SLICES[i] == slice(i, i + TRIGRAM), grown on demand.
+_URL = re.compile(r"(?:[a-z][a-z0-9+.-]*://)?(?:[^/?#@]*@)?(\[[^\]]*\]|[^/?#:]*)(?::\d*)?(.*)", re.S)
+
+
+def _fields(entry):
+    return entry["site"].casefold(), entry["username"].casefold()
+
+
+def _trigrams(fields):
+    # map() over precomputed slices keeps the per-character loop in C.
+    site, username = fields
+    for i in range(len(_SLICES), max(len(site), len(username))):
+        _SLICES.append(slice(i, i + TRIGRAM))
+    # Clamped at 0: a negative stop would slice from the end and yield short, bogus grams.
+    return set(chain(map(site.__getitem__, _SLICES[:max(0, len(site) - TRIGRAM + 1)]),
+                     map(username.__getitem__, _SLICES[:max(0, len(username) - TRIGRAM + 1)])))
+
+
+def registrable_domain(site):
+    """Returns (registrable domain, host and path) of a casefolded site, a URL or a bare host name."""
+    host, path = _URL.match(site.strip()).groups()
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    labels = host.split(".")
+    if len(labels) <= 2 or host.startswith("[") or host.replace(".", "").isdigit():
+        domain = host  # Already registrable, or an IP address.
+    elif len(labels[-1]) == 2 and labels[-2] in COUNTRY_SECOND_LEVELS:
+        domain = ".".join(labels[-3:])
+    else:
+        domain = ".".join(labels[-2:])
+    return domain, host + path
+
+
+class _SortedKeys:
+    """(key, ordinal) pairs kept in sorted order, as a list of keys and a parallel array of ordinals."""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ordinals = array('I', (ordinal for _, ordinal in pairs))
+
+    def insert(self, key, ordinal):
+        position = self._position(key, ordinal)
+        self.keys.insert(position, key)
+        self.ordinals.insert(position, ordinal)
+
+    def remove(self, key, ordinal):
+        position = self._position(key, ordinal)
+        del self.keys[position]
+        del self.ordinals[position]
+
+    def _position(self, key, ordinal):
+        """Returns where (key, ordinal) is, or belongs."""
+        keys, ordinals = self.keys, self.ordinals
+        position = bisect_left(keys, key)
+        while position < len(keys) and keys[position] == key and ordinals[position] < ordinal:
+            position += 1
+        return position
+
+
+class SearchIndex:
+    """Prefix + trigram index over the site/username of vault entries."""
+
+    def __init__(self, entries=()):
+        self.rebuild(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rebuild(self, entries):
+        """Indexes entries from scratch, in vault order."""
+        self._entries = {}        # ordinal -> entry
+        self._ordinals = {}       # entry id -> ordinal
+        self._texts = {}          # ordinal -> casefolded (site, username)
+        self._domains = {}        # ordinal -> registrable domain of the site
+        self._sort_keys = {"site": {}, "username": {}}  # field -> ordinal -> sort key
+        self._grams = defaultdict(partial(array, 'I'))  # trigram -> sorted array of ordinals
+        grams = self._grams
+        site_keys, username_keys = self._sort_keys["site"], self._sort_keys["username"]
+        for ordinal, entry in enumerate(entries):
+            fields = _fields(entry)
+            self._entries[ordinal] = entry
+            self._ordinals[entry["id"]] = ordinal
+            self._texts[ordinal] = fields
+            self._domains[ordinal], site_keys[ordinal] = self._site_key(fields[0])
+            username_keys[ordinal] = fields[1]
+            for gram in _trigrams(fields):
+                grams[gram].append(ordinal)
+        self._prefix = _SortedKeys(chain(((site, ordinal) for ordinal, (site, _) in self._texts.items()),
+                                         ((username, ordinal) for ordinal, (_, username) in self._texts.items())))
+        self._orders = {field: _SortedKeys((key, ordinal) for ordinal, key in keys.items())
+                        for field, keys in self._sort_keys.items()}
+        self._next_ordinal = len(self._entries)
+
+    # --- Incremental updates ---
+
+    def add(self, entry):
+        self._index(self._next_ordinal, entry)
+        self._next_ordinal += 1
+
+    def update(self, entry):
+        """Re-indexes an edited entry, keeping its place in the result order."""
+        ordinal = self._ordinals[entry["id"]]
+        self._unindex(ordinal)
+        self._index(ordinal, entry)
+
+    def remove(self, entry_id):
+        ordinal = self._ordinals.pop(entry_id)
+        self._unindex(ordinal)
+        del self._entries[ordinal]
+
+    def clear(self):
+        self.rebuild(())
+
+    @staticmethod
+    def _site_key(site):
+        """Returns (registrable domain, sort key) of a casefolded site."""
+        domain, host_path = registrable_domain(site)
+        return domain, f"{domain}\0{host_path}"
+
+    def _index(self, ordinal, entry):
+        fields = _fields(entry)
+        self._entries[ordinal] = entry  # In place when updating, so an edited entry keeps its place.
+        self._ordinals[entry["id"]] = ordinal
+        self._texts[ordinal] = fields
+        self._domains[ordinal], site_key = self._site_key(fields[0])
+        for gram in _trigrams(fields):
+            insort(self._grams[gram], ordinal)
+        for key in fields:
+            self._prefix.insert(key, ordinal)
+        for field, key in zip(SORT_FIELDS, (site_key, fields[1])):
+            self._sort_keys[field][ordinal] = key
+            self._orders[field].insert(key, ordinal)
+
+    def _unindex(self, ordinal):
+        """Drops the ordinal from the indexes; its entry stays in self._entries."""
+        del self._domains[ordinal]
+        fields = self._texts.pop(ordinal)
+        for gram in _trigrams(fields):
+            postings = self._grams[gram]
+            del postings[bisect_left(postings, ordinal)]
+            if not postings:
+                del self._grams[gram]
+        for key in fields:
+            self._prefix.remove(key, ordinal)
+        for field in SORT_FIELDS:
+            self._orders[field].remove(self._sort_keys[field].pop(ordinal), ordinal)
+
+    # --- Queries ---
+
+    def matches(self, entry, query):
+        """Returns True if entry would be among the results for query."""
+        query = query.strip().casefold()
+        site, username = _fields(entry)
+        if len(query) >= TRIGRAM:
+            return query in site or query in username
+        return site.startswith(query) or username.startswith(query)
+
+    def search(self, query, sort=None, descending=False):
+        """Returns the entries matching query, in vault order or sorted by sort ("site" or "username")."""
+        ordinals = self._matching(query)
+        if sort is None:
+            if ordinals is None:
+                return list(self._entries.values())
+        else:
+            ordinals = self._in_order(ordinals, sort)
+        entries = self._entries
+        return [entries[ordinal] for ordinal in (reversed(ordinals) if descending else ordinals)]
+
+    def search_grouped(self, query, sort="site", descending=False):
+        """Returns [(domain, [entry, ...]), ...] for the entries matching query: the domains in order
+        (descending too if descending), and the entries of each sorted like search(query, sort, descending)."""
+        ordinals = self._in_order(self._matching(query), sort)
+        entries, domains = self._entries, self._domains
+        groups = defaultdict(list)
+        for ordinal in (reversed(ordinals) if descending else ordinals):
+            groups[domains[ordinal]].append(entries[ordinal])
+        return sorted(groups.items(), key=itemgetter(0), reverse=descending)
+
+    def domain(self, entry):
+        """Returns the registrable domain of an indexed entry's site."""
+        return self._domains[self._ordinals[entry["id"]]]
+
+    def _matching(self, query):
+        """Returns the ordinals matching query in vault order, or None for all of them."""
+        query = query.strip().casefold()
+        if not query:
+            return None
+        if len(query) >= TRIGRAM:
+            return self._search_substring(query)
+        return self._search_prefix(query)
+
+    def _in_order(self, ordinals, sort):
+        """Returns ordinals (None for all) sorted by the sort field, ties in vault order."""
+        order = self._orders[sort].ordinals
+        if ordinals is None or len(ordinals) == len(order):
+            return order
+        if len(ordinals) * SUBSET_SORT_RATIO < len(order):
+            return sorted(ordinals, key=self._sort_keys[sort].__getitem__)
+        wanted = set(ordinals)
+        return [ordinal for ordinal in order if ordinal in wanted]
+
+    def _search_substring(self, query):
+        postings = []
+        for gram in {query[i:i + TRIGRAM] for i in range(len(query) - TRIGRAM + 1)}:
+            posting = self._grams.get(gram)
+            if posting is None:
+                return ()
+            postings.append(posting)
+        if len(query) == TRIGRAM:
+            return postings[0]  # Already sorted and exact.
+        # Verifying the shortest posting list directly is cheaper than intersecting
+        # it with the longer ones, and it is already in vault order.
+        texts = self._texts
+        return [ordinal for ordinal in min(postings, key=len)
+                if query in texts[ordinal][0] or query in texts[ordinal][1]]
+
+    def _search_prefix(self, query):
+        keys = self._prefix.keys
+        start = bisect_left(keys, query)
+        # Every key with this prefix sorts before query + U+10FFFF.
+        end = bisect_left(keys, query + "\U0010ffff", start)
+        return sorted(set(self._prefix.ordinals[start:end]))
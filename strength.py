@@ -0,0 +1,156 @@
+#
+# strength.py - DARX PASS™ password strength engine
+# Author: DARX Tech
+#
+# Estimates how many bits of guessing a password would take. A single pass over
+# the characters collects the character classes (which set the size of the
+# alphabet an attacker has to try) and finds runs of three or more characters
+# that follow a pattern: repeats ("aaaa"), sequences ("abcd", "4321") and keyboard
+# walks ("qwerty", "asdf"). Every character after the first of a run costs an
+# attacker about a bit instead of a full character. The password is then looked
+# up in common_passwords.txt, which is loaded once into a sorted list and searched
+# by bisection; a password that merely wraps a common word costs about as much as
+# picking that word from the list.
+#
+# This module must not import Qt.
+#
+
+import os
+import math
+from bisect import bisect_left
+from collections import namedtuple
+
+# --- Configuration Constants ---
+WORDLIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "common_passwords.txt")
+MIN_WORD_LENGTH = 4            # Shorter dictionary hits are too common to mean anything.
+MIN_PATTERN_RUN = 3            # "ss" or "er" happen in any word; "sss" and "ert" are patterns.
+PATTERN_CHAR_BITS = 1.0        # What a character that only continues a pattern is worth.
+MEDIUM_BITS = 40               # Estimated entropy from which a password is "Medium"...
+STRONG_BITS = 60               # ...and "Strong".
+
+LOWER, UPPER, DIGIT, SYMBOL, OTHER = range(5)
+REPEAT, SEQUENCE, WALK = range(3)
+PATTERN_WARNINGS = ("repeated characters", "sequences like abc or 123", "keyboard patterns like qwerty")
+CLASS_SIZES = (26, 26, 10, 33, 100)  # OTHER: a rough allowance for non-ASCII letters.
+_ASCII_CLASSES = {}
+for _ch in map(chr, range(32, 127)):
+    _ASCII_CLASSES[_ch] = (LOWER if _ch.islower() else UPPER if _ch.isupper()
+                           else DIGIT if _ch.isdigit() else SYMBOL)
+
+KEYBOARD_ROWS = ("`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./")
+_KEY_POSITIONS = {key: (row, column) for row, keys in enumerate(KEYBOARD_ROWS) for column, key in enumerate(keys)}
+
+# Common character substitutions, undone before the dictionary lookup.
+_LEET = str.maketrans("4@38!1|0$5+7", "aaebiilosstt")
+
+Strength = namedtuple("Strength", "label bits warnings")
+
+_words = None
+
+
+def _wordlist():
+    """Returns the sorted wordlist, loading it on first use."""
+    global _words
+    if _words is None:
+        try:
+            with open(WORDLIST_FILE, encoding='utf-8') as f:
+                words = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        except OSError:
+            words = []
+        words.sort()
+        _words = words
+    return _words
+
+
+def is_common(word):
+    words = _wordlist()
+    position = bisect_left(words, word)
+    return position < len(words) and words[position] == word
+
+
+def _longest_common_word(text):
+    """Returns the longest wordlist entry contained in text, or ""."""
+    words = _wordlist()
+    best = ""
+    for start in range(len(text) - MIN_WORD_LENGTH + 1):
+        # Every entry starting at this position shares its first MIN_WORD_LENGTH characters,
+        # and they sit next to each other in the sorted list.
+        prefix = text[start:start + MIN_WORD_LENGTH]
+        position = bisect_left(words, prefix)
+        while position < len(words) and words[position].startswith(prefix):
+            word = words[position]
+            if len(word) > len(best) and text.startswith(word, start):
+                best = word
+            position += 1
+    return best
+
+
+def _step_pattern(previous, current, pattern=None, step=0):
+    """Returns the pattern that previous -> current continues (None if none) and its step. Where several
+    fit ("fg" is both a sequence and a keyboard walk), the one already running is kept."""
+    fits = []
+    difference = ord(current) - ord(previous)
+    if difference == 0:
+        fits.append((REPEAT, 0))
+    if abs(difference) == 1 and current.isalnum() and previous.isalnum():
+        fits.append((SEQUENCE, difference))
+    a = _KEY_POSITIONS.get(previous)
+    b = _KEY_POSITIONS.get(current)
+    if a is not None and b is not None and a[0] == b[0] and abs(b[1] - a[1]) == 1:
+        fits.append((WALK, b[1] - a[1]))
+    if (pattern, step) in fits:
+        return pattern, step
+    return fits[0] if fits else (None, 0)
+
+
+def evaluate(password):
+    """Scores password. Returns a Strength(label, bits, warnings)."""
+    if not password:
+        return Strength("", 0.0, ())
+
+    classes = set()
+    predictable = 0
+    found = set()           # Patterns with at least one run of MIN_PATTERN_RUN.
+    pattern, step, run = None, 0, 1
+    previous = None
+    lowered = password.lower()
+    for ch, low in zip(password, lowered):
+        char_class = _ASCII_CLASSES.get(ch)
+        if char_class is None:
+            char_class = LOWER if ch.islower() else UPPER if ch.isupper() else DIGIT if ch.isdigit() else OTHER
+        classes.add(char_class)
+
+        if previous is not None:
+            next_pattern, next_step = _step_pattern(previous, low, pattern, step)
+            if next_pattern is not None and (next_pattern, next_step) == (pattern, step):
+                run += 1
+            else:
+                if run >= MIN_PATTERN_RUN:
+                    predictable += run - 1
+                    found.add(pattern)
+                run = 2 if next_pattern is not None else 1
+            pattern, step = next_pattern, next_step
+        previous = low
+    if run >= MIN_PATTERN_RUN:
+        predictable += run - 1
+        found.add(pattern)
+
+    pool = sum(CLASS_SIZES[char_class] for char_class in classes)
+    bits = (len(password) - predictable) * math.log2(pool) + predictable * PATTERN_CHAR_BITS
+
+    warnings = [PATTERN_WARNINGS[found_pattern] for found_pattern in sorted(found)]
+
+    plain = lowered.translate(_LEET)
+    if is_common(plain) or is_common(plain.rstrip("0123456789!?.*#$@")):
+        bits = min(bits, math.log2(max(len(_wordlist()), 2)))
+        warnings.insert(0, "a common password")
+    else:
+        word = _longest_common_word(plain)
+        if word:
+            # The word costs one pick from the wordlist instead of its share of the characters.
+            bits = bits * (1 - len(word) / len(password)) + math.log2(max(len(_wordlist()), 2))
+            warnings.insert(0, f"the common word \"{word}\"")
+
+    bits = max(bits, 0.0)
+    label = "Strong" if bits >= STRONG_BITS else "Medium" if bits >= MEDIUM_BITS else "Weak"
+    return Strength(label, bits, tuple(warnings))
@@ -0,0 +1,123 @@
+#
+# sync.py - DARX PASS™ vault merge
+# Author: DARX Tech
+#
+# Merges another copy of the vault, e.g. one carried to another machine and
+# changed there, into the open one. Copies of a vault share their entries' ids,
+# and every entry records when it was last changed ("modified", see vault.py).
+#
+# The two copies are compared as a hash tree, top down. A chunk of the other
+# file whose digest matches a chunk of this vault that is unchanged since its
+# last compaction holds exactly the same entries, so it is skipped without being
+# decrypted; if every chunk matches and neither side has journal records, the
+# merge reads nothing but the other file's header. Only the remaining chunks and
+# the other file's journal are decrypted, and only the entries in them compared,
+# so the cost of a merge follows the size of the difference, not of the vault.
+# (Once either copy's key is rotated no chunk matches, and every entry is compared.)
+#
+# The merge is three-way, with the last merge of the two copies as the base: the
+# older of their "synced" times. Compared with it:
+#   - an entry changed on one side only takes that side's version;
+#   - an entry changed on both sides is a conflict: the more recent change wins
+#     (the edit it overwrites here stays in the entry's history) and it is reported;
+#   - an entry missing on one side was added on the other if it changed since the
+#     base, and otherwise deleted on this one.
+# Copies never merged before have no base: every entry counts as changed, so the
+# merge adds what either side lacks and deletes nothing.
+#
+# The changes are written to this vault only; merging the result back, or copying
+# the merged file over the other copy, brings the other machine up to date.
+#
+# This module must not import Qt.
+#
+
+import time
+from collections import namedtuple
+
+from cryptography.fernet import InvalidToken
+
+import tracing
+from vault import read_header, read_copy
+
+MergeResult = namedtuple("MergeResult", "added updated deleted conflicts compared chunks chunks_read")
+Conflict = namedtuple("Conflict", "entry theirs")  # The merged entry; theirs: the other copy's edit won.
+
+
+def shares_key(store, other_path):
+    """Returns True if the vault file at other_path is encrypted with the store's key, as copies of it are
+    (unless one of them has since had its key rotated); otherwise its own master password unlocks it."""
+    try:
+        read_header(other_path, store.fernet)
+    except InvalidToken:
+        return False
+    return True
+
+
+def _reveal(fernet, entry):
+    return fernet.decrypt(entry["secret"].encode('ascii')).decode('utf-8')
+
+
+def _same(store, other_fernet, entry, other):
+    """Whether two versions of an entry hold the same login; only decrypts when their secrets differ."""
+    if entry["site"] != other["site"] or entry["username"] != other["username"]:
+        return False
+    return entry["secret"] == other["secret"] or store.reveal(entry) == _reveal(other_fernet, other)
+
+
+def _changed(entry, base):
+    return base is None or entry.get("modified", 0) > base
+
+
+def _incoming(other_fernet, other):
+    """The other copy's entry as changes for this vault, its secret as a password for the store to encrypt."""
+    changes = {field: value for field, value in other.items() if field != "secret"}
+    changes["password"] = _reveal(other_fernet, other)
+    return changes
+
+
+@tracing.traced("sync.merge")
+def merge_vault(store, other_path, other_fernet=None):
+    """Merges the vault file at other_path into store and waits until the result is on disk.
+    other_fernet decrypts the other file; by default the store's own key does, as for a copy of the same vault.
+    Returns a MergeResult with the added, updated and deleted entries and the conflicts, plus how many
+    entries were compared and how many of the other file's chunks had to be decrypted."""
+    other_fernet = other_fernet or store.fernet
+    summary = store.chunk_digests()
+    copy = read_copy(other_path, other_fernet, (digest for digest, _ in summary if digest))
+    base = min(store.synced, copy.synced) if store.synced and copy.synced else None
+
+    # Entries in shared chunks are the same on both sides, unless the other copy's journal changed them.
+    candidates = {entry_id for digest, ids in summary if digest not in copy.shared for entry_id in ids}
+    candidates.update(copy.entries)
+    additions, updates, deletions, conflicts = [], [], [], []
+    for entry_id in candidates:
+        entry = store.get(entry_id)
+        other = copy.entries.get(entry_id)
+        if entry is not None and other is not None:
+            if _same(store, other_fernet, entry, other):
+                continue
+            ours, theirs = _changed(entry, base), _changed(other, base)
+            conflict = ours == theirs  # Changed on both sides (or on neither, yet different).
+            if conflict:
+                theirs = other.get("modified", 0) > entry.get("modified", 0)
+            if theirs:
+                updates.append((other, conflict))
+            elif conflict:
+                conflicts.append(Conflict(entry, False))
+        elif entry is not None:
+            if not _changed(entry, base):
+                deletions.append(entry_id)
+        elif other is not None and _changed(other, base):
+            additions.append(other)
+
+    with tracing.span("sync.apply", added=len(additions), updated=len(updates), deleted=len(deletions)):
+        added = store.add_many([_incoming(other_fernet, other) for other in additions])
+        updated = []
+        for other, conflict in updates:
+            updated.append(store.update(other["id"], _incoming(other_fernet, other)))
+            if conflict:
+                conflicts.append(Conflict(updated[-1], True))
+        deleted = [store.delete(entry_id) for entry_id in deletions]
+        store.mark_synced(int(time.time()))
+        store.flush()
+    return MergeResult(added, updated, deleted, conflicts, len(candidates), copy.chunks, copy.chunks_read)
@@ -0,0 +1,97 @@
+#
+# test_breach.py - DARX PASS™ offline breached-password lookup tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import breach
+from breach import BreachCorpus, convert, open_corpus, password_digest
+
+
+class BreachCorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.directory.name, "pwned.txt")
+        self.corpus_path = os.path.join(self.directory.name, "breached.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def convert(self, lines):
+        with open(self.source_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        total = convert(self.source_path, self.corpus_path)
+        corpus = BreachCorpus(self.corpus_path)
+        self.addCleanup(corpus.close)
+        self.assertEqual(len(corpus), total)
+        return corpus
+
+    def test_passwords_are_found_with_their_counts(self):
+        corpus = self.convert(sorted(f"{password_digest(p).hex().upper()}:{n}"
+                                     for p, n in (("password", 9545824), ("hunter2", 17043), ("letmein", 1))))
+        self.assertEqual(corpus.count("password"), 9545824)
+        self.assertEqual(corpus.count("hunter2"), 17043)
+        self.assertEqual(corpus.count("letmein"), 1)
+        self.assertEqual(corpus.count("Zq8#Q7mXv2"), 0)
+
+    def test_lookup_at_the_edges_of_the_fanout(self):
+        present = [bytes([0, 0]) + bytes(18), bytes([0, 0]) + b"\x05" * 18,
+                   bytes([0x7f, 0xff]) + b"\x01" * 18, bytes([0xff, 0xff]) + b"\xff" * 18]
+        corpus = self.convert([f"{digest.hex()}:{i + 1}" for i, digest in enumerate(present)])
+        for i, digest in enumerate(present):
+            self.assertEqual(corpus.count_digest(digest), i + 1)
+        for absent in (bytes([0, 0]) + b"\x01" * 18, bytes([0, 1]) + bytes(18),
+                       bytes([0x7f, 0xff]) + bytes(18), bytes([0xff, 0xff]) + b"\xfe" * 18):
+            self.assertEqual(corpus.count_digest(absent), 0)
+
+    def test_repeated_hashes_are_merged_and_counts_clamped(self):
+        digest = password_digest("password").hex()
+        other = password_digest("hunter2").hex()
+        corpus = self.convert(sorted([f"{digest}:3", f"{digest}:4", f"{other}:{breach.MAX_COUNT}", f"{other}:5"]))
+        self.assertEqual(len(corpus), 2)
+        self.assertEqual(corpus.count("password"), 7)
+        self.assertEqual(corpus.count("hunter2"), breach.MAX_COUNT)
+
+    def test_lines_without_a_count_or_a_hash(self):
+        corpus = self.convert(["", "not a hash:3", password_digest("password").hex()])
+        self.assertEqual(len(corpus), 1)
+        self.assertEqual(corpus.count("password"), 1)
+
+    @mock.patch.object(breach, "SORT_RUN_RECORDS", 7)
+    def test_unsorted_corpus_is_sorted_in_runs(self):
+        rng = random.Random(13)
+        passwords = [f"password{i}" for i in range(100)]
+        lines = [f"{password_digest(p).hex()}:{i + 1}" for i, p in enumerate(passwords)]
+        lines += lines[:10]  # Repeats in different runs are merged too.
+        rng.shuffle(lines)
+        corpus = self.convert(lines)
+        self.assertEqual(len(corpus), 100)
+        for i, password in enumerate(passwords):
+            self.assertEqual(corpus.count(password), (i + 1) * (2 if i < 10 else 1))
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["breached.bin", "pwned.txt"])
+
+    def test_other_files_are_rejected(self):
+        with open(self.corpus_path, 'wb') as f:
+            f.write(b"SHA1:COUNT" + bytes(breach.HEADER_SIZE))
+        with self.assertRaises(ValueError):
+            BreachCorpus(self.corpus_path)
+
+    def test_missing_corpus_opens_as_none(self):
+        self.assertIsNone(open_corpus(self.corpus_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
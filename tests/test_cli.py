@@ -0,0 +1,68 @@
+#
+# test_cli.py - DARX PASS™ command line tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+import kdf
+from cli import CommandError, unlock
+from vault import VaultStore
+
+MASTER_PASSWORD = "correct horse battery staple"
+
+
+class AppOpenTest(unittest.TestCase):
+    """The command line while the app (here: a VaultStore loaded the same way) has the vault open."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        key = Fernet.generate_key()
+        lock = kdf.create_lock(MASTER_PASSWORD, key, target_seconds=0.001)
+        self.app = VaultStore(self.vault_path, kdf.vault_fernet(key, lock), lock=lock)
+        self.app.load()
+        self.app.add({"site": "example.com", "username": "alice", "password": "hunter2"})
+        self.app.flush()
+
+    def tearDown(self):
+        self.app.close()
+        self.directory.cleanup()
+
+    def request(self, request, for_writing=False):
+        session = unlock(self.vault_path, MASTER_PASSWORD, for_writing)
+        try:
+            return session.handle(request)
+        finally:
+            session.close()
+
+    def test_get_and_list_while_the_app_has_the_vault_open(self):
+        result = self.request({"op": "get", "site": "example.com"})
+        self.assertEqual(result["entry"]["password"], "hunter2")
+        self.app.add({"site": "example.org", "username": "bob", "password": "swordfish"})
+        self.app.flush()  # In the journal only, not yet in the snapshot.
+        self.assertEqual([entry["site"] for entry in self.request({"op": "list"})["entries"]],
+                         ["example.com", "example.org"])
+
+    def test_changes_wait_for_the_app_to_close(self):
+        add = {"op": "add", "site": "example.net", "username": "carol", "password": "pw"}
+        with self.assertRaises(CommandError):
+            self.request(add, for_writing=True)
+        self.app.close()
+        self.request(add, for_writing=True)
+        self.assertEqual(len(self.request({"op": "list"})["entries"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#
+# test_codec.py - DARX PASS™ binary entry encoding tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from codec import encode_entries, decode_entries, decode_any
+
+
+def _flags(data):
+    """Returns {column name: flags} from an encoded block's schema."""
+    flags, position = {}, 9
+    for _ in range(data[8]):
+        name_length = data[position]
+        name = data[position + 1:position + 1 + name_length].decode('utf-8')
+        position += 1 + name_length
+        flags[name] = data[position + 1]
+        position += 2
+    return flags
+
+
+class CodecRoundTripTest(unittest.TestCase):
+
+    def assertRoundTrips(self, entries):
+        self.assertEqual(decode_entries(encode_entries(entries)), entries)
+
+    def test_round_trip(self):
+        self.assertRoundTrips([{"id": "00ff", "site": "exämple.com", "username": "ålice 🔑", "modified": 1700000000},
+                               {"id": "0100", "site": "", "username": "bob", "modified": -1}])
+
+    def test_empty_and_schemaless_blocks(self):
+        self.assertRoundTrips([])
+        self.assertRoundTrips([{}, {}])
+
+    def test_missing_fields_stay_missing(self):
+        entries = [{"id": "1", "site": "a.com", "modified": 5}, {"id": "2", "username": "bob"}]
+        self.assertRoundTrips(entries)
+        self.assertTrue(_flags(encode_entries(entries))["modified"] & codec.FLAG_MISSING)
+
+    def test_values_containing_nul_fall_back_to_lengths(self):
+        entries = [{"site": "a\x00b", "username": ""}, {"site": "\x00", "username": "c"}]
+        data = encode_entries(entries)
+        self.assertTrue(_flags(data)["site"] & codec.FLAG_LENGTHS)
+        self.assertFalse(_flags(data)["username"] & codec.FLAG_LENGTHS)
+        self.assertEqual(decode_entries(data), entries)
+
+    def test_decode_any_reads_the_json_it_replaced(self):
+        entries = [{"id": "1", "site": "a.com"}]
+        self.assertEqual(decode_any(json.dumps(entries).encode('utf-8')), (entries, True))
+        self.assertEqual(decode_any(encode_entries(entries)), (entries, False))
+
+    def test_unknown_version_is_rejected(self):
+        data = bytearray(encode_entries([{"id": "1"}]))
+        data[3] = codec.CODEC_VERSION + 1
+        with self.assertRaises(ValueError):
+            decode_entries(bytes(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
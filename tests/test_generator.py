@@ -0,0 +1,83 @@
+#
+# test_generator.py - DARX PASS™ password generator tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import secrets
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generator
+from generator import PasswordPolicy, character_classes, generate_passwords
+
+CLASSES = (generator.LOWERCASE, generator.UPPERCASE, generator.DIGITS, generator.SYMBOLS)
+
+
+class GeneratePasswordsTest(unittest.TestCase):
+
+    def assertMeets(self, password, policy):
+        self.assertEqual(len(password), policy.length)
+        used = [chars for chars, use in zip(CLASSES, policy[1:5]) if use]
+        for chars in used:
+            self.assertTrue(any(ch in chars for ch in password), (password, chars))
+        self.assertTrue(all(any(ch in chars for chars in used) for ch in password), password)
+        if policy.exclude_ambiguous:
+            self.assertFalse(set(password) & set(generator.AMBIGUOUS), password)
+
+    def test_every_password_meets_its_policy(self):
+        policies = [PasswordPolicy(),
+                    PasswordPolicy(length=generator.MIN_LENGTH),
+                    PasswordPolicy(length=generator.MAX_LENGTH, exclude_ambiguous=False),
+                    PasswordPolicy(length=8, lowercase=False, uppercase=False, symbols=False),
+                    PasswordPolicy(length=12, lowercase=False, digits=False)]
+        for policy in policies:
+            with self.subTest(policy=policy):
+                passwords = generate_passwords(200, policy)
+                self.assertEqual(len(passwords), 200)
+                for password in passwords:
+                    self.assertMeets(password, policy)
+
+    def test_the_extremes_of_the_random_value_meet_the_policy(self):
+        policy = PasswordPolicy(length=generator.MIN_LENGTH)
+        for pick in (lambda space: 0, lambda space: space - 1):
+            with mock.patch.object(secrets, "randbelow", side_effect=pick):
+                self.assertMeets(generate_passwords(1, policy)[0], policy)
+
+    def test_one_random_read_per_password(self):
+        with mock.patch.object(secrets, "randbelow", wraps=secrets.randbelow) as randbelow:
+            generate_passwords(25)
+        self.assertEqual(randbelow.call_count, 25)
+
+    def test_every_character_and_position_is_used(self):
+        policy = PasswordPolicy(length=8, uppercase=False, symbols=False)
+        alphabet = "".join(character_classes(policy))
+        passwords = generate_passwords(1000, policy)
+        self.assertEqual(set("".join(passwords)), set(alphabet))
+        for position in range(policy.length):
+            # The guaranteed digit is not always in the same place.
+            self.assertTrue(any(password[position].isdigit() for password in passwords), position)
+
+    def test_look_alikes_are_only_excluded_on_request(self):
+        self.assertFalse(set("".join(character_classes(PasswordPolicy()))) & set(generator.AMBIGUOUS))
+        self.assertLessEqual(set(generator.AMBIGUOUS) - {"|"},
+                             set("".join(character_classes(PasswordPolicy(exclude_ambiguous=False)))))
+
+    def test_impossible_policies_are_rejected(self):
+        for policy in (PasswordPolicy(length=generator.MIN_LENGTH - 1),
+                       PasswordPolicy(length=generator.MAX_LENGTH + 1),
+                       PasswordPolicy(lowercase=False, uppercase=False, digits=False, symbols=False)):
+            with self.subTest(policy=policy):
+                with self.assertRaises(ValueError):
+                    generate_passwords(1, policy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#
+# test_kdf.py - DARX PASS™ master password key derivation tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet, InvalidToken
+
+import kdf
+
+MASTER_PASSWORD = "correct horse battery staple"
+FAST = 0.001    # Calibration target; clamped to the minimum scrypt cost.
+
+
+class LockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_key = Fernet.generate_key()
+        self.lock = kdf.create_lock(MASTER_PASSWORD, self.data_key, target_seconds=FAST)
+
+    def test_unlock_returns_the_data_key(self):
+        self.assertEqual(self.lock["kdf"], kdf.KDF_NAME)
+        self.assertEqual(kdf.unlock(MASTER_PASSWORD, self.lock), self.data_key)
+
+    def test_wrong_password_is_rejected(self):
+        with self.assertRaises(InvalidToken):
+            kdf.unlock("correct horse battery stapler", self.lock)
+
+    def test_unknown_kdf_is_rejected(self):
+        with self.assertRaises(ValueError):
+            kdf.unlock(MASTER_PASSWORD, {**self.lock, "kdf": "pbkdf2"})
+
+    def test_each_lock_has_its_own_salt(self):
+        other = kdf.create_lock(MASTER_PASSWORD, self.data_key, target_seconds=FAST)
+        self.assertNotEqual(other["salt"], self.lock["salt"])
+        self.assertNotEqual(other["key"], self.lock["key"])
+
+    def test_calibration_stays_within_bounds(self):
+        self.assertEqual(kdf.calibrate(FAST)["n"], 2 ** kdf.SCRYPT_MIN_LOG2_N)
+        self.assertEqual(kdf.calibrate(1e9)["n"], 2 ** kdf.SCRYPT_MAX_LOG2_N)
+
+    def test_retune_rewraps_the_same_data_key(self):
+        retuned = kdf.retune(MASTER_PASSWORD, self.lock, target_seconds=FAST)
+        self.assertNotEqual(retuned["salt"], self.lock["salt"])
+        self.assertEqual(kdf.unlock(MASTER_PASSWORD, retuned), self.data_key)
+        with self.assertRaises(InvalidToken):
+            kdf.retune("wrong", self.lock, target_seconds=FAST)
+
+
+class KeyRotationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_key = Fernet.generate_key()
+        self.lock = kdf.create_lock(MASTER_PASSWORD, self.data_key, target_seconds=FAST)
+
+    def test_rotated_vault_still_reads_old_records(self):
+        old_token = Fernet(self.data_key).encrypt(b"old record")
+        new_key, lock = kdf.rotate_key(MASTER_PASSWORD, self.lock)
+        self.assertNotEqual(new_key, self.data_key)
+        self.assertEqual(kdf.unlock(MASTER_PASSWORD, lock), new_key)
+        self.assertEqual(kdf.retired_keys(new_key, lock), [self.data_key])
+
+        fernet = kdf.vault_fernet(new_key, lock)
+        self.assertEqual(fernet.decrypt(old_token), b"old record")
+        self.assertEqual(Fernet(new_key).decrypt(fernet.encrypt(b"new record")), b"new record")
+
+        finished = kdf.end_rotation(lock)
+        self.assertNotIn("retired_keys", finished)
+        with self.assertRaises(InvalidToken):
+            kdf.vault_fernet(new_key, finished).decrypt(old_token)
+
+    def test_rotating_again_keeps_every_unfinished_key(self):
+        middle_key, lock = kdf.rotate_key(MASTER_PASSWORD, self.lock)
+        newest_key, lock = kdf.rotate_key(MASTER_PASSWORD, lock)
+        self.assertEqual(kdf.retired_keys(newest_key, lock), [middle_key, self.data_key])
+
+    def test_retune_keeps_the_retired_keys(self):
+        new_key, lock = kdf.rotate_key(MASTER_PASSWORD, self.lock)
+        retuned = kdf.retune(MASTER_PASSWORD, lock, target_seconds=FAST)
+        self.assertEqual(kdf.retired_keys(kdf.unlock(MASTER_PASSWORD, retuned), retuned), [self.data_key])
+
+
+if __name__ == "__main__":
+    unittest.main()
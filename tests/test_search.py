@@ -0,0 +1,69 @@
+#
+# test_search.py - DARX PASS™ search index tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex, _trigrams
+
+
+def _entries(count):
+    return [{"id": f"{i:016x}", "site": f"site{i}.example", "username": f"user{i}"} for i in range(count)]
+
+
+class SearchIndexOrderTest(unittest.TestCase):
+
+    def test_update_keeps_vault_order(self):
+        entries = _entries(5)
+        index = SearchIndex(entries)
+        edited = {**entries[1], "username": "renamed"}
+        index.update(edited)
+        self.assertEqual([entry["id"] for entry in index.search("")],
+                         [entry["id"] for entry in entries])
+        self.assertIs(index.search("")[1], edited)
+        self.assertEqual(index.search("renamed"), [edited])
+
+    def test_remove_then_add_appends(self):
+        entries = _entries(3)
+        index = SearchIndex(entries)
+        index.remove(entries[0]["id"])
+        index.add(entries[0])
+        self.assertEqual([entry["id"] for entry in index.search("")],
+                         [entries[1]["id"], entries[2]["id"], entries[0]["id"]])
+
+    def test_grouped_descending_reverses_domains(self):
+        entries = [{"id": f"{i:016x}", "site": site, "username": f"user{i}"}
+                   for i, site in enumerate(["a.com", "b.com", "a.com/x", "c.com"])]
+        index = SearchIndex(entries)
+        self.assertEqual([domain for domain, _ in index.search_grouped("")], ["a.com", "b.com", "c.com"])
+        self.assertEqual([domain for domain, _ in index.search_grouped("", descending=True)],
+                         ["c.com", "b.com", "a.com"])
+
+
+class TrigramTest(unittest.TestCase):
+
+    def test_short_fields_have_no_trigrams(self):
+        _trigrams(("a" * 50, "b" * 50))  # Grow the cached slices past the fields below.
+        self.assertEqual(_trigrams(("", "")), set())
+        self.assertEqual(_trigrams(("x", "")), set())
+        self.assertEqual(_trigrams(("ab", "y")), set())
+        self.assertEqual(_trigrams(("abcd", "")), {"abc", "bcd"})
+
+    def test_empty_username_indexes_only_site_grams(self):
+        index = SearchIndex([{"id": "0", "site": "github.com", "username": ""},
+                             {"id": "1", "site": "gitlab.com", "username": "q"}])
+        self.assertTrue(all(len(gram) == 3 for gram in index._grams))
+        self.assertEqual([entry["id"] for entry in index.search("hub")], ["0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
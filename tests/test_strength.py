@@ -0,0 +1,75 @@
+#
+# test_strength.py - DARX PASS™ password strength engine tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import math
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import strength
+from strength import evaluate
+
+FULL_ASCII_POOL = 26 + 26 + 10 + 33
+
+
+class EvaluateTest(unittest.TestCase):
+
+    def test_empty_password_has_no_score(self):
+        self.assertEqual(evaluate(""), strength.Strength("", 0.0, ()))
+
+    def test_random_password_is_strong(self):
+        result = evaluate("Zq8#Q7mXv2")
+        self.assertEqual(result.label, "Strong")
+        self.assertAlmostEqual(result.bits, 10 * math.log2(FULL_ASCII_POOL))
+        self.assertEqual(result.warnings, ())
+
+    def test_common_password_costs_one_wordlist_pick(self):
+        result = evaluate("Password")
+        self.assertEqual(result.label, "Weak")
+        self.assertAlmostEqual(result.bits, math.log2(len(strength._wordlist())))
+        self.assertEqual(result.warnings[0], "a common password")
+
+    def test_substitutions_and_trailing_digits_do_not_hide_a_common_password(self):
+        self.assertEqual(evaluate("p@$$w0rd").warnings[:1], ("a common password",))
+        self.assertEqual(evaluate("monkey99").warnings[:1], ("a common password",))
+
+    def test_common_word_inside_a_password(self):
+        result = evaluate("monkeyxK9#q")
+        self.assertEqual(result.warnings, ('the common word "monkey"',))
+        self.assertLess(result.bits, evaluate("qrvwzpxK9#q").bits)
+
+    def test_pattern_runs_cost_a_bit_per_character(self):
+        # The first character of a run is worth a full character; the 5 that follow it one bit each.
+        for password, warning in (("Zq8#mnopqr", "sequences like abc or 123"),
+                                  ("Zq8#zyxwvu", "sequences like abc or 123"),
+                                  ("Zq8#dfghjk", "keyboard patterns like qwerty")):
+            with self.subTest(password=password):
+                result = evaluate(password)
+                self.assertAlmostEqual(result.bits, 5 * math.log2(FULL_ASCII_POOL) + 5 * strength.PATTERN_CHAR_BITS)
+                self.assertEqual(result.warnings, (warning,))
+        self.assertIn("repeated characters", evaluate("Zq8#xxxxxx").warnings)
+
+    def test_runs_shorter_than_the_minimum_are_not_patterns(self):
+        result = evaluate("Zq8#ssTe")
+        self.assertEqual(result.warnings, ())
+        self.assertAlmostEqual(result.bits, 8 * math.log2(FULL_ASCII_POOL))
+
+    def test_labels_follow_the_thresholds(self):
+        for password in ("Zq8#ssTe", "Zq8#Q7mXv2", "x7#Kq9!mZ2$vR4&tL8", "héllo wörld ÿ"):
+            with self.subTest(password=password):
+                result = evaluate(password)
+                expected = ("Strong" if result.bits >= strength.STRONG_BITS
+                            else "Medium" if result.bits >= strength.MEDIUM_BITS else "Weak")
+                self.assertEqual(result.label, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#
+# test_sync.py - DARX PASS™ vault merge tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+import vault
+from sync import merge_vault, shares_key
+from vault import VaultStore
+
+
+class MergeTest(unittest.TestCase):
+    """Two copies of one vault, "ours" and "theirs", changed apart at controlled times and merged."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)  # After the stores open() leaves open have been closed.
+        self.ours_path = os.path.join(self.directory.name, "ours.json")
+        self.theirs_path = os.path.join(self.directory.name, "theirs.json")
+        self.fernet = Fernet(Fernet.generate_key())
+        self.now = 1000
+        for patch in (mock.patch("time.time", lambda: self.now), mock.patch.object(vault, "CHUNK_SIZE", 4)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        store = self.open(self.ours_path)
+        self.ids = {entry["site"]: entry["id"] for entry in store.add_many(
+            [{"site": site, "username": "u", "password": "original"}
+             for site in ("a", "b", "c", "d", "e", "f", "g", "h", "i")])}
+        store.compact()
+        store.close()
+
+    def open(self, path):
+        store = VaultStore(path, self.fernet)
+        store.load()
+        self.addCleanup(store.close)
+        return store
+
+    def copy_ours(self):
+        """Carries the vault to the other machine: theirs becomes a byte for byte copy of ours."""
+        shutil.copyfile(self.ours_path, self.theirs_path)
+        journal = self.theirs_path + vault.JOURNAL_SUFFIX
+        if os.path.exists(journal):
+            os.remove(journal)
+
+    def edit(self, path, at, changes=(), deletions=(), additions=()):
+        self.now = at
+        store = self.open(path)
+        for site, password in changes:
+            store.update(self.ids[site], {"password": password})
+        for site in deletions:
+            store.delete(self.ids[site])
+        store.add_many([{"site": site, "username": "u", "password": "new"} for site in additions])
+        store.close()
+
+    def merge(self, at):
+        self.now = at
+        store = self.open(self.ours_path)
+        return store, merge_vault(store, self.theirs_path)
+
+    def passwords(self, store):
+        return {entry["site"]: store.reveal(entry) for entry in store.entries}
+
+    def test_identical_copies_read_nothing_but_the_header(self):
+        self.copy_ours()
+        store, result = self.merge(at=2000)
+        self.assertEqual(result[:4], ([], [], [], []))
+        self.assertEqual((result.compared, result.chunks, result.chunks_read), (0, 3, 0))
+        self.assertEqual(store.synced, 2000)
+
+    def test_three_way_merge_since_the_last_merge(self):
+        self.copy_ours()
+        self.merge(at=2000)[0].close()
+        self.copy_ours()  # Both copies now record the merge at 2000: the base.
+
+        self.edit(self.ours_path, at=3000, changes=[("b", "ours"), ("c", "ours"), ("f", "ours")], deletions=["g"])
+        self.edit(self.theirs_path, at=3005, changes=[("a", "theirs"), ("c", "theirs"), ("d", "theirs")],
+                  deletions=["e", "f"], additions=["j"])
+        self.edit(self.ours_path, at=3010, changes=[("d", "ours later")])
+        store, result = self.merge(at=4000)
+
+        self.assertEqual(self.passwords(store), {
+            "a": "theirs",         # Changed on their side only.
+            "b": "ours",           # Changed on our side only.
+            "c": "theirs",         # Changed on both: their edit is more recent.
+            "d": "ours later",     # Changed on both: our edit is more recent.
+            "f": "ours",           # Deleted on their side, but changed on ours since.
+            "h": "original", "i": "original",
+            "j": "new"})           # Added on their side; "e" deleted there, "g" deleted here.
+        self.assertEqual(sorted(entry["site"] for entry in result.added), ["j"])
+        self.assertEqual(sorted(entry["site"] for entry in result.updated), ["a", "c"])
+        self.assertEqual(sorted(entry["site"] for entry in result.deleted), ["e"])
+        self.assertEqual(sorted((conflict.entry["site"], conflict.theirs) for conflict in result.conflicts),
+                         [("c", True), ("d", False)])
+        self.assertEqual([store.reveal(version) for version in store.history(self.ids["c"])],
+                         ["ours", "original"])  # The overwritten edit is kept.
+        self.assertLess(result.chunks_read, result.chunks)  # "i" is in a chunk both sides still share.
+
+    def test_copies_never_merged_lose_nothing(self):
+        self.copy_ours()
+        self.edit(self.ours_path, at=3000, deletions=["a"], additions=["j"])
+        self.edit(self.theirs_path, at=3005, deletions=["b"])
+        store, result = self.merge(at=4000)
+        self.assertEqual(sorted(self.passwords(store)), ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"])
+        self.assertEqual(result.deleted, [])
+        self.assertEqual([entry["site"] for entry in result.added], ["a"])
+
+    def test_copy_under_another_key_needs_its_own(self):
+        self.copy_ours()
+        self.assertTrue(shares_key(self.open(self.ours_path), self.theirs_path))
+        self.fernet = Fernet(Fernet.generate_key())
+        self.assertFalse(shares_key(self.open(os.path.join(self.directory.name, "other.json")), self.theirs_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#
+# test_transfer.py - DARX PASS™ import and export tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet, InvalidToken
+
+import transfer
+from transfer import PassphraseRequired, export_entries, import_into, read_export_header, read_import
+from vault import VaultStore
+
+ENTRIES = [{"site": "example.com", "username": "alice", "password": "hunter2"},
+           {"site": "example.org", "username": "bob", "password": "correct horse"}]
+
+
+def _reveal(entry):
+    return entry["password"]
+
+
+class ExportFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "export.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @unittest.skipIf(os.name != "posix", "POSIX file modes")
+    def test_export_is_private_to_the_user(self):
+        old_umask = os.umask(0o022)
+        try:
+            self.assertEqual(export_entries(ENTRIES, _reveal, self.path), 2)
+        finally:
+            os.umask(old_umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_failed_export_leaves_no_file(self):
+        def reveal(entry):
+            if entry["username"] == "bob":
+                raise ValueError("cannot decrypt")
+            return entry["password"]
+
+        with self.assertRaises(ValueError):
+            export_entries(ENTRIES, reveal, self.path)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+class ImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault = VaultStore(os.path.join(self.directory.name, "vault_data.json"), Fernet(Fernet.generate_key()))
+        self.vault.load()
+        self.vault.add({"site": "example.com", "username": "alice", "password": "hunter2"})
+
+    def tearDown(self):
+        self.vault.close()
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+    def test_duplicates_and_incomplete_rows_are_skipped(self):
+        path = self.write("chrome.csv", "name,url,username,password\n"
+                                        "Example, Example.COM ,Alice,other\n"     # Already in the vault.
+                                        "Example,example.org,bob,pw1\n"
+                                        "Example,EXAMPLE.org,BOB ,pw2\n"          # Repeats the row above.
+                                        "Example,example.net,carol,\n")           # No password.
+        result, stored = import_into(self.vault, path)
+        self.assertEqual(result, transfer.ImportResult("Chrome", 1, 2, 1))
+        self.assertEqual([(entry["site"], self.vault.reveal(entry)) for entry in stored], [("example.org", "pw1")])
+        self.assertEqual(len(self.vault.entries), 2)
+
+    def test_bitwarden_items_that_are_not_logins_are_ignored(self):
+        path = self.write("bitwarden.csv", "\ufefffolder,type,name,login_uri,login_username,login_password\n"
+                                           ",login,Example,https://example.org,bob,pw\n"
+                                           ",note,Recovery codes,,,\n")
+        self.assertEqual(list(read_import(path)),
+                         [("Bitwarden", {"site": "https://example.org", "username": "bob", "password": "pw"})])
+
+    def test_unknown_layout_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(read_import(self.write("other.csv", "a,b,c\n1,2,3\n")))
+
+
+class ExportRoundTripTest(unittest.TestCase):
+
+    ENTRIES = ENTRIES + [{"site": "exämple.net", "username": "carol, \"c\"", "password": "line one\nline two 🔑"}]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def round_trip(self, content, passphrase=None):
+        path = os.path.join(self.directory.name, "export." + content)
+        self.assertEqual(export_entries(self.ENTRIES, _reveal, path, content, passphrase), len(self.ENTRIES))
+        return path, [entry for _, entry in read_import(path, passphrase)]
+
+    def test_plain_exports_read_back(self):
+        for content in ("csv", "json"):
+            with self.subTest(content=content):
+                path, entries = self.round_trip(content)
+                self.assertIsNone(read_export_header(path))
+                self.assertEqual(entries, self.ENTRIES)
+
+    @mock.patch.object(transfer, "EXPORT_BLOCK_BYTES", 16)  # Rows and lines split across blocks.
+    def test_encrypted_exports_read_back_with_the_passphrase(self):
+        for content in ("csv", "json"):
+            with self.subTest(content=content):
+                path, entries = self.round_trip(content, "export passphrase")
+                self.assertEqual(read_export_header(path)["content"], content)
+                self.assertEqual(entries, self.ENTRIES)
+                with open(path, 'rb') as f:
+                    self.assertNotIn(b"hunter2", f.read())
+                with self.assertRaises(PassphraseRequired):
+                    list(read_import(path))
+                with self.assertRaises(InvalidToken):
+                    list(read_import(path, "wrong passphrase"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,400 @@
+#
+# test_vault.py - DARX PASS™ vault storage tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import random
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+import kdf
+import vault
+from codec import decode_entries
+from vault import VaultStore, VaultInUse
+
+
+class VaultOpenLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.fernet = Fernet(Fernet.generate_key())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_second_store_cannot_open_the_vault(self):
+        store = VaultStore(self.vault_path, self.fernet)
+        store.load()
+        store.add({"site": "example.com", "username": "alice", "password": "secret"})
+        with self.assertRaises(VaultInUse):
+            VaultStore(self.vault_path, self.fernet).load()
+        store.close()
+
+        other = VaultStore(self.vault_path, self.fernet)
+        self.assertEqual([entry["site"] for entry in other.load()], ["example.com"])
+        other.close()
+
+
+class VaultJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.journal_path = self.vault_path + vault.JOURNAL_SUFFIX
+        self.fernet = Fernet(Fernet.generate_key())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self):
+        store = VaultStore(self.vault_path, self.fernet)
+        store.load()
+        self.addCleanup(store.close)
+        return store
+
+    def test_changes_are_replayed_from_the_journal(self):
+        store = self.load()
+        alice = store.add({"site": "example.com", "username": "alice", "password": "one"})
+        bob = store.add({"site": "example.org", "username": "bob", "password": "two"})
+        store.update(alice["id"], {"password": "three"})
+        store.delete(bob["id"])
+        store.close()
+        self.assertGreater(os.path.getsize(self.journal_path), 0)  # Too few records to have been compacted.
+
+        reloaded = self.load()
+        self.assertEqual([(entry["site"], reloaded.reveal(entry)) for entry in reloaded.entries],
+                         [("example.com", "three")])
+
+    def test_torn_final_record_is_dropped_and_cut_off(self):
+        store = self.load()
+        store.add({"site": "example.com", "username": "alice", "password": "one"})
+        store.close()
+        valid = os.path.getsize(self.journal_path)
+        with open(self.journal_path, 'ab') as f:
+            f.write(self.fernet.encrypt(b'{"op": "clear", "seq": 2}')[:40])  # A crash mid-append.
+
+        reloaded = self.load()
+        self.assertEqual([entry["site"] for entry in reloaded.entries], ["example.com"])
+        self.assertEqual(os.path.getsize(self.journal_path), valid)
+
+    def test_records_folded_into_the_snapshot_are_not_applied_twice(self):
+        store = self.load()
+        store.add({"site": "example.com", "username": "alice", "password": "one"})
+        store.flush()
+        with open(self.journal_path, 'rb') as f:
+            journal = f.read()
+        store.compact()
+        store.close()
+        with open(self.journal_path, 'wb') as f:
+            f.write(journal)  # As if a crash came between the snapshot rename and the journal rewrite.
+
+        reloaded = self.load()
+        self.assertEqual([entry["site"] for entry in reloaded.entries], ["example.com"])
+
+
+class VaultMutationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.fernet = Fernet(Fernet.generate_key())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @mock.patch.object(vault, "POSITION_REBUILD_DELETES", 8)
+    def test_edits_and_deletes_keep_vault_order(self):
+        rng = random.Random(3)
+        store = VaultStore(self.vault_path, self.fernet)
+        store.load()
+        expected = store.add_many([{"site": f"site{i}", "username": "u", "password": "p"} for i in range(200)])
+        for step in range(600):
+            action = rng.random()
+            if action < 0.4 and expected:
+                del expected[expected.index(store.delete(rng.choice(expected)["id"]))]
+            elif action < 0.8 and expected:
+                position = rng.randrange(len(expected))
+                expected[position] = store.update(expected[position]["id"], {"username": f"edit{step}"})
+            else:
+                expected.append(store.add({"site": f"new{step}", "username": "u", "password": "p"}))
+            self.assertEqual(store.entries, expected)
+        store.close()
+
+        reloaded = VaultStore(self.vault_path, self.fernet)  # Replays the journal through the same code.
+        self.assertEqual(reloaded.load(), expected)
+        reloaded.close()
+
+
+class VaultHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.history_path = self.vault_path + vault.HISTORY_SUFFIX
+        self.fernet = Fernet(Fernet.generate_key())
+        self.addCleanup(self.directory.cleanup)  # After the stores load() leaves open have been closed.
+
+    def load(self):
+        store = VaultStore(self.vault_path, self.fernet)
+        store.load()
+        self.addCleanup(store.close)
+        return store
+
+    def versions(self, store, entry_id):
+        return [(version["site"], version["username"], store.reveal(version), version["changed"])
+                for version in store.history(entry_id)]
+
+    def history_ids(self):
+        """Returns the entry id of every delta in the history file."""
+        with open(self.history_path, 'rb') as f:
+            tokens = f.read().split(b"\n")
+        return [delta["id"] for token in tokens if token for delta in decode_entries(self.fernet.decrypt(token))]
+
+    def test_earlier_versions_are_rebuilt_newest_first(self):
+        store = self.load()
+        entry_id = store.add({"site": "example.com", "username": "alice", "password": "one"})["id"]
+        store.update(entry_id, {"password": "two"})
+        store.update(entry_id, {"site": "example.org", "username": "alice", "password": "two"})  # Only the site changes.
+        store.update(entry_id, {"username": "bob", "password": "three"})
+        expected = [("example.org", "alice", "two", ["username", "secret"]),
+                    ("example.com", "alice", "two", ["site"]),
+                    ("example.com", "alice", "one", ["secret"])]
+        self.assertEqual(self.versions(store, entry_id), expected)
+        self.assertEqual(store.history(entry_id)[0]["id"], entry_id)
+
+        store.flush()
+        with open(self.history_path, 'rb') as f:
+            self.assertNotIn(b"example.com", f.read())
+        store.close()
+        self.assertEqual(self.versions(self.load(), entry_id), expected)
+
+    def test_an_edit_that_changes_nothing_adds_no_version(self):
+        store = self.load()
+        entry_id = store.add({"site": "example.com", "username": "alice", "password": "one"})["id"]
+        store.update(entry_id, {"site": "example.com", "username": "alice", "password": "one"})
+        self.assertEqual(store.history(entry_id), [])
+
+    def test_unwritten_edits_join_the_history_read_from_disk(self):
+        store = self.load()
+        entry_id = store.add({"site": "example.com", "username": "alice", "password": "one"})["id"]
+        store.update(entry_id, {"password": "two"})
+        store.close()
+
+        store = self.load()
+        store.update(entry_id, {"password": "three"})  # Queued; history() has not read the file yet.
+        self.assertEqual([store.reveal(version) for version in store.history(entry_id)], ["two", "one"])
+
+    @mock.patch.object(vault, "HISTORY_MAX_VERSIONS", 3)
+    def test_deleted_entries_and_old_versions_leave_the_file(self):
+        store = self.load()
+        kept = store.add({"site": "example.com", "username": "alice", "password": "0"})["id"]
+        gone = store.add({"site": "example.org", "username": "bob", "password": "0"})["id"]
+        for i in range(1, 6):
+            store.update(kept, {"password": str(i)})
+            store.update(gone, {"password": str(i)})
+        self.assertEqual([store.reveal(version) for version in store.history(kept)], ["4", "3", "2"])
+        store.flush()
+        self.assertEqual(len(self.history_ids()), 10)
+
+        store.delete(gone)
+        store.flush()
+        self.assertEqual(self.history_ids(), [kept] * 3)
+        self.assertEqual([store.reveal(version) for version in store.history(kept)], ["4", "3", "2"])
+
+    def test_torn_final_line_is_cut_off(self):
+        store = self.load()
+        entry_id = store.add({"site": "example.com", "username": "alice", "password": "one"})["id"]
+        store.update(entry_id, {"password": "two"})
+        store.close()
+        with open(self.history_path, 'ab') as f:
+            f.write(self.fernet.encrypt(b"crash")[:30])
+
+        store = self.load()
+        self.assertEqual([store.reveal(version) for version in store.history(entry_id)], ["one"])
+        store.update(entry_id, {"password": "three"})
+        store.close()
+        self.assertEqual([store.reveal(version) for version in self.load().history(entry_id)], ["two", "one"])
+
+
+class VaultKeyRotationTest(unittest.TestCase):
+
+    MASTER_PASSWORD = "correct horse battery staple"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.addCleanup(self.directory.cleanup)  # After the stores open() leaves open have been closed.
+        chunk_size = mock.patch.object(vault, "CHUNK_SIZE", 10)  # Also while setUp() writes the vault.
+        chunk_size.start()
+        self.addCleanup(chunk_size.stop)
+        self.old_key = Fernet.generate_key()
+        store = VaultStore(self.vault_path, Fernet(self.old_key),
+                           lock=kdf.create_lock(self.MASTER_PASSWORD, self.old_key, target_seconds=0.001))
+        store.load()
+        self.passwords = {entry["id"]: f"password{i}" for i, entry in enumerate(store.add_many(
+            [{"site": f"site{i}", "username": "u", "password": f"password{i}"} for i in range(35)]))}
+        store.close()
+
+    def open(self):
+        """Opens the vault the way the app does: with whatever key and retired keys its lock header holds."""
+        lock = vault.read_lock(self.vault_path)
+        store = VaultStore(self.vault_path, kdf.vault_fernet(kdf.unlock(self.MASTER_PASSWORD, lock), lock), lock=lock)
+        store.load()
+        self.addCleanup(store.close)
+        return store
+
+    def begin(self):
+        store = self.open()
+        self.new_key, lock = kdf.rotate_key(self.MASTER_PASSWORD, store.lock)
+        store.begin_key_rotation(kdf.vault_fernet(self.new_key, lock), lock)
+        return store
+
+    def assertPasswords(self, store):
+        self.assertEqual({entry["id"]: store.reveal(entry) for entry in store.entries}, self.passwords)
+
+    def test_rotation_carries_on_from_its_checkpoint(self):
+        store = self.begin()
+        self.assertEqual(store.rotation_remaining(), 35)
+        self.assertEqual(store.rotate_batch(max_entries=10), 10)
+        edited = store.entries[-1]["id"]  # In a chunk not yet rotated.
+        store.update(edited, {"password": "edited"})
+        self.passwords[edited] = "edited"
+        store.close()
+
+        store = self.open()
+        self.assertTrue(store.rotating)
+        self.assertEqual(store.rotation_remaining(), 25)
+        self.assertPasswords(store)
+        new_only = Fernet(self.new_key)
+        for entry in store.entries[:10] + [store.by_id[edited]]:
+            new_only.decrypt(entry["secret"].encode('ascii'))
+        with self.assertRaises(ValueError):
+            store.end_key_rotation(new_only, kdf.end_rotation(store.lock))
+
+        while store.rotate_batch(max_entries=10):
+            pass
+        self.assertEqual(store.rotation_remaining(), 0)
+        store.end_key_rotation(new_only, kdf.end_rotation(store.lock))
+        store.close()
+
+        store = self.open()
+        self.assertNotIn("retired_keys", store.lock)
+        self.assertFalse(store.rotating)
+        self.assertEqual(kdf.unlock(self.MASTER_PASSWORD, store.lock), self.new_key)
+        self.assertPasswords(store)
+        self.assertEqual([store.reveal(version) for version in store.history(edited)], ["password34"])
+
+    def test_rotation_interrupted_before_its_first_batch(self):
+        self.begin().close()
+        store = self.open()
+        self.assertEqual(store.rotation_remaining(), 35)
+        self.assertPasswords(store)
+
+
+class VaultWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.vault_path = os.path.join(self.directory.name, "vault_data.json")
+        self.journal_path = self.vault_path + vault.JOURNAL_SUFFIX
+        self.fernet = Fernet(Fernet.generate_key())
+        self.store = VaultStore(self.vault_path, self.fernet)
+        self.store.load()
+        self.statuses = []
+        self.status_changed = threading.Condition()
+        self.store.status_listener = self.on_status
+        self.appends = []
+        self.append_synced = vault.append_synced
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def on_status(self, unsaved, error):
+        with self.status_changed:
+            self.statuses.append((unsaved, error))
+            self.status_changed.notify_all()
+
+    def wait_for_status(self, status):
+        """The writer reports after it has woken flush(), so wait for the listener rather than assume it ran."""
+        with self.status_changed:
+            self.assertTrue(self.status_changed.wait_for(lambda: self.statuses[-1] == status, timeout=5),
+                            self.statuses)
+
+    def append(self, path, data, error=None):
+        if path == self.journal_path:
+            self.appends.append(data.count(b"\n"))
+            if error is not None:
+                raise error
+        self.append_synced(path, data)
+
+    def journal_size(self):
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    @mock.patch.object(vault, "WRITE_DELAY_SECONDS", 60)  # Only flush() cuts the wait short.
+    def test_a_burst_of_changes_is_written_together(self):
+        with mock.patch.object(vault, "append_synced", self.append):
+            for i in range(20):
+                self.store.add({"site": f"site{i}", "username": "u", "password": "p"})
+            self.store.flush()
+        self.assertEqual(self.appends, [20])
+        self.wait_for_status((0, None))
+
+    def test_failed_write_is_reported_and_retried(self):
+        disk_full = OSError("No space left on device")
+        with mock.patch.object(vault, "append_synced", lambda path, data: self.append(path, data, disk_full)):
+            entry = self.store.add({"site": "example.com", "username": "alice", "password": "one"})
+            with self.assertRaises(OSError):
+                self.store.flush()
+            self.wait_for_status((1, disk_full))
+            self.assertEqual(self.store.entries, [entry])  # Still there, and still queued.
+            self.assertEqual(self.journal_size(), 0)
+            with self.assertRaises(OSError):
+                self.store.close()  # Refuses to drop the change; the store stays open.
+            self.assertEqual(self.appends, [1, 1])
+
+        self.store.flush()
+        self.wait_for_status((0, None))
+        self.store.close()
+        reloaded = VaultStore(self.vault_path, self.fernet)
+        self.assertEqual(reloaded.load(), [entry])
+        reloaded.close()
+
+    def test_next_change_retries_after_a_failure(self):
+        disk_full = OSError("No space left on device")
+        with mock.patch.object(vault, "append_synced", lambda path, data: self.append(path, data, disk_full)):
+            self.store.add({"site": "example.com", "username": "alice", "password": "one"})
+            with self.assertRaises(OSError):
+                self.store.flush()
+        self.store.add({"site": "example.org", "username": "bob", "password": "two"})
+        self.store.flush()
+        self.store.close()
+        reloaded = VaultStore(self.vault_path, self.fernet)
+        self.assertEqual([entry["site"] for entry in reloaded.load()], ["example.com", "example.org"])
+        reloaded.close()
+
+    def test_failed_append_leaves_no_torn_record(self):
+        with open(self.journal_path, 'wb') as f:
+            f.write(b"record\n")
+        with mock.patch.object(os, "fsync", side_effect=OSError("I/O error")):
+            with self.assertRaises(OSError):
+                vault.append_synced(self.journal_path, b"torn record\n")
+        with open(self.journal_path, 'rb') as f:
+            self.assertEqual(f.read(), b"record\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#
+# test_vaults.py - DARX PASS™ unlocked-vault cache tests
+# Author: DARX Tech
+#
+# Run from the repository root:
+#
+#   python -m unittest discover tests
+#
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vaults import OpenVault, VaultCache
+
+
+class _Store:
+    """Stands in for a VaultStore; close() fails while error is set, as when its changes cannot be written."""
+
+    def __init__(self, error=None):
+        self.entries = [{"id": "0"}]
+        self.by_id = {"0": self.entries[0]}
+        self.fernet = object()
+        self.error = error
+        self.closed = False
+
+    def close(self):
+        if self.error is not None:
+            raise self.error
+        self.closed = True
+
+
+class VaultCacheEvictionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.errors = []
+        self.cache = VaultCache(max_vaults=1, idle_seconds=10)
+        self.cache.error_listener = lambda path, error: self.errors.append((path, str(error)))
+
+    def test_vault_that_cannot_close_stays_cached(self):
+        store = _Store(OSError("disk full"))
+        self.cache.put(OpenVault("team.json", store))
+        self.assertEqual(self.cache.evict_idle(now=float("inf")), [])
+        self.assertIn("team.json", self.cache)
+        self.assertEqual(self.errors, [("team.json", "disk full")])
+        self.assertEqual(store.entries, [{"id": "0"}])  # Nothing dropped from a store that is still open.
+
+        store.error = None
+        self.assertEqual(self.cache.evict_idle(now=float("inf")), ["team.json"])
+        self.assertTrue(store.closed)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_put_evicts_past_a_vault_that_cannot_close(self):
+        self.cache.put(OpenVault("stuck.json", _Store(OSError("disk full"))))
+        self.assertEqual(self.cache.put(OpenVault("ok.json", _Store())), ["ok.json"])
+        self.assertEqual(len(self.cache), 1)
+        self.assertIn("stuck.json", self.cache)
+        self.assertEqual([path for path, _ in self.errors], ["stuck.json"])
+
+    def test_without_a_listener_the_error_is_raised(self):
+        self.cache.error_listener = None
+        self.cache.put(OpenVault("team.json", _Store(OSError("disk full"))))
+        with self.assertRaises(OSError):
+            self.cache.evict_idle(now=float("inf"))
+        self.assertIn("team.json", self.cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
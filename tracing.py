@@ -0,0 +1,153 @@
+#
+# tracing.py - DARX PASS™ opt-in timing instrumentation
+# Author: DARX Tech
+#
+# Times named spans around the slow phases of the app (file I/O, Fernet, entry
+# decoding, Qt table work) when enabled with the DARX_TRACE environment variable
+# or the --trace command-line flag:
+#
+#   DARX_TRACE=1 python main.py               # writes darx_trace.json
+#   python main.py --trace=/tmp/darx.json
+#
+# On exit the spans are written in the Chrome trace event format (open them in
+# chrome://tracing or https://ui.perfetto.dev) and a summary table is printed to
+# stderr. When tracing is off, span() returns a shared no-op context manager.
+#
+# This module must not import Qt.
+#
+
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import nullcontext
+
+TRACE_ENV = "DARX_TRACE"
+TRACE_FLAG = "--trace"
+DEFAULT_TRACE_FILE = "darx_trace.json"
+
+_NO_SPAN = nullcontext()
+_ORIGIN_NS = time.perf_counter_ns()
+
+_events = None        # Recorded trace events; None while tracing is off.
+_thread_names = {}    # thread id -> name, emitted as metadata events.
+_trace_path = None
+_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        event = {"name": self.name, "cat": "darx", "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                 "ts": (self.start - _ORIGIN_NS) / 1000, "dur": (end - self.start) / 1000}
+        if self.args:
+            event["args"] = self.args
+        with _lock:
+            if _events is not None:
+                _events.append(event)
+                _thread_names.setdefault(thread.ident, thread.name)
+        return False
+
+
+def enabled():
+    return _events is not None
+
+
+def span(name, **args):
+    """Returns a context manager that records how long its block takes, if tracing is on."""
+    if _events is None:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator form of span(); the span is named after the function unless name is given."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure(argv=None):
+    """Enables tracing if DARX_TRACE or --trace[=PATH] is given; the flag is removed from argv.
+    Returns True if tracing is on."""
+    path = os.environ.get(TRACE_ENV) or None
+    if path in ("1", "true", "yes"):
+        path = DEFAULT_TRACE_FILE
+    if argv is not None:
+        for arg in list(argv[1:]):
+            if arg == TRACE_FLAG or arg.startswith(TRACE_FLAG + "="):
+                argv.remove(arg)
+                path = arg.partition("=")[2] or DEFAULT_TRACE_FILE
+    if path and path not in ("0", "false", "no"):
+        enable(path)
+    return enabled()
+
+
+def enable(path=DEFAULT_TRACE_FILE):
+    """Starts recording spans; they are written to path when the process exits."""
+    global _events, _trace_path
+    with _lock:
+        if _events is None:
+            _events = []
+            atexit.register(_finish)
+        _trace_path = os.path.abspath(path)
+
+
+def write(path):
+    """Writes the spans recorded so far as a Chrome trace event file."""
+    with _lock:
+        events = list(_events or ())
+        names = dict(_thread_names)
+    pid = os.getpid()
+    metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "DARX PASS"}}]
+    metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+                 for tid, thread_name in names.items()]
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+
+def summary():
+    """Returns a table of span count, total, mean and max time per span name, slowest first.
+    Totals of enclosing spans include the spans nested in them."""
+    with _lock:
+        events = list(_events or ())
+    stats = {}
+    for event in events:
+        count, total, longest = stats.get(event["name"], (0, 0.0, 0.0))
+        stats[event["name"]] = (count + 1, total + event["dur"], max(longest, event["dur"]))
+
+    width = max([len(name) for name in stats] + [4])
+    lines = [f"{'span':<{width}} {'count':>7} {'total ms':>11} {'mean ms':>10} {'max ms':>10}"]
+    for name, (count, total, longest) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<{width}} {count:>7} {total / 1000:>11.2f} {total / count / 1000:>10.2f} {longest / 1000:>10.2f}")
+    return "\n".join(lines)
+
+
+def _finish():
+    try:
+        write(_trace_path)
+    except OSError as e:
+        print(f"Could not write trace file {_trace_path}: {e}", file=sys.stderr)
+    else:
+        print(f"\nTrace written to {_trace_path}", file=sys.stderr)
+    print(summary(), file=sys.stderr)
@@ -0,0 +1,258 @@
+#
+# transfer.py - DARX PASS™ bulk import and export
+# Author: DARX Tech
+#
+# Imports the CSV exports of Chrome, Firefox, Bitwarden and KeePass/KeePassXC
+# (recognised by their header row), plus DARX PASS™'s own exports, and exports
+# the vault as CSV or JSON. Both directions stream: rows are parsed and written
+# one at a time, so neither side ever holds the whole file in memory.
+#
+# Exports can be encrypted under a passphrase. An encrypted export is a JSON
+# header line holding a kdf.py lock header, followed by one Fernet token per line,
+# each encrypting the next EXPORT_BLOCK_BYTES of the CSV or JSON text:
+#
+#   {"format": "darx-export", "version": 1, "content": "csv", "lock": {...}}
+#   <token>
+#   <token>
+#
+# This module must not import Qt.
+#
+
+import os
+import csv
+import json
+from collections import namedtuple
+
+from cryptography.fernet import Fernet
+
+import kdf
+import tracing
+
+# --- Configuration Constants ---
+EXPORT_FORMAT = "darx-export"
+EXPORT_VERSION = 1
+EXPORT_BLOCK_BYTES = 256 * 1024     # Plaintext per encrypted block.
+EXPORT_FIELDS = ("site", "username", "password")
+
+# Header columns that identify each source, and where site/username/password are in it.
+# Each field lists candidate columns in order of preference.
+SOURCES = {
+    "Bitwarden": ({"login_uri", "login_username", "login_password"},
+                  {"site": ("login_uri", "name"), "username": ("login_username",), "password": ("login_password",)}),
+    "Firefox": ({"url", "username", "password", "httprealm"},
+                {"site": ("url",), "username": ("username",), "password": ("password",)}),
+    "Chrome": ({"name", "url", "username", "password"},
+               {"site": ("url", "name"), "username": ("username",), "password": ("password",)}),
+    "KeePass": ({"title", "username", "password", "url"},
+                {"site": ("url", "title"), "username": ("username",), "password": ("password",)}),
+    "DARX PASS": ({"site", "username", "password"},
+                  {"site": ("site",), "username": ("username",), "password": ("password",)}),
+}
+
+ImportResult = namedtuple("ImportResult", "source added duplicates invalid")
+
+
+class PassphraseRequired(Exception):
+    """The file is an encrypted export and no passphrase was given."""
+
+
+# --- Encrypted Exports ---
+
+class _EncryptedWriter:
+    """A text file-like object that encrypts what is written to it in EXPORT_BLOCK_BYTES blocks."""
+
+    def __init__(self, f, fernet):
+        self._file = f
+        self._fernet = fernet
+        self._buffer = []
+        self._size = 0
+
+    def write(self, text):
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= EXPORT_BLOCK_BYTES:
+            self.flush_block()
+        return len(text)
+
+    def flush_block(self):
+        if self._buffer:
+            self._file.write(self._fernet.encrypt("".join(self._buffer).encode('utf-8')) + b"\n")
+            self._buffer.clear()
+            self._size = 0
+
+
+def _decrypted_lines(f, fernet):
+    """Yields the text lines of an encrypted export, decrypting one block at a time."""
+    partial = ""
+    for token in f:
+        token = token.strip()
+        if not token:
+            continue
+        lines = (partial + fernet.decrypt(token).decode('utf-8')).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if partial:
+        yield partial
+
+
+def read_export_header(path):
+    """Returns the header of an encrypted export, or None if path is not one."""
+    with open(path, 'rb') as f:
+        first_line = f.readline(64 * 1024)
+    if not first_line.startswith(b"{"):
+        return None
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        return None
+    return header if isinstance(header, dict) and header.get("format") == EXPORT_FORMAT else None
+
+
+# --- Import ---
+
+def _detect_source(columns):
+    columns = {column.strip().lower() for column in columns}
+    for source, (required, fields) in SOURCES.items():
+        if required <= columns:
+            return source, fields
+    raise ValueError("Unrecognised CSV layout. Expected an export from Chrome, Firefox, Bitwarden, "
+                     "KeePass or DARX PASS™ (with a header row).")
+
+
+def _first(row, candidates):
+    for column in candidates:
+        value = (row.get(column) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def _csv_rows(lines):
+    """Yields (source, {"site", "username", "password"}) for every row of a CSV export."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    source, fields = _detect_source(header)
+    columns = [column.strip().lower() for column in header]
+    type_column = columns.index("type") if source == "Bitwarden" and "type" in columns else None
+    for values in reader:
+        if type_column is not None and type_column < len(values) and values[type_column] != "login":
+            continue  # Bitwarden notes, cards and identities.
+        row = dict(zip(columns, values))
+        yield source, {field: _first(row, candidates) for field, candidates in fields.items()}
+
+
+def _json_rows(lines):
+    """Yields ("DARX PASS", entry) for every entry of a JSON export, one entry per line as export_entries writes it."""
+    for line in lines:
+        line = line.strip().rstrip(",")
+        if line in ("", "[", "]"):
+            continue
+        entry = json.loads(line)
+        yield "DARX PASS", {field: str(entry.get(field) or "").strip() if field != "password"
+                            else str(entry.get(field) or "") for field in EXPORT_FIELDS}
+
+
+def _rows(lines, content):
+    return _json_rows(lines) if content == "json" else _csv_rows(lines)
+
+
+def read_import(path, passphrase=None):
+    """Yields (source, entry) for every entry in a CSV/JSON export, decrypting DARX exports with passphrase.
+    Raises PassphraseRequired if the file is encrypted and no passphrase was given."""
+    header = read_export_header(path)
+    if header is None:
+        content = "json" if path.lower().endswith(".json") else "csv"
+        # utf-8-sig: spreadsheet tools like to prepend a byte order mark.
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            yield from _rows(f, content)
+        return
+    if passphrase is None:
+        raise PassphraseRequired()
+    fernet = Fernet(kdf.unlock(passphrase, header["lock"]))
+    with open(path, 'rb') as f:
+        f.readline()
+        yield from _rows(_decrypted_lines(f, fernet), header["content"])
+
+
+def _login_key(entry):
+    return entry["site"].strip().casefold(), entry["username"].strip().casefold()
+
+
+@tracing.traced("transfer.import")
+def import_into(vault, path, passphrase=None):
+    """Streams an export into the vault, skipping logins the vault (or the file) already has,
+    and commits everything with one vault write. Returns (ImportResult, stored entries)."""
+    seen = {_login_key(entry) for entry in vault.entries}
+    batch = []
+    duplicates = invalid = 0
+    source = None
+    for source, entry in read_import(path, passphrase):
+        if not all(entry.values()):
+            invalid += 1
+            continue
+        key = _login_key(entry)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        batch.append(entry)
+    stored = vault.add_many(batch)
+    return ImportResult(source, len(stored), duplicates, invalid), stored
+
+
+# --- Export ---
+
+def _write_csv(out, entries, reveal):
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for entry in entries:
+        writer.writerow((entry["site"], entry["username"], reveal(entry)))
+        count += 1
+    return count
+
+
+def _write_json(out, entries, reveal):
+    # One entry per line, so the importer can read it back without loading the whole file.
+    out.write("[\n")
+    count = 0
+    for entry in entries:
+        if count:
+            out.write(",\n")
+        out.write(json.dumps({"site": entry["site"], "username": entry["username"], "password": reveal(entry)}))
+        count += 1
+    out.write("\n]\n")
+    return count
+
+
+@tracing.traced("transfer.export")
+def export_entries(entries, reveal, path, content="csv", passphrase=None):
+    """Writes entries to path as CSV or JSON, decrypting each password with reveal() just before it is written.
+    With a passphrase the output is an encrypted export. Returns the number of entries written."""
+    write_rows = _write_json if content == "json" else _write_csv
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)  # O_CREAT would keep the mode of one left behind by an older version.
+    # Only the user may read it: a plain export holds every password in plaintext.
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        if passphrase is None:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                count = write_rows(f, entries, reveal)
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                data_key = Fernet.generate_key()
+                header = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "content": content,
+                          "lock": kdf.create_lock(passphrase, data_key)}
+                f.write(json.dumps(header).encode('utf-8') + b"\n")
+                out = _EncryptedWriter(f, Fernet(data_key))
+                count = write_rows(out, entries, reveal)
+                out.flush_block()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)  # Never leave a partial export, plaintext or not, next to path.
+        raise
+    return count
@@ -0,0 +1,1054 @@
+#
+# vault.py - DARX PASS™ vault storage
+# Author: DARX Tech
+#
+# The vault is kept on disk as two files:
+#   vault_data.json          - chunked snapshot of all entries (see below)
+#   vault_data.json.journal  - append-only log, one encrypted mutation record per line
+#
+# Only one VaultStore may have a vault open at a time: from load() until close()
+# it holds an advisory lock (flock) on vault_data.json.lock, and a second one, in
+# this process or another, fails to load with VaultInUse. Two writers would each
+# fold and rewrite the journal from their own view of it, losing the other's entries.
+# load(read_only=True) takes no lock and never writes, so it works while the vault
+# is open elsewhere: a compaction renames the new snapshot into place before it
+# rewrites the journal, so a snapshot that is still the current file after the
+# journal has been read is consistent with it (otherwise both are read again).
+#
+# Every entry carries a stable "id", and when it was last added or edited
+# ("modified", in seconds since the epoch). Adding, editing or deleting an entry
+# appends one small record to the journal instead of re-encrypting and rewriting
+# the whole snapshot. Mutations change the in-memory entries at once and queue
+# their record for a background writer thread, which waits WRITE_DELAY_SECONDS for
+# the rest of a burst, then encrypts the queued records and appends them with a
+# single write and fsync. Once the journal passes a size or ratio threshold, the
+# writer folds it into a fresh snapshot, written to a temporary file, fsynced
+# and renamed over the old one. flush() and close() wait for the writer.
+#
+# Each entry's password is its own Fernet token (the entry's "secret"), so the
+# plaintext only exists while it is being copied or edited.
+#
+# Editing an entry keeps what it replaced in a third file, read only when an
+# entry's history is first asked for, so old versions never slow down loading
+# or compaction:
+#   vault_data.json.history  - one Fernet token per line, each a batch of deltas
+#                              in the binary encoding of codec.py
+# A delta holds the entry's id, the time of the edit and the previous value of
+# only the fields the edit changed ("site", "username", "secret"); the earlier
+# versions are rebuilt by applying the deltas backwards from the current entry.
+# Deleting entries has the writer rewrite the file without their versions.
+#
+# Rotating the vault key (begin_key_rotation) switches every new write to the
+# new key at once, then re-encrypts the existing secrets a few chunks at a time
+# (rotate_batch), each batch written out by a compaction. The snapshot header
+# lists the chunks already re-encrypted ("rotated"), so a rotation interrupted by
+# a crash or by closing the vault carries on from there the next time.
+#
+# The snapshot is a segmented container:
+#   b"DARXVLT" + format byte | 4-byte lock length | lock header (plaintext JSON) |
+#   4-byte header length | header token | chunk tokens...
+# The lock header holds the salt, scrypt cost and wrapped vault key that kdf.py
+# unlocks with the master password (formats 3 and 4 had none). The header token
+# decrypts to {"seq", "chunks": [[length, count, digest], ...]}, plus "synced"
+# once the vault has been merged with another copy of it (see sync.py), and each
+# chunk token to up to CHUNK_SIZE entries in the binary encoding of codec.py
+# (format 3 chunks held a JSON list and are re-encoded on load). A compaction
+# only re-encrypts the chunks whose entries changed; the others are copied over
+# byte for byte.
+#
+# This module must not import Qt.
+#
+
+import os
+import json
+import mmap
+import hashlib
+import time
+import secrets
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import tracing
+from codec import encode_entries, decode_entries, decode_any
+
+# --- Configuration Constants ---
+SNAPSHOT_MAGIC = b"DARXVLT"
+SNAPSHOT_FORMAT = 5
+SUPPORTED_SNAPSHOT_FORMATS = (3, 4, 5)
+LOCKED_SNAPSHOT_FORMAT = 5          # First format with a lock header.
+JOURNAL_SUFFIX = ".journal"
+HISTORY_SUFFIX = ".history"
+OPEN_LOCK_SUFFIX = ".lock"          # Held while a store has the vault open (not the lock header, see kdf.py).
+HISTORY_FIELDS = ("site", "username", "secret")
+HISTORY_MAX_VERSIONS = 20           # Earlier versions kept per entry; older ones go when the file is rewritten.
+CHUNK_SIZE = 1000                   # Entries per snapshot chunk.
+COMPACT_MIN_RECORDS = 64            # Never compact for fewer records than this.
+COMPACT_RATIO = 0.25                # ...unless the journal holds this many records per entry,
+COMPACT_MAX_BYTES = 4 * 1024 * 1024  # ...or grows past this size.
+WRITE_DELAY_SECONDS = 0.25          # Changes made within this long of each other are written together.
+POSITION_REBUILD_DELETES = 1024    # Deletes after which the entry position map is rebuilt (see _position).
+READ_ONLY_ATTEMPTS = 5              # Reads of a vault compacted meanwhile before load(read_only=True) gives up.
+ROTATION_BATCH_ENTRIES = 4 * CHUNK_SIZE  # Entries re-encrypted, and checkpointed, per key rotation batch.
+
+
+def new_entry_id():
+    return secrets.token_hex(8)
+
+
+def atomic_write(path, data):
+    """Writes data (bytes, or a list of bytes) to a temp file, fsyncs it and renames it over path."""
+    if isinstance(data, (bytes, bytearray)):
+        data = [data]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for part in data:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def append_synced(path, data):
+    """Appends data to path with one write and one fsync, cutting off a partial write if it fails."""
+    with open(path, 'ab') as f:
+        start = f.tell()
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except OSError:
+            f.truncate(start)  # Don't leave a torn record for the next batch to follow.
+            raise
+
+
+class VaultInUse(Exception):
+    """Raised by VaultStore.load() when another store, in this process or another, has the vault open."""
+
+
+def _hold_open_lock(vault_path):
+    """Takes the advisory lock on the vault's .lock file without waiting and returns the open file,
+    which holds it until closed. Raises VaultInUse if another open file holds it."""
+    f = open(vault_path + OPEN_LOCK_SUFFIX, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise VaultInUse(f"{os.path.basename(vault_path)} is already open in DARX PASS™, or being changed from the command line.")
+    return f
+
+
+def _file_identity(path):
+    """Returns what changes when path is replaced or written, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def read_lock(vault_path):
+    """Returns the plaintext lock header of a vault file, or None if it has none (yet)."""
+    if not os.path.exists(vault_path):
+        return None
+    with open(vault_path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            return None
+        return _read_lock_header(f)
+
+
+def _read_lock_header(f):
+    """Reads the format byte and, from format 5 on, the lock header, leaving f at the header length."""
+    snapshot_format = f.read(1)[0]
+    if snapshot_format not in SUPPORTED_SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported vault format: {snapshot_format}")
+    if snapshot_format < LOCKED_SNAPSHOT_FORMAT:
+        return None
+    lock_length = int.from_bytes(f.read(4), 'big')
+    return json.loads(f.read(lock_length)) or None
+
+
+def _chunk_digest(token):
+    return hashlib.blake2b(token, digest_size=16).hexdigest()
+
+
+def _read_header(snapshot_map, position, fernet):
+    """Decrypts the header token whose length is at position. Returns (header, position of the first chunk)."""
+    header_length = int.from_bytes(snapshot_map[position:position + 4], 'big')
+    position += 4
+    header = json.loads(fernet.decrypt(snapshot_map[position:position + header_length]))
+    return header, position + header_length
+
+
+def _decrypt_journal(data, fernet):
+    """Returns the records in journal data and the byte length of its valid prefix."""
+    records = []
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break  # A torn final record from a crash mid-append: drop it.
+        token = line.strip()
+        if token:
+            records.append(json.loads(fernet.decrypt(token)))
+        offset += len(line)
+    return records, offset
+
+
+# --- Chunk Decryption ---
+
+def decrypt_chunks(fernet, tokens):
+    """Decrypts chunk tokens into (entries, was_json) pairs."""
+    # Serially: a process pool has to be spawned (the GUI process must not fork), and every
+    # worker re-imports main.py and Qt, which costs more than decrypting a 100k-entry vault.
+    with tracing.span("vault.decrypt_chunks", chunks=len(tokens)):
+        payloads = [fernet.decrypt(token) for token in tokens]
+    with tracing.span("vault.decode_chunks", chunks=len(tokens)):
+        return [decode_any(payload) for payload in payloads]
+
+
+def _group_deltas(deltas):
+    """Returns {entry id: [delta, ...]} in the order of deltas."""
+    grouped = {}
+    for delta in deltas:
+        grouped.setdefault(delta["id"], []).append(delta)
+    return grouped
+
+
+# --- Other Copies of the Vault ---
+CopyChanges = namedtuple("CopyChanges", "entries shared synced chunks chunks_read")
+
+
+def _map_vault(path):
+    """Maps the chunked vault file at path. Returns (map, position of its header length)."""
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError("Not a DARX PASS™ vault, or one too old to merge "
+                             "(open it in DARX PASS™ once to upgrade it).")
+        _read_lock_header(f)
+        position = f.tell()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), position
+
+
+def read_header(path, fernet):
+    """Decrypts and returns the snapshot header of the vault file at path."""
+    snapshot_map, position = _map_vault(path)
+    with snapshot_map:
+        return _read_header(snapshot_map, position, fernet)[0]
+
+
+@tracing.traced("vault.read_copy")
+def read_copy(path, fernet, known_digests=()):
+    """Reads another copy of the vault, e.g. one changed on another machine, without decrypting the chunks it
+    shares with this one: a chunk whose digest is in known_digests holds exactly the entries of the chunk with
+    that digest here. Decrypts the other chunks and replays the copy's journal over them.
+    Returns CopyChanges: entries ({entry id: entry, or None if the journal deleted it}), the known digests it
+    shares, its "synced" time, its number of chunks and how many of them it decrypted."""
+    known_digests = set(known_digests)
+    snapshot_map, position = _map_vault(path)
+    with snapshot_map:
+        header, position = _read_header(snapshot_map, position, fernet)
+        shared, tokens = set(), []
+        for length, count, digest in header["chunks"]:
+            if digest in known_digests:
+                shared.add(digest)
+            else:
+                token = snapshot_map[position:position + length]
+                if _chunk_digest(token) != digest:
+                    raise ValueError("Vault chunk table does not match its contents.")
+                tokens.append(token)
+            position += length
+
+    entries = {entry["id"]: entry for chunk_entries, _ in decrypt_chunks(fernet, tokens) for entry in chunk_entries}
+    records = []
+    if os.path.exists(path + JOURNAL_SUFFIX):
+        with open(path + JOURNAL_SUFFIX, 'rb') as f:
+            records, _ = _decrypt_journal(f.read(), fernet)
+    for record in records:
+        if record["seq"] <= header["seq"]:
+            continue
+        op = record["op"]
+        if op in ("add", "update"):
+            entries[record["entry"]["id"]] = record["entry"]
+        elif op == "add_many":
+            entries.update((entry["id"], entry) for entry in record["entries"])
+        elif op == "delete":
+            entries[record["id"]] = None
+        elif op == "clear":
+            entries = dict.fromkeys(entries)
+            shared.clear()  # Their entries are gone too.
+        else:
+            raise ValueError(f"Unknown journal operation: {op!r}")
+    return CopyChanges(entries, shared, header.get("synced", 0), len(header["chunks"]), len(tokens))
+
+
+class _Chunk:
+    """A run of entries stored as one token in the snapshot."""
+
+    __slots__ = ("ids", "span", "digest", "version", "rotated")
+
+    def __init__(self, ids, span=None, digest=None):
+        self.ids = ids
+        self.span = span        # (offset, length) of its token in the current snapshot; None while dirty.
+        self.digest = digest
+        self.version = 0        # Bumped on every change, so a compaction knows what it actually wrote.
+        self.rotated = False    # During a key rotation: every secret in it is under the new key.
+
+    def touch(self):
+        self.span = None
+        self.version += 1
+
+
+class VaultStore:
+    """Chunked snapshot + journal storage for the list of password entries."""
+
+    def __init__(self, vault_path, fernet, journal_path=None, lock=None):
+        self.vault_path = vault_path
+        self.journal_path = journal_path or vault_path + JOURNAL_SUFFIX
+        self.history_path = vault_path + HISTORY_SUFFIX
+        self.fernet = fernet
+        self.lock = lock            # Plaintext lock header (see kdf.py); the file's own if None.
+        self.rotating = False       # A key rotation is unfinished (see begin_key_rotation).
+        self.synced = 0             # When the vault was last merged with another copy of it (see sync.py).
+        self.entries = []
+        self.by_id = {}
+        # An entry's position in self.entries is its slot less the slots deleted before it, so neither an
+        # edit nor a delete has to search the list; the map is rebuilt every POSITION_REBUILD_DELETES deletes.
+        self._slots = {}            # entry id -> slot
+        self._deleted_slots = []    # Sorted slots of the entries deleted since the map was built.
+        self._next_slot = 0
+
+        self._chunks = []
+        self._chunk_of = {}         # entry id -> _Chunk
+        self._snapshot_map = None   # mmap of the current snapshot, to copy clean chunks from.
+        self._seq = 0               # Sequence number of the last applied record.
+        self._journal_records = 0   # Records in the journal not yet folded into the snapshot.
+        self._journal_bytes = 0
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()  # Held while the journal or snapshot file is written.
+        self._open_lock = None      # The .lock file, held open from load() until close().
+        self.read_only = False      # Loaded with load(read_only=True): changes are refused.
+
+        self.status_listener = None  # Called as listener(unsaved changes, error or None), from any thread.
+        self._pending = []          # Records applied in memory but not yet in the journal.
+        self._history = None        # entry id -> [delta, ...] oldest first; None until first asked for.
+        self._pending_history = []  # Deltas not yet in the history file.
+        self._history_checked = False  # Whether a torn final line has been cut off the history file.
+        self._history_stale = False    # Deleted entries may still have versions in the history file.
+        self._compact_requested = False
+        self._flush_requested = False
+        self._writing = False
+        self._closed = False
+        self._error = None          # What stopped the writer; cleared by the next change or flush().
+        self._changed = threading.Condition(self._lock)
+        self._writer = None
+
+    # --- Loading ---
+
+    @tracing.traced("vault.load")
+    def load(self, read_only=False):
+        """Locks the vault for this store, decrypts the snapshot, replays the journal on top and
+        returns the entries. Raises VaultInUse if another store has the vault open.
+        read_only: reads the files as they are, without the lock, and refuses changes."""
+        if read_only:
+            self.read_only = True
+            return self._load_read_only()
+        if self._open_lock is None:
+            self._open_lock = _hold_open_lock(self.vault_path)
+        try:
+            return self._load()
+        except BaseException:
+            self._release_open_lock()
+            raise
+
+    def _load_read_only(self):
+        for _ in range(READ_ONLY_ATTEMPTS):
+            before = _file_identity(self.vault_path)
+            with tracing.span("vault.read_snapshot"):
+                entries, chunks, seq, _, lock = self._read_snapshot()
+            with tracing.span("vault.read_journal"):
+                records, valid_bytes = self._read_journal(repair=False)
+            if _file_identity(self.vault_path) == before:
+                break  # Otherwise a compaction replaced the snapshot, and maybe the journal, meanwhile.
+        else:
+            raise VaultInUse(f"{os.path.basename(self.vault_path)} kept changing while it was read; try again.")
+        self.lock = self.lock or lock
+        self._replay(entries, chunks, seq, records, valid_bytes)
+        return self.entries
+
+    def _release_open_lock(self):
+        if self._open_lock is not None:
+            self._open_lock.close()
+            self._open_lock = None
+
+    def _load(self):
+        with tracing.span("vault.read_snapshot"):
+            entries, chunks, seq, outdated, lock = self._read_snapshot()
+        if self.lock is None:
+            self.lock = lock
+        elif self.lock != lock:
+            outdated = True  # A new or re-tuned lock header has to reach the file.
+        with tracing.span("vault.read_journal"):
+            records, valid_bytes = self._read_journal()
+        upgraded = self._replay(entries, chunks, seq, records, valid_bytes)
+
+        if upgraded or outdated:
+            self.compact()  # Persist IDs/secrets/encoding before any journal record refers to them.
+        else:
+            self.maybe_compact()
+        return self.entries
+
+    def _replay(self, entries, chunks, seq, records, valid_bytes):
+        """Installs the snapshot's entries and applies the journal records on top.
+        Returns True if entries from an older vault had to be upgraded (never when read-only)."""
+        with self._lock, tracing.span("vault.replay_journal", records=len(records)):
+            self.entries = entries
+            self._history = None
+            self.by_id = {entry["id"]: entry for entry in entries if "id" in entry}
+            self._index_positions()
+            self._chunks = chunks
+            self._chunk_of = {entry_id: chunk for chunk in chunks for entry_id in chunk.ids}
+            for record in records:
+                if record["seq"] <= seq:
+                    continue  # Already folded into the snapshot by an interrupted compaction.
+                self._apply(record)
+                seq = record["seq"]
+            self._seq = seq
+            self._journal_records = len(records)
+            self._journal_bytes = valid_bytes
+            return not self.read_only and self._upgrade_entries()
+
+    def _read_snapshot(self):
+        """Returns (entries, chunks, seq, outdated, lock) from the snapshot file."""
+        if not os.path.exists(self.vault_path) or os.path.getsize(self.vault_path) == 0:
+            return [], [], 0, False, None
+        with open(self.vault_path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC:
+                return self._read_chunked_snapshot(f)
+            f.seek(0)
+            entries, seq = self._read_legacy_snapshot(f.read())
+            return entries, [], seq, True, None
+
+    def _read_chunked_snapshot(self, f):
+        lock = _read_lock_header(f)
+        position = f.tell()
+        snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, position = _read_header(snapshot_map, position, self.fernet)
+
+        chunks, tokens = [], []
+        for length, count, digest in header["chunks"]:
+            token = snapshot_map[position:position + length]
+            if _chunk_digest(token) != digest:
+                raise ValueError("Vault chunk table does not match its contents.")
+            tokens.append(token)
+            chunks.append(_Chunk(None, (position, length), digest))
+            position += length
+
+        self.rotating = "rotated" in header
+        self.synced = header.get("synced", 0)
+        for index in header.get("rotated", ()):
+            chunks[index].rotated = True
+
+        entries, outdated = [], False
+        for chunk, (chunk_entries, was_json) in zip(chunks, decrypt_chunks(self.fernet, tokens)):
+            chunk.ids = [entry["id"] for entry in chunk_entries]
+            if was_json:
+                chunk.touch()  # Re-encoded in the binary format by the compaction after loading.
+                outdated = True
+            entries.extend(chunk_entries)
+        self._replace_snapshot_map(snapshot_map)
+        return entries, chunks, header["seq"], outdated, lock
+
+    def _read_legacy_snapshot(self, data):
+        """Reads the single-token (format 1) and JSON container (format 2) snapshots."""
+        if not data.startswith(b"{"):
+            payload = json.loads(self.fernet.decrypt(data))
+            if isinstance(payload, list):
+                return payload, 0  # Pre-journal vault: a bare list of entries.
+            return payload["entries"], payload["seq"]
+        container = json.loads(data)
+        meta = json.loads(self.fernet.decrypt(container["meta"].encode('ascii')))
+        for entry in meta["entries"]:
+            entry["secret"] = container["secrets"][entry["id"]]
+        return meta["entries"], meta["seq"]
+
+    def _replace_snapshot_map(self, snapshot_map):
+        if self._snapshot_map is not None:
+            self._snapshot_map.close()
+        self._snapshot_map = snapshot_map
+
+    def _map_snapshot(self):
+        with open(self.vault_path, 'rb') as f:
+            self._replace_snapshot_map(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _read_journal(self, repair=True):
+        """Returns the decrypted journal records and the byte length of the valid prefix.
+        repair: cuts a torn final record off the file."""
+        if not os.path.exists(self.journal_path):
+            return [], 0
+        with open(self.journal_path, 'rb') as f:
+            data = f.read()
+        records, offset = _decrypt_journal(data, self.fernet)
+        if repair and offset < len(data):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(offset)
+        return records, offset
+
+    def _upgrade_entries(self):
+        """Gives entries from older vaults an ID, an encrypted secret and a chunk. Returns True if any changed."""
+        upgraded = False
+        for position, entry in enumerate(self.entries):
+            if "id" not in entry or "password" in entry:
+                entry = self._seal({"id": entry.get("id") or new_entry_id(), **entry})
+                self.entries[position] = entry
+                self.by_id[entry["id"]] = entry
+                upgraded = True
+        if upgraded:
+            self._index_positions()
+        if upgraded or len(self._chunk_of) != len(self.entries):
+            self._rechunk()
+            upgraded = True
+        return upgraded
+
+    def _rechunk(self):
+        """Splits the entries into fresh, all-dirty chunks."""
+        self._chunks = [_Chunk([entry["id"] for entry in self.entries[start:start + CHUNK_SIZE]])
+                        for start in range(0, len(self.entries), CHUNK_SIZE)]
+        self._chunk_of = {entry_id: chunk for chunk in self._chunks for entry_id in chunk.ids}
+
+    def _seal(self, entry):
+        """Replaces the entry's plaintext "password" with its encrypted "secret"."""
+        if "password" not in entry:
+            return entry
+        entry = dict(entry)
+        entry["secret"] = self.fernet.encrypt(entry.pop("password").encode('utf-8')).decode('ascii')
+        return entry
+
+    def reveal(self, entry):
+        """Decrypts and returns the entry's password. Callers should not keep it around."""
+        return self.fernet.decrypt(entry["secret"].encode('ascii')).decode('utf-8')
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            self._append(record["entry"])
+        elif op == "add_many":
+            for entry in record["entries"]:
+                self._append(entry)
+        elif op == "update":
+            entry = record["entry"]
+            self.entries[self._position(entry["id"])] = entry
+            self.by_id[entry["id"]] = entry
+            if entry["id"] in self._chunk_of:
+                self._chunk_of[entry["id"]].touch()
+        elif op == "delete":
+            if "id" in record:
+                del self.entries[self._position(record["id"])]
+                del self.by_id[record["id"]]
+                insort(self._deleted_slots, self._slots.pop(record["id"]))
+                if len(self._deleted_slots) >= POSITION_REBUILD_DELETES:
+                    self._index_positions()
+                if record["id"] in self._chunk_of:
+                    self._chunk_remove(record["id"])
+            else:
+                # Journals written before entries had IDs; such vaults are rechunked after replay.
+                del self.entries[record["index"]]
+                self._index_positions()
+        elif op == "clear":
+            self.entries.clear()
+            self.by_id.clear()
+            self._index_positions()
+            self._chunks.clear()
+            self._chunk_of.clear()
+        else:
+            raise ValueError(f"Unknown journal operation: {op!r}")
+
+    def _append(self, entry):
+        self.entries.append(entry)
+        slot = self._next_slot
+        self._next_slot += 1
+        if "id" in entry:  # Only entries from before IDs lack one; such vaults are upgraded after replay.
+            self.by_id[entry["id"]] = entry
+            self._slots[entry["id"]] = slot
+            self._chunk_add(entry["id"])
+
+    def _index_positions(self):
+        self._slots = {entry["id"]: position for position, entry in enumerate(self.entries) if "id" in entry}
+        self._deleted_slots = []
+        self._next_slot = len(self.entries)
+
+    def _position(self, entry_id):
+        """Returns the entry's position in self.entries."""
+        slot = self._slots[entry_id]
+        return slot - bisect_left(self._deleted_slots, slot)
+
+    def _chunk_add(self, entry_id):
+        if not self._chunks or len(self._chunks[-1].ids) >= CHUNK_SIZE:
+            self._chunks.append(_Chunk([]))
+        chunk = self._chunks[-1]
+        chunk.ids.append(entry_id)
+        chunk.touch()
+        self._chunk_of[entry_id] = chunk
+
+    def _chunk_remove(self, entry_id):
+        chunk = self._chunk_of.pop(entry_id)
+        chunk.ids.remove(entry_id)
+        chunk.touch()
+        if not chunk.ids:
+            self._chunks.remove(chunk)
+
+    # --- Mutations ---
+
+    def get(self, entry_id):
+        return self.by_id.get(entry_id)
+
+    def add(self, entry):
+        """Stores a new entry under a fresh ID and returns the stored entry."""
+        entry = self._seal({"id": new_entry_id(), "modified": int(time.time()), **entry})
+        self._record({"op": "add", "entry": entry})
+        return entry
+
+    def add_many(self, entries):
+        """Stores a batch of new entries with a single journal write and returns the stored entries.
+        Entries that already have an "id" and "modified" time (merged from another copy of the vault) keep them."""
+        now = int(time.time())
+        entries = [self._seal({"id": new_entry_id(), "modified": now, **entry}) for entry in entries]
+        if entries:
+            self._record({"op": "add_many", "entries": entries})
+        return entries
+
+    def update(self, entry_id, changes):
+        """Replaces the entry's fields with changes and returns the stored entry.
+        The values it replaces go into the entry's history."""
+        previous = self.by_id[entry_id]
+        entry = self._seal({**previous, "modified": int(time.time()), **changes, "id": entry_id})
+        self._record({"op": "update", "entry": entry}, self._history_delta(previous, changes))
+        return entry
+
+    def delete(self, entry_id):
+        """Deletes the entry, and its history, and returns it."""
+        entry = self.by_id[entry_id]
+        self._history_stale = True
+        self._record({"op": "delete", "id": entry_id})
+        return entry
+
+    def clear(self):
+        """Deletes every entry, and all history, and returns how many there were."""
+        count = len(self.entries)
+        self._history_stale = True
+        self._record({"op": "clear"})
+        return count
+
+    def mark_synced(self, synced):
+        """Records when the vault was merged with another copy of it; the writer puts it in a fresh snapshot."""
+        with self._lock:
+            self.synced = synced
+        self.request_compaction()
+
+    def chunk_digests(self):
+        """Returns [(digest, entry ids), ...] for every chunk, the digest None for chunks changed since the
+        last compaction. A vault file with a chunk of the same digest has exactly those entries in it."""
+        with self._lock:
+            return [(chunk.digest if chunk.span else None, list(chunk.ids)) for chunk in self._chunks]
+
+    def set_lock(self, lock):
+        """Replaces the lock header (e.g. after re-tuning the KDF); the writer puts it in a fresh snapshot."""
+        self.lock = lock
+        self.request_compaction()
+
+    def _record(self, record, delta=None):
+        """Applies a record to the in-memory entries and queues it, and the history delta, for the writer."""
+        self._check_writable()
+        with self._lock:
+            record["seq"] = self._seq + 1
+            self._apply(record)
+            self._seq = record["seq"]
+            self._pending.append(record)
+            if delta is not None:
+                self._pending_history.append(delta)
+                if self._history is not None:
+                    self._history.setdefault(delta["id"], []).append(delta)
+            self._error = None
+            unsaved = len(self._pending)
+            self._wake_writer()
+        self._notify_status(unsaved, None)
+
+    # --- History ---
+
+    def _history_delta(self, previous, changes):
+        """Returns the delta recording the values changes replaces in previous, or None if it replaces none."""
+        delta = {}
+        for field, value in changes.items():
+            if field == "password":
+                if "secret" in previous and self.reveal(previous) != value:
+                    delta["secret"] = previous["secret"]
+            elif field in HISTORY_FIELDS and field in previous and previous[field] != value:
+                delta[field] = previous[field]
+        return {"id": previous["id"], "time": int(time.time()), **delta} if delta else None
+
+    def history(self, entry_id):
+        """Returns the entry's earlier versions, newest first. Each is a dict of its "id", "site", "username"
+        and "secret", plus "replaced" (when an edit replaced it, in seconds since the epoch) and "changed"
+        (the fields that edit changed). Reads the history file the first time it is called."""
+        with self._file_lock:
+            if self._history is None:
+                with tracing.span("vault.read_history"):
+                    deltas = self._read_history()
+                with self._lock:
+                    self._history = _group_deltas(deltas + self._pending_history)
+        with self._lock:
+            version = dict(self.by_id[entry_id])
+            deltas = list(self._history.get(entry_id, ()))
+        versions = []
+        for delta in reversed(deltas[-HISTORY_MAX_VERSIONS:]):
+            changed = [field for field in HISTORY_FIELDS if field in delta]
+            version = {**version, **{field: delta[field] for field in changed}}
+            versions.append({**version, "replaced": delta["time"], "changed": changed})
+        return versions
+
+    def _read_history(self):
+        """Returns every delta in the history file, oldest first. Called with self._file_lock held."""
+        self._trim_history()
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path, 'rb') as f:
+            data = f.read()
+        deltas = []
+        for token in data.split(b"\n"):
+            if token:
+                deltas.extend(decode_entries(self.fernet.decrypt(token)))
+        return deltas
+
+    def _trim_history(self):
+        """Cuts a torn final line, from a crash mid-append, off the history file. Called with self._file_lock held."""
+        if self._history_checked or not os.path.exists(self.history_path):
+            self._history_checked = True
+            return
+        with open(self.history_path, 'r+b') as f:
+            data = f.read()
+            if not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+        self._history_checked = True
+
+    def _append_history(self, deltas):
+        """Appends the deltas to the history file as one token. Called with self._file_lock held."""
+        self._trim_history()
+        with tracing.span("vault.history_append", deltas=len(deltas)):
+            append_synced(self.history_path, self.fernet.encrypt(encode_entries(deltas)) + b"\n")
+
+    def _purge_history(self):
+        """Rewrites the history file without the versions of deleted entries, keeping at most
+        HISTORY_MAX_VERSIONS per entry."""
+        with self._file_lock:
+            self._history_stale = False
+            deltas = self._read_history()
+            with self._lock:
+                kept = {entry_id: entry_deltas[-HISTORY_MAX_VERSIONS:]
+                        for entry_id, entry_deltas in _group_deltas(deltas).items() if entry_id in self.by_id}
+                if self._history is not None:
+                    self._history = {entry_id: entry_deltas for entry_id, entry_deltas in self._history.items()
+                                     if entry_id in self.by_id}
+            kept = [delta for entry_deltas in kept.values() for delta in entry_deltas]
+            if len(kept) == len(deltas):
+                return
+            with tracing.span("vault.rewrite_history", deltas=len(kept)):
+                atomic_write(self.history_path, [self.fernet.encrypt(encode_entries(kept)) + b"\n"] if kept else [])
+
+    # --- Key Rotation ---
+
+    def begin_key_rotation(self, fernet, lock):
+        """Starts re-encrypting the vault under a new key. fernet must encrypt with the new key and still
+        decrypt with the old ones (a MultiFernet), and lock must hold the new key and the retired ones; both
+        are in use, and on disk, before this returns. rotate_batch() then re-encrypts the existing entries."""
+        with self._file_lock:
+            with self._lock:
+                previous = self.fernet, self.lock, self.rotating
+                self.fernet = fernet
+                self.lock = lock
+                self.rotating = True
+                for chunk in self._chunks:
+                    chunk.rotated = False
+            # The new lock must be on disk before anything encrypted with the new key is.
+            try:
+                self._compact()
+            except Exception:
+                with self._lock:
+                    self.fernet, self.lock, self.rotating = previous
+                raise
+
+    def rotation_remaining(self):
+        """Returns how many entries are still to be re-encrypted under the new key."""
+        with self._lock:
+            return sum(len(chunk.ids) for chunk in self._chunks if not chunk.rotated) if self.rotating else 0
+
+    def rotate_batch(self, max_entries=ROTATION_BATCH_ENTRIES):
+        """Re-encrypts the secrets of the next chunks not yet under the new key, about max_entries entries,
+        and writes them out with a compaction, which also saves the checkpoint. Returns the number of entries
+        re-encrypted: 0 once none are left."""
+        with self._lock:
+            if not self.rotating:
+                return 0
+            batch, count = [], 0
+            for chunk in self._chunks:
+                if not chunk.rotated and count < max_entries:
+                    batch.append(chunk)
+                    count += len(chunk.ids)
+            entries = [self.by_id[entry_id] for chunk in batch for entry_id in chunk.ids]
+            fernet = self.fernet
+        if not batch:
+            return 0
+        with tracing.span("vault.rotate_secrets", entries=len(entries)):
+            tokens = [(entry, entry["secret"], fernet.rotate(entry["secret"].encode('ascii')).decode('ascii'))
+                      for entry in entries]
+        with self._lock:
+            for entry, secret, rotated in tokens:
+                # An entry edited meanwhile has been replaced, with a secret under the new key.
+                if entry["secret"] == secret:
+                    entry["secret"] = rotated
+            for chunk in batch:
+                chunk.touch()
+                chunk.rotated = True  # Entries added to it since were encrypted with the new key.
+        self.compact()
+        return len(entries)
+
+    def end_key_rotation(self, fernet, lock):
+        """Finishes a key rotation once rotate_batch() has re-encrypted every entry: re-encrypts the history,
+        then switches to fernet (the new key alone) and writes lock, which no longer holds the retired keys."""
+        with self._file_lock:
+            with self._lock:
+                if any(not chunk.rotated for chunk in self._chunks):
+                    raise ValueError("The vault still has entries under the old key.")
+            self._rotate_history()
+            with self._lock:
+                self.fernet = fernet
+                self.lock = lock
+                self.rotating = False
+            self._compact()
+
+    def _rotate_history(self):
+        """Re-encrypts the history file, and the secrets it keeps, under the new key. Called with
+        self._file_lock held."""
+        deltas = self._read_history()
+        with self._lock:
+            fernet = self.fernet
+            pending = list(self._pending_history)
+        with tracing.span("vault.rotate_history", deltas=len(deltas) + len(pending)):
+            for delta in deltas + pending:
+                if "secret" in delta:
+                    delta["secret"] = fernet.rotate(delta["secret"].encode('ascii')).decode('ascii')
+            if deltas:
+                atomic_write(self.history_path, [fernet.encrypt(encode_entries(deltas)) + b"\n"])
+        with self._lock:
+            self._history = None  # Re-read with the new secrets when next asked for.
+
+    # --- Background Writer ---
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("The vault was loaded read-only.")
+
+    def _wake_writer(self):
+        """Starts the writer thread if needed and wakes it. Called with self._lock held."""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_behind, name="vault-writer", daemon=True)
+            self._writer.start()
+        self._changed.notify_all()
+
+    def _notify_status(self, unsaved, error):
+        if self.status_listener is not None:
+            self.status_listener(unsaved, error)
+
+    def _has_work(self):
+        return self._error is None and bool(self._pending or self._compact_requested)
+
+    def _write_behind(self):
+        """The writer thread: appends queued records to the journal in batches and compacts when due."""
+        while True:
+            with self._lock:
+                while not self._has_work():
+                    if self._closed:
+                        return
+                    self._changed.wait()
+                # Let the rest of a burst of changes join this write.
+                deadline = time.monotonic() + WRITE_DELAY_SECONDS
+                while self._pending and not (self._flush_requested or self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                self._writing = True
+            error = None
+            try:
+                self._write_pending()
+                if self._history_stale:
+                    self._purge_history()
+                if self._compact_requested or self.needs_compaction():
+                    self._compact_requested = False
+                    try:
+                        self.compact()
+                    except Exception:
+                        self._compact_requested = True
+                        raise
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._writing = False
+                self._error = error
+                unsaved = len(self._pending)
+                self._changed.notify_all()
+            self._notify_status(unsaved, error)
+
+    def _write_pending(self):
+        """Encrypts the queued records and appends them to the journal with one write and one fsync."""
+        with self._file_lock:
+            with self._lock:
+                records = list(self._pending)
+                deltas = list(self._pending_history)
+            if deltas:
+                # Before the journal: a crash in between leaves a version that matches the entry, not a lost one.
+                self._append_history(deltas)
+                with self._lock:
+                    del self._pending_history[:len(deltas)]
+            if not records:
+                return
+            with tracing.span("vault.journal_append", records=len(records)):
+                data = b"".join(self.fernet.encrypt(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+                                + b"\n" for record in records)
+                append_synced(self.journal_path, data)
+            with self._lock:
+                del self._pending[:len(records)]
+                self._journal_records += len(records)
+                self._journal_bytes += len(data)
+
+    def request_compaction(self):
+        """Asks the writer to fold the journal into a fresh snapshot after its next write."""
+        self._check_writable()
+        with self._lock:
+            self._compact_requested = True
+            self._error = None
+            self._wake_writer()
+
+    def flush(self):
+        """Blocks until every queued change is in the journal and a requested compaction is done.
+        Raises what stopped the writer if it could not write them."""
+        with self._lock:
+            if not (self._pending or self._compact_requested or self._writing):
+                return
+            self._error = None  # Retry after an earlier failure.
+            self._flush_requested = True
+            self._wake_writer()
+            try:
+                while (self._pending or self._compact_requested or self._writing) and self._error is None:
+                    self._changed.wait()
+            finally:
+                self._flush_requested = False
+            if self._error is not None:
+                raise self._error
+
+    # --- Compaction ---
+
+    def needs_compaction(self):
+        if self._journal_records == 0:
+            return False
+        if self._journal_bytes >= COMPACT_MAX_BYTES:
+            return True
+        return (self._journal_records >= COMPACT_MIN_RECORDS
+                and self._journal_records >= COMPACT_RATIO * len(self.entries))
+
+    def maybe_compact(self):
+        """Has the writer compact in the background if the journal has passed its threshold."""
+        if self.needs_compaction():
+            self.request_compaction()
+
+    def compact(self):
+        """Writes a fresh snapshot, re-encrypting only dirty chunks, and drops the journal records it covers."""
+        with self._file_lock:
+            self._compact()
+
+    @tracing.traced("vault.compact")
+    def _compact(self):
+        """compact(), for callers that hold self._file_lock."""
+        with self._lock:
+            plan = [(chunk, chunk.version, chunk.span, chunk.digest,
+                     None if chunk.span else [self.by_id[entry_id] for entry_id in chunk.ids])
+                    for chunk in self._chunks]
+            rotated = [index for index, chunk in enumerate(self._chunks) if chunk.rotated]
+            fernet, lock, rotating, synced = self.fernet, self.lock, self.rotating, self.synced
+            seq = self._seq
+            folded_records = self._journal_records
+            folded_bytes = self._journal_bytes
+
+        tokens, table = [], []
+        dirty = sum(chunk_entries is not None for *_, chunk_entries in plan)
+        with tracing.span("vault.encrypt_chunks", chunks=len(plan), dirty=dirty):
+            for chunk, version, span, digest, chunk_entries in plan:
+                if chunk_entries is None:
+                    token = self._snapshot_map[span[0]:span[0] + span[1]]  # Clean: copy as is.
+                    count = len(chunk.ids)
+                else:
+                    token = fernet.encrypt(encode_entries(chunk_entries))
+                    digest = _chunk_digest(token)
+                    count = len(chunk_entries)
+                tokens.append(token)
+                table.append([len(token), count, digest])
+
+        header = {"seq": seq, "chunks": table}
+        if rotating:
+            header["rotated"] = rotated  # The key rotation's checkpoint.
+        if synced:
+            header["synced"] = synced
+        header = fernet.encrypt(json.dumps(header).encode('utf-8'))
+        lock = json.dumps(lock or {}).encode('utf-8')
+        prefix = (SNAPSHOT_MAGIC + bytes([SNAPSHOT_FORMAT]) + len(lock).to_bytes(4, 'big') + lock
+                  + len(header).to_bytes(4, 'big') + header)
+        # Unmap the old snapshot before the rename; Windows refuses to replace a mapped file.
+        self._replace_snapshot_map(None)
+        try:
+            with tracing.span("vault.write_snapshot"):
+                atomic_write(self.vault_path, [prefix] + tokens)
+        finally:
+            self._map_snapshot()
+
+        with self._lock:
+            offset = len(prefix)
+            for (chunk, version, _, _, _), token, (_, _, digest) in zip(plan, tokens, table):
+                if chunk.version == version:
+                    chunk.span = (offset, len(token))
+                    chunk.digest = digest
+                offset += len(token)
+
+        # Records appended while the snapshot was being written stay in the journal. Only the writer
+        # appends to it, under self._file_lock, so mutations need not wait for this I/O.
+        with tracing.span("vault.rewrite_journal"):
+            tail = b""
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(folded_bytes)
+                    tail = f.read()
+            atomic_write(self.journal_path, tail)
+        with self._lock:
+            self._journal_records -= folded_records
+            self._journal_bytes -= folded_bytes
+
+    def close(self):
+        """Writes out every queued change, stops the writer, unmaps the snapshot and unlocks the vault.
+        Raises, leaving the store open, if the changes could not be written."""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+            writer = self._writer
+        if writer is not None:
+            writer.join()
+        self._replace_snapshot_map(None)
+        self._release_open_lock()
+        self._history = None
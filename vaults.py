@@ -0,0 +1,164 @@
+#
+# vaults.py - DARX PASS™ vault list and unlocked-vault cache
+# Author: DARX Tech
+#
+# The app can keep several vaults (e.g. personal, team, infrastructure), each a
+# vault.py snapshot + journal locked with its own master password. The list of
+# known vaults is a small plaintext JSON file next to the default vault:
+#
+#   {"vaults": [{"name": "Team", "path": "vault_team.json"}, ...]}
+#
+# The default vault is always first and is not stored in the file.
+#
+# Switching away from a vault parks it, still unlocked and loaded, in a VaultCache,
+# so switching back needs neither the master password nor a reload. The cache
+# keeps the most recently used vaults: it evicts the least recently used once it
+# holds more than CACHE_MAX_VAULTS or its estimated size passes CACHE_BUDGET_BYTES,
+# and evict_idle() evicts any vault left unused for CACHE_IDLE_SECONDS. Eviction
+# closes the store and drops its entries, search index and key, so nothing
+# decrypted from it stays reachable; unlocking it again needs the master password.
+# A vault whose store cannot be closed (its changes cannot be written) stays
+# cached, open, and is reported to error_listener; the next eviction retries it.
+#
+# This module must not import Qt.
+#
+
+import os
+import re
+import json
+import time
+from collections import OrderedDict
+
+from vault import atomic_write
+
+# --- Configuration Constants ---
+VAULT_LIST_FILE = "vaults.json"
+DEFAULT_VAULT_NAME = "Personal"
+CACHE_MAX_VAULTS = 4                        # Unlocked vaults kept besides the one on screen.
+CACHE_BUDGET_BYTES = 256 * 1024 * 1024      # Estimated memory the cached vaults may hold.
+CACHE_IDLE_SECONDS = 15 * 60                # Cached vaults unused for this long are evicted.
+ENTRY_BYTES = 1500                          # Memory per entry: ~600 in the store, ~750 in its search index.
+
+
+# --- Vault List ---
+
+def read_vault_list(default_path, list_path=VAULT_LIST_FILE):
+    """Returns [(name, path), ...] for every known vault, the default vault first."""
+    vaults = [(DEFAULT_VAULT_NAME, default_path)]
+    if os.path.exists(list_path):
+        with open(list_path, encoding='utf-8') as f:
+            for item in json.load(f)["vaults"]:
+                if not same_vault(item["path"], default_path):
+                    vaults.append((item["name"], item["path"]))
+    return vaults
+
+
+def write_vault_list(vaults, list_path=VAULT_LIST_FILE):
+    """Saves [(name, path), ...], leaving out the default vault (the first)."""
+    data = {"vaults": [{"name": name, "path": path} for name, path in vaults[1:]]}
+    atomic_write(list_path, json.dumps(data, indent=2).encode('utf-8'))
+
+
+def same_vault(path, other_path):
+    return os.path.abspath(path) == os.path.abspath(other_path)
+
+
+def new_vault_path(name, directory=""):
+    """Returns an unused vault file path in directory (the working directory by default), named after the vault."""
+    slug = re.sub(r"[^a-z0-9]+", "_", name.casefold()).strip("_") or "vault"
+    path = os.path.join(directory, f"vault_{slug}.json")
+    suffix = 2
+    while os.path.exists(path):
+        path = os.path.join(directory, f"vault_{slug}_{suffix}.json")
+        suffix += 1
+    return path
+
+
+# --- Unlocked Vault Cache ---
+
+class OpenVault:
+    """An unlocked, loaded vault together with what the app built from its entries."""
+
+    def __init__(self, path, store, search_index=None, audit_cache=None):
+        self.path = path
+        self.store = store                  # vault.VaultStore
+        self.search_index = search_index
+        self.audit_cache = audit_cache
+        self.size = len(store.entries) * ENTRY_BYTES
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """Closes the store and drops everything decrypted from it."""
+        self.store.close()
+        self.store.entries.clear()
+        self.store.by_id.clear()
+        self.store.fernet = None
+        if self.search_index is not None:
+            self.search_index.clear()
+        self.search_index = self.audit_cache = None
+
+
+class VaultCache:
+    """Least recently used cache of unlocked vaults that are not on screen, keyed by path."""
+
+    def __init__(self, max_vaults=CACHE_MAX_VAULTS, budget_bytes=CACHE_BUDGET_BYTES,
+                 idle_seconds=CACHE_IDLE_SECONDS):
+        self.max_vaults = max_vaults
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self._vaults = OrderedDict()        # abspath -> OpenVault, least recently used first
+        self.size = 0
+        self.error_listener = None          # Called as listener(path, error) for a vault that could not be closed.
+
+    def __len__(self):
+        return len(self._vaults)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._vaults
+
+    def put(self, open_vault):
+        """Caches open_vault, which must have no unsaved changes, as the most recently used.
+        Evicts the least recently used vaults past the count and memory limits. Returns the evicted paths."""
+        self.take(open_vault.path)
+        open_vault.last_used = time.monotonic()
+        self._vaults[os.path.abspath(open_vault.path)] = open_vault
+        self.size += open_vault.size
+        evicted = []
+        for key in list(self._vaults):
+            if len(self._vaults) <= self.max_vaults and self.size <= self.budget_bytes:
+                break
+            evicted.append(self._evict(key))
+        return [path for path in evicted if path is not None]
+
+    def take(self, path):
+        """Removes and returns the cached vault at path, or None if it is not cached."""
+        open_vault = self._vaults.pop(os.path.abspath(path), None)
+        if open_vault is not None:
+            self.size -= open_vault.size
+        return open_vault
+
+    def evict_idle(self, now=None):
+        """Evicts the vaults unused for idle_seconds. Returns their paths."""
+        deadline = (time.monotonic() if now is None else now) - self.idle_seconds
+        evicted = [self._evict(key) for key, open_vault in list(self._vaults.items())
+                   if open_vault.last_used <= deadline]
+        return [path for path in evicted if path is not None]
+
+    def clear(self):
+        """Evicts every vault."""
+        for key in list(self._vaults):
+            self._evict(key)
+
+    def _evict(self, key):
+        """Closes and drops the vault. Returns its path, or None if it could not be closed and stays cached
+        (raising instead if there is no error_listener)."""
+        open_vault = self._vaults[key]
+        try:
+            open_vault.close()
+        except Exception as e:
+            if self.error_listener is None:
+                raise
+            self.error_listener(open_vault.path, e)
+            return None
+        self.take(key)
+        return open_vault.path